@@ -222,17 +222,31 @@ func showService(h Hub, w http.ResponseWriter, r *http.Request) {
 	}
 }
 
-func checkEvent(e eventMsg, w http.ResponseWriter, r *http.Request) bool {
+func postStatusBatch(h Hub, w http.ResponseWriter, r *http.Request) {
+	allow(w, "POST")
+	req := statusBatchRequest{}
+	if _, err := decodeBody(w, r, &req); err != nil {
+		return
+	}
+	jsonOut(w, r, getStatusBatch(h, req))
+}
+
+func eventError(e eventMsg) string {
 	if e.Event == "" {
-		ErrOut4(w, r, "FIELD_REQUIRED", "field \"event\" is required")
-		return false
+		return "field \"event\" is required"
 	}
 	if e.Object.Type == "" {
-		ErrOut4(w, r, "FIELD_REQUIRED", "field \"object\" is required")
-		return false
+		return "field \"object\" is required"
 	}
 	if e.Object.Id == 0 {
-		ErrOut4(w, r, "FIELD_REQUIRED", "field \"object.id\" is required")
+		return "field \"object.id\" is required"
+	}
+	return ""
+}
+
+func checkEvent(e eventMsg, w http.ResponseWriter, r *http.Request) bool {
+	if msg := eventError(e); msg != "" {
+		ErrOut4(w, r, "FIELD_REQUIRED", msg)
 		return false
 	}
 	return true
@@ -254,6 +268,26 @@ func postEvent(h Hub, w http.ResponseWriter, r *http.Request) {
 	jsonOut(w, r, "")
 }
 
+func postEventBatch(h Hub, w http.ResponseWriter, r *http.Request) {
+	allow(w, "POST")
+	events := []eventMsg{}
+	if _, err := decodeBody(w, r, &events); err != nil {
+		return
+	}
+	logg.D.f("postEventBatch - %d events", len(events))
+	sent := 0
+	for _, event := range events {
+		// one malformed event should not prevent sending of the others
+		if msg := eventError(event); msg != "" {
+			logg.W.f("postEventBatch - skip event %+v: %s", event, msg)
+			continue
+		}
+		h.EventWS.send2ws(event)
+		sent++
+	}
+	jsonOut(w, r, map[string]int{"sent": sent})
+}
+
 func getPostStatus(w http.ResponseWriter, r *http.Request) (int, error) {
 	status := Status{}
 	_, err := decodeBody(w, r, &status)
@@ -350,6 +384,17 @@ func postServiceMap(h Hub, w http.ResponseWriter, r *http.Request) {
 	// h.ServiceStorage.pure()
 }
 
+func postServiceMapPatch(h Hub, w http.ResponseWriter, r *http.Request) {
+	allow(w, "POST")
+	var p ServiceMapPatch
+	if _, err := decodeBody(w, r, &p); err != nil {
+		return
+	}
+	logg.D.f("patchServiceMap: %+v", p)
+	h.ServiceMap.patch(p)
+	jsonOut(w, r, "")
+}
+
 func postMMObjects(h Hub, w http.ResponseWriter, r *http.Request) {
 	allow(w, "POST")
 	h.MMObjects.mutex.Lock()
@@ -363,6 +408,19 @@ func postMMObjects(h Hub, w http.ResponseWriter, r *http.Request) {
 	h.MMObjects.data = mmData
 }
 
+func postMMObjectsPatch(h Hub, w http.ResponseWriter, r *http.Request) {
+	allow(w, "POST")
+	h.MMObjects.mutex.Lock()
+	defer h.MMObjects.mutex.Unlock()
+
+	var p MMObjectsPatch
+	if _, err := decodeBody(w, r, &p); err != nil {
+		return
+	}
+	h.MMObjects.data = h.MMObjects.data.patch(p)
+	jsonOut(w, r, "")
+}
+
 func getMMObjects(h Hub, w http.ResponseWriter, r *http.Request) {
 	allow(w, "GET")
 	jsonOut(w, r, h.MMObjects.data)
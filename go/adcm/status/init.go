@@ -88,6 +88,7 @@ func startHTTP(httpPort string, hub Hub) {
 	router.POST("/api/v1/log/", authWrap(hub, postLogLevel, isADCM))
 
 	router.POST("/api/v1/event/", authWrap(hub, postEvent, isADCM))
+	router.POST("/api/v1/event/bulk/", authWrap(hub, postEventBatch, isADCM))
 
 	router.GET("/api/v1/all/", authWrap(hub, showAll, isADCM, isADCMUser))
 
@@ -97,6 +98,7 @@ func startHTTP(httpPort string, hub Hub) {
 
 	router.GET("/api/v1/object/mm/", authWrap(hub, getMMObjects, isADCM))
 	router.POST("/api/v1/object/mm/", authWrap(hub, postMMObjects, isADCM))
+	router.POST("/api/v1/object/mm/patch/", authWrap(hub, postMMObjectsPatch, isADCM))
 
 	router.GET("/api/v1/host/:hostid/component/:compid/", authWrap(hub, showHostComp, isStatusChecker, isADCM, isADCMUser))
 	router.POST("/api/v1/host/:hostid/component/:compid/", authWrap(hub, setHostComp, isStatusChecker, isADCM))
@@ -111,8 +113,11 @@ func startHTTP(httpPort string, hub Hub) {
 		authWrap(hub, showComp, isADCM, isADCMUser),
 	)
 
+	router.POST("/api/v1/status/", authWrap(hub, postStatusBatch, isADCM, isADCMUser))
+
 	router.GET("/api/v1/servicemap/", authWrap(hub, showServiceMap, isADCM))
 	router.POST("/api/v1/servicemap/", authWrap(hub, postServiceMap, isADCM))
+	router.POST("/api/v1/servicemap/patch/", authWrap(hub, postServiceMapPatch, isADCM))
 	router.POST("/api/v1/servicemap/reload/", authWrap(hub, readConfig, isADCM))
 
 	log.Fatal(http.ListenAndServe(httpPort, router))
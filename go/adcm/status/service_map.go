@@ -43,12 +43,19 @@ type ServiceMaps struct {
 	HostService map[string]ClusterService `json:"hostservice"`
 }
 
+// ServiceMapPatch replaces all entries of listed clusters (0 is for hosts out of clusters)
+type ServiceMapPatch struct {
+	Clusters []int `json:"clusters"`
+	ServiceMaps
+}
+
 type ssReq struct {
 	command  string
 	cluster  int
 	service  int
 	hostcomp string
 	smap     ServiceMaps
+	clusters []int
 }
 
 type ssResp struct {
@@ -96,6 +103,9 @@ func (s *ServiceServer) run() {
 		case "init":
 			s.smap = initServiceMap(c.smap)
 			s.out <- ssResp{ok: true}
+		case "patch":
+			s.smap = patchServiceMap(s.smap, c.clusters, c.smap)
+			s.out <- ssResp{ok: true}
 		case "getmap":
 			s.out <- ssResp{smap: s.smap}
 		case "gethosts":
@@ -135,6 +145,11 @@ func (s *ServiceServer) init(sm ServiceMaps) {
 	<-s.out
 }
 
+func (s *ServiceServer) patch(p ServiceMapPatch) {
+	s.in <- ssReq{command: "patch", clusters: p.Clusters, smap: p.ServiceMaps}
+	<-s.out
+}
+
 func (s *ServiceServer) getMap() ServiceMaps {
 	s.in <- ssReq{command: "getmap"}
 	resp := <-s.out
@@ -215,6 +230,46 @@ func initServiceMap(smap ServiceMaps) ServiceMaps {
 	return smap
 }
 
+func patchServiceMap(smap ServiceMaps, clusters []int, patch ServiceMaps) ServiceMaps {
+	if smap.Host == nil {
+		smap.Host = map[Id][]int{}
+	}
+	if smap.Service == nil {
+		smap.Service = map[Id][]int{}
+	}
+	if smap.Component == nil {
+		smap.Component = map[Id]map[Id][]string{}
+	}
+	if smap.HostService == nil {
+		smap.HostService = map[string]ClusterService{}
+	}
+	replaced := map[int]bool{}
+	for _, clusterId := range clusters {
+		replaced[clusterId] = true
+		delete(smap.Host, Id(clusterId))
+		delete(smap.Service, Id(clusterId))
+		delete(smap.Component, Id(clusterId))
+	}
+	for key, cs := range smap.HostService {
+		if replaced[cs.Cluster] {
+			delete(smap.HostService, key)
+		}
+	}
+	for clusterId, hosts := range patch.Host {
+		smap.Host[clusterId] = hosts
+	}
+	for clusterId, services := range patch.Service {
+		smap.Service[clusterId] = services
+	}
+	for clusterId, components := range patch.Component {
+		smap.Component[clusterId] = components
+	}
+	for key, cs := range patch.HostService {
+		smap.HostService[key] = cs
+	}
+	return initServiceMap(smap)
+}
+
 func (s *ServiceMaps) getHostComponent(hostComponent string) (ClusterService, bool) {
 	v, ok := s.HostService[hostComponent]
 	return v, ok
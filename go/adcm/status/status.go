@@ -187,3 +187,55 @@ func getClusterStatus(h Hub, clusterId int) Status {
 	hostStatus, _ := getClusterHostStatus(h, clusterId)
 	return Status{Status: cookClusterStatus(serviceStatus, hostStatus)}
 }
+
+type statusBatchRequest struct {
+	Clusters       []int    `json:"clusters"`
+	Services       [][2]int `json:"services"`
+	Hosts          []int    `json:"hosts"`
+	Components     []int    `json:"components"`
+	HostComponents [][2]int `json:"hostcomponents"`
+}
+
+type statusBatch struct {
+	Clusters       map[int]int    `json:"clusters"`
+	Services       map[int]int    `json:"services"`
+	Hosts          map[int]int    `json:"hosts"`
+	Components     map[int]int    `json:"components"`
+	HostComponents map[string]int `json:"hostcomponents"`
+}
+
+// getStatusBatch returns statuses of many objects at once. Services are requested as
+// [cluster, service] pairs and host components as [host, component] pairs, the latter
+// are keyed as "host.component" in output. Unknown hosts are omitted from output.
+func getStatusBatch(h Hub, req statusBatchRequest) statusBatch {
+	out := statusBatch{
+		Clusters:       map[int]int{},
+		Services:       map[int]int{},
+		Hosts:          map[int]int{},
+		Components:     map[int]int{},
+		HostComponents: map[string]int{},
+	}
+	for _, clusterId := range req.Clusters {
+		out.Clusters[clusterId] = getClusterStatus(h, clusterId).Status
+	}
+	for _, pair := range req.Services {
+		status, _ := getServiceStatus(h, pair[0], pair[1])
+		out.Services[pair[1]] = status.Status
+	}
+	for _, hostId := range req.Hosts {
+		if _, ok := h.ServiceMap.getHostCluster(hostId); !ok {
+			continue
+		}
+		status, _ := h.HostStatusStorage.get(ALL, hostId)
+		out.Hosts[hostId] = status.Status
+	}
+	for _, compId := range req.Components {
+		status, _ := getComponentStatus(h, compId)
+		out.Components[compId] = status.Status
+	}
+	for _, pair := range req.HostComponents {
+		status, _ := h.HostComponentStorage.get(pair[0], pair[1])
+		out.HostComponents[strconv.Itoa(pair[0])+"."+strconv.Itoa(pair[1])] = status.Status
+	}
+	return out
+}
@@ -74,6 +74,37 @@ type MMObjectsData struct {
 	Hosts      []int `json:"hosts"`
 }
 
+// MMObjectsPatch removes ids of objects of changed clusters and adds ids of ones which are in MM now
+type MMObjectsPatch struct {
+	Add    MMObjectsData `json:"add"`
+	Remove MMObjectsData `json:"remove"`
+}
+
+func (d MMObjectsData) patch(p MMObjectsPatch) MMObjectsData {
+	return MMObjectsData{
+		Services:   patchIds(d.Services, p.Remove.Services, p.Add.Services),
+		Components: patchIds(d.Components, p.Remove.Components, p.Add.Components),
+		Hosts:      patchIds(d.Hosts, p.Remove.Hosts, p.Add.Hosts),
+	}
+}
+
+func patchIds(ids []int, remove []int, add []int) []int {
+	skip := map[int]bool{}
+	for _, id := range remove {
+		skip[id] = true
+	}
+	for _, id := range add {
+		skip[id] = true
+	}
+	result := []int{}
+	for _, id := range ids {
+		if !skip[id] {
+			result = append(result, id)
+		}
+	}
+	return append(result, add...)
+}
+
 type MMObjects struct {
 	data  MMObjectsData
 	mutex sync.Mutex
@@ -15,7 +15,7 @@
 cleanupwaitstatus
 
 sv_stop() {
-    for s in nginx wsgi status; do
+    for s in nginx wsgi status executor; do
         /sbin/sv stop $s
     done
 }
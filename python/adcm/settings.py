@@ -38,9 +38,12 @@ DOWNLOAD_DIR = Path(STACK_DIR, "data", "download")
 RUN_DIR = BASE_DIR / "data" / "run"
 FILE_DIR = STACK_DIR / "data" / "file"
 LOG_DIR = BASE_DIR / "data" / "log"
+LOG_STORAGE_DIR = BASE_DIR / "data" / "log_storage"
 LOG_FILE = LOG_DIR / "adcm.log"
 SECRETS_FILE = BASE_DIR / "data" / "var" / "secrets.json"
 ADCM_TOKEN_FILE = BASE_DIR / "data/var/adcm_token"
+EXECUTOR_PID_FILE = BASE_DIR / "data" / "var" / "task_executor.pid"
+BUNDLE_STAMP_FILE = BASE_DIR / "data" / "var" / "bundle_stamp"
 PYTHON_SITE_PACKAGES = Path(
     sys.exec_prefix, f"lib/python{sys.version_info.major}.{sys.version_info.minor}/site-packages"
 )
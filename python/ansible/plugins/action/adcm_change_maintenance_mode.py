@@ -56,7 +56,7 @@ sys.path.append("/adcm/python")
 import adcm.init_django  # pylint: disable=unused-import
 from cm.ansible_plugin import get_object_id_from_context
 from cm.api import load_mm_objects
-from cm.issue import update_hierarchy_issues
+from cm.issue import HIERARCHY_CHANGE, update_hierarchy_issues
 from cm.models import ClusterObject, Host, ServiceComponent
 
 
@@ -108,7 +108,7 @@ class ActionModule(ActionBase):
 
         obj.maintenance_mode = obj_value
         obj.save()
-        update_hierarchy_issues(obj.cluster)
+        update_hierarchy_issues(obj.cluster, HIERARCHY_CHANGE)
         load_mm_objects()
 
         return {"failed": False, "changed": True}
@@ -117,6 +117,10 @@ class PaginatedView(GenericUIView):
 
         return url
 
+    def get_page_context(self, page) -> dict:
+        """Serializer context which is computed once for all objects of the page"""
+        return {}
+
     def get_page(self, obj, request, context=None):
         if not context:
             context = {}
@@ -145,6 +149,7 @@ class PaginatedView(GenericUIView):
         page = self.paginate_queryset(obj)
         if self.is_paged(request):
             if serializer_class is not None:
+                context.update(self.get_page_context(page))
                 serializer = serializer_class(page, many=True, context=context)
                 page = serializer.data
 
@@ -152,6 +157,8 @@ class PaginatedView(GenericUIView):
 
         if count <= settings.REST_FRAMEWORK["PAGE_SIZE"]:
             if serializer_class is not None:
+                obj = list(obj)
+                context.update(self.get_page_context(obj))
                 serializer = serializer_class(obj, many=True, context=context)
                 obj = serializer.data
 
@@ -159,8 +159,10 @@ class ClusterUISerializer(ClusterDetailSerializer):
     def get_prototype_display_name(obj: Cluster) -> str | None:
         return obj.prototype.display_name
 
-    @staticmethod
-    def get_status(obj: Cluster) -> int:
+    def get_status(self, obj: Cluster) -> int:
+        if "status_batch" in self.context:
+            return self.context["status_batch"].get_cluster_status(obj)
+
         return get_cluster_status(obj)
 
 
@@ -248,8 +250,10 @@ class StatusSerializer(EmptySerializer):
         data["service_display_name"] = instance.service.prototype.display_name
         data["service_version"] = instance.service.prototype.version
         data["monitoring"] = instance.component.prototype.monitoring
-        status = get_hc_status(instance)
-        data["status"] = status
+        if "status_batch" in self.context:
+            data["status"] = self.context["status_batch"].get_hc_status(instance)
+        else:
+            data["status"] = get_hc_status(instance)
 
         return data
 
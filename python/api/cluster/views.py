@@ -65,7 +65,7 @@ from cm.models import (
     Prototype,
     Upgrade,
 )
-from cm.status_api import make_ui_cluster_status
+from cm.status_api import StatusBatch, make_ui_cluster_status
 from cm.upgrade import do_upgrade, get_upgrade
 from rbac.viewsets import DjangoOnlyObjectPermissions
 
@@ -97,6 +97,12 @@ class ClusterList(PermissionListMixin, PaginatedView):
     ordering_fields = ("name", "state", "prototype__display_name", "prototype__version_order")
     permission_required = [VIEW_CLUSTER_PERM]
 
+    def get_page_context(self, page) -> dict:
+        if not self._is_for_ui():
+            return {}
+
+        return {"status_batch": StatusBatch(clusters=page)}
+
     @audit
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -308,7 +314,10 @@ class StatusList(GenericUIView):
         if self._is_for_ui():
             return Response(make_ui_cluster_status(cluster, host_components))
         else:
-            serializer = self.get_serializer(host_components, many=True)
+            host_components = list(host_components)
+            context = self.get_serializer_context()
+            context["status_batch"] = StatusBatch(host_components=host_components)
+            serializer = self.get_serializer(host_components, many=True, context=context)
 
             return Response(serializer.data)
 
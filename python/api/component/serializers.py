@@ -59,8 +59,10 @@ class ComponentUISerializer(ComponentSerializer):
     def get_version(obj: ServiceComponent) -> str:
         return obj.prototype.version
 
-    @staticmethod
-    def get_status(obj: ServiceComponent) -> int:
+    def get_status(self, obj: ServiceComponent) -> int:
+        if "status_batch" in self.context:
+            return self.context["status_batch"].get_component_status(obj)
+
         return get_component_status(obj)
 
 
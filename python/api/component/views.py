@@ -33,7 +33,7 @@ from api.utils import (
 from audit.utils import audit
 from cm.api import update_mm_objects
 from cm.models import Cluster, ClusterObject, HostComponent, ServiceComponent
-from cm.status_api import make_ui_component_status
+from cm.status_api import StatusBatch, make_ui_component_status
 from rbac.viewsets import DjangoOnlyObjectPermissions
 
 
@@ -57,6 +57,12 @@ class ComponentListView(PermissionListMixin, PaginatedView):
     ordering_fields = ("state", "prototype__display_name", "prototype__version_order")
     permission_required = ["cm.view_servicecomponent"]
 
+    def get_page_context(self, page) -> dict:
+        if not self._is_for_ui():
+            return {}
+
+        return {"status_batch": StatusBatch(components=page)}
+
     def get_queryset(self, *args, **kwargs):
         queryset = super().get_queryset(*args, **kwargs)
 
@@ -101,7 +101,7 @@ class HostUpdateSerializer(HostDetailSerializer):
 
         update_hierarchy_issues(instance.cluster)
         update_hierarchy_issues(instance.provider)
-        update_issue_after_deleting()
+        update_issue_after_deleting([instance])
 
         return instance
 
@@ -190,8 +190,10 @@ class HostUISerializer(HostSerializer):
             return obj.provider.name
         return None
 
-    @staticmethod
-    def get_status(obj: Host) -> int:
+    def get_status(self, obj: Host) -> int:
+        if "status_batch" in self.context:
+            return self.context["status_batch"].get_host_status(obj)
+
         return get_host_status(obj)
 
 
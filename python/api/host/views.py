@@ -61,7 +61,7 @@ from cm.models import (
     MaintenanceMode,
     ServiceComponent,
 )
-from cm.status_api import make_ui_host_status
+from cm.status_api import StatusBatch, make_ui_host_status
 from rbac.viewsets import DjangoOnlyObjectPermissions
 
 CLUSTER_VIEW = "cm.view_cluster"
@@ -150,6 +150,12 @@ class HostList(PermissionListMixin, PaginatedView):
         "prototype__version_order",
     )
 
+    def get_page_context(self, page) -> dict:
+        if not self._is_for_ui():
+            return {}
+
+        return {"status_batch": StatusBatch(hosts=page)}
+
     def get_queryset(self, *args, **kwargs):
         queryset = super().get_queryset(*args, **kwargs)
         queryset = get_host_queryset(queryset, self.request.user, self.kwargs)
@@ -251,7 +257,7 @@ class HostDetail(PermissionListMixin, DetailView):
             raise AdcmEx("HOST_UPDATE_ERROR")
 
         serializer.save(**kwargs)
-        load_service_map()
+        load_service_map([host.cluster_id or 0])
 
         return Response(self.get_serializer(self.get_object()).data, status=HTTP_200_OK)
 
@@ -18,15 +18,17 @@ from rest_framework.reverse import reverse
 from rest_framework.serializers import (
     HyperlinkedIdentityField,
     HyperlinkedModelSerializer,
+    IntegerField,
     JSONField,
+    Serializer,
     SerializerMethodField,
 )
 
 from api.action.serializers import ActionJobSerializer
 from api.concern.serializers import ConcernItemSerializer
 from cm.ansible_plugin import get_check_log
-from cm.errors import AdcmEx
 from cm.job import start_task
+from cm.log import LOG_TAIL_MAX_LIMIT, get_log_content
 from cm.models import JobLog, JobStatus, LogStorage, TaskLog
 
 
@@ -258,23 +260,10 @@ class LogStorageRetrieveSerializer(HyperlinkedModelSerializer):
         )
         extra_kwargs = {"url": {"lookup_url_kwarg": "log_pk"}}
 
-    @staticmethod
-    def _get_ansible_content(obj):
-        path_file = settings.RUN_DIR / f"{obj.job.id}" / f"{obj.name}-{obj.type}.{obj.format}"
-        try:
-            with open(path_file, "r", encoding=settings.ENCODING_UTF_8) as f:
-                content = f.read()
-        except FileNotFoundError as e:
-            msg = f'File "{obj.name}-{obj.type}.{obj.format}" not found'
-
-            raise AdcmEx("LOG_NOT_FOUND", msg) from e
-
-        return content
-
     def get_content(self, obj: LogStorage) -> str:
         if obj.type in {"stdout", "stderr"}:
             if obj.body is None:
-                obj.body = self._get_ansible_content(obj)
+                obj.body = get_log_content(obj)
         elif obj.type == "check":
             if obj.body is None:
                 obj.body = get_check_log(obj.job_id)
@@ -304,3 +293,8 @@ class LogStorageSerializer(LogStorageRetrieveSerializer):
             kwargs={"job_pk": obj.job_id, "log_pk": obj.id},
             request=self.context["request"],
         )
+
+
+class LogStorageTailSerializer(Serializer):
+    offset = IntegerField(min_value=0, default=0)
+    limit = IntegerField(min_value=1, max_value=LOG_TAIL_MAX_LIMIT, default=LOG_TAIL_MAX_LIMIT)
@@ -31,6 +31,11 @@ urlpatterns = [
         LogStorageViewSet.as_view({"get": "download"}),
         name="joblog-download",
     ),
+    path(
+        "<int:job_pk>/log/<int:log_pk>/tail/",
+        LogStorageViewSet.as_view({"get": "tail"}),
+        name="joblog-tail",
+    ),
     path(
         "<int:job_pk>/log/<int:log_pk>/download/<name:tag>/<name:level>/<name:log_format>/",
         LogStorageViewSet.as_view({"get": "logfile"}),
@@ -10,14 +10,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import io
 import re
 import tarfile
+import zlib
 from pathlib import Path
+from typing import Iterator, Tuple
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from guardian.mixins import PermissionListMixin
 from rest_framework.decorators import action
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
@@ -33,16 +34,19 @@ from api.job.serializers import (
     JobSerializer,
     LogStorageRetrieveSerializer,
     LogStorageSerializer,
+    LogStorageTailSerializer,
     TaskRetrieveSerializer,
     TaskSerializer,
 )
 from api.utils import check_custom_perm, get_object_for_user
 from audit.utils import audit
 from cm.job import cancel_task, restart_task
+from cm.log import get_log_size, is_job_running, iter_log, read_log_chunk
 from cm.models import ActionType, JobLog, LogStorage, TaskLog
 from rbac.viewsets import DjangoOnlyObjectPermissions
 
 VIEW_TASKLOG_PERMISSION = "cm.view_tasklog"
+ARCHIVE_CHUNK_SIZE = 64 * 1024
 
 
 def get_task_download_archive_name(task: TaskLog) -> str:
@@ -91,8 +95,24 @@ def get_task_download_archive_name(task: TaskLog) -> str:
     return archive_name
 
 
-def get_task_download_archive_file_handler(task: TaskLog) -> io.BytesIO:
-    jobs = JobLog.objects.filter(task=task)
+def _iter_file(path: Path, size: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while size > 0:
+            chunk = f.read(min(size, ARCHIVE_CHUNK_SIZE))
+            if not chunk:
+                break
+
+            size -= len(chunk)
+            yield chunk
+
+    # file of running job could be changed after its size was taken
+    if size > 0:
+        yield tarfile.NUL * size
+
+
+def get_task_download_archive_members(task: TaskLog) -> Iterator[Tuple[str, int, Iterator[bytes]]]:
+    """Yield name, size and content chunks of each log file of task to put to archive"""
+    jobs = JobLog.objects.filter(task=task).select_related("sub_action")
 
     if task.action and task.action.type == ActionType.Job:
         task_dir_name_suffix = str_remove_non_alnum(value=task.action.display_name) or str_remove_non_alnum(
@@ -101,36 +121,59 @@ def get_task_download_archive_file_handler(task: TaskLog) -> io.BytesIO:
     else:
         task_dir_name_suffix = None
 
-    fh = io.BytesIO()
-    with tarfile.open(fileobj=fh, mode="w:gz") as tar_file:
-        for job in jobs:
-            if task_dir_name_suffix is None:
-                dir_name_suffix = ""
-                if job.sub_action:
-                    dir_name_suffix = str_remove_non_alnum(value=job.sub_action.display_name) or str_remove_non_alnum(
-                        value=job.sub_action.name
-                    )
-            else:
-                dir_name_suffix = task_dir_name_suffix
-
-            directory = Path(settings.RUN_DIR, str(job.pk))
-            if directory.is_dir():
-                files = [item for item in Path(settings.RUN_DIR, str(job.pk)).iterdir() if item.is_file()]
-                for log_file in files:
-                    tarinfo = tarfile.TarInfo(f'{f"{job.pk}-{dir_name_suffix}".strip("-")}/{log_file.name}')
-                    tarinfo.size = log_file.stat().st_size
-                    tar_file.addfile(tarinfo=tarinfo, fileobj=io.BytesIO(log_file.read_bytes()))
-            else:
-                log_storages = LogStorage.objects.filter(job=job, type__in={"stdout", "stderr"})
-                for log_storage in log_storages:
-                    tarinfo = tarfile.TarInfo(
-                        f'{f"{job.pk}-{dir_name_suffix}".strip("-")}' f'/{log_storage.name}-{log_storage.type}.txt'
-                    )
-                    body = io.BytesIO(bytes(log_storage.body, settings.ENCODING_UTF_8))
-                    tarinfo.size = body.getbuffer().nbytes
-                    tar_file.addfile(tarinfo=tarinfo, fileobj=body)
-
-    return fh
+    for job in jobs:
+        if task_dir_name_suffix is None:
+            dir_name_suffix = ""
+            if job.sub_action:
+                dir_name_suffix = str_remove_non_alnum(value=job.sub_action.display_name) or str_remove_non_alnum(
+                    value=job.sub_action.name
+                )
+        else:
+            dir_name_suffix = task_dir_name_suffix
+
+        dir_name = f"{job.pk}-{dir_name_suffix}".strip("-")
+        directory = Path(settings.RUN_DIR, str(job.pk))
+        if directory.is_dir():
+            files = [item for item in directory.iterdir() if item.is_file()]
+            for log_file in files:
+                size = log_file.stat().st_size
+                yield f"{dir_name}/{log_file.name}", size, _iter_file(path=log_file, size=size)
+        else:
+            log_storages = LogStorage.objects.filter(job=job, type__in={"stdout", "stderr"})
+            for log_storage in log_storages.iterator():
+                name = f"{dir_name}/{log_storage.name}-{log_storage.type}.txt"
+                yield name, get_log_size(log_storage), iter_log(log_storage)
+
+
+def get_task_download_archive_stream(task: TaskLog) -> Iterator[bytes]:
+    """
+    Yield tar.gz archive of task logs by chunks as they are read and compressed,
+    so neither logs nor archive are kept in memory as a whole
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+    offset = 0
+
+    def compress(data: bytes) -> Iterator[bytes]:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+
+    for name, size, chunks in get_task_download_archive_members(task=task):
+        tarinfo = tarfile.TarInfo(name)
+        tarinfo.size = size
+        header = tarinfo.tobuf()
+        yield from compress(header)
+        for chunk in chunks:
+            yield from compress(chunk)
+
+        padding = -size % tarfile.BLOCKSIZE
+        yield from compress(tarfile.NUL * padding)
+        offset += len(header) + size + padding
+
+    # end-of-archive marker and padding to full record as tarfile.TarFile.close() does
+    end = tarfile.BLOCKSIZE * 2
+    yield from compress(tarfile.NUL * (end + -(offset + end) % tarfile.RECORDSIZE))
+    yield compressor.flush()
 
 
 #  pylint:disable-next=too-many-ancestors
@@ -210,8 +253,8 @@ class TaskViewSet(PermissionListMixin, ListModelMixin, RetrieveModelMixin, Gener
     @action(methods=["get"], detail=True)
     def download(self, request: Request, task_pk: int) -> Response:
         task = get_object_for_user(request.user, VIEW_TASKLOG_PERMISSION, TaskLog, id=task_pk)
-        response = HttpResponse(
-            content=get_task_download_archive_file_handler(task=task).getvalue(),
+        response = StreamingHttpResponse(
+            streaming_content=get_task_download_archive_stream(task=task),
             content_type="application/tar+gzip",
         )
         response["Content-Disposition"] = f'attachment; filename="{get_task_download_archive_name(task=task)}"'
@@ -260,27 +303,33 @@ class LogStorageViewSet(PermissionListMixin, ListModelMixin, RetrieveModelMixin,
         else:
             mime_type = "application/json"
 
-        if log_storage.body is None:
-            file_path = Path(
-                settings.RUN_DIR,
-                f"{job_pk}",
-                f"{log_storage.name}-{log_storage.type}.{log_storage.format}",
-            )
-            if Path.is_file(file_path):
-                with open(file_path, "r", encoding=settings.ENCODING_UTF_8) as f:
-                    body = f.read()
-                    length = len(body)
-            else:
-                body = ""
-                length = 0
-        else:
-            body = log_storage.body
-            length = len(body)
-
-        response = HttpResponse(body)
+        # log is sent by chunks, verbose ansible logs could be too large to keep them in memory
+        response = StreamingHttpResponse(iter_log(log_storage))
+        response["Content-Length"] = get_log_size(log_storage)
         response["Content-Type"] = mime_type
-        response["Content-Length"] = length
         response["Content-Encoding"] = settings.ENCODING_UTF_8
         response["Content-Disposition"] = f"attachment; filename={filename}"
 
         return response
+
+    @action(methods=["get"], detail=True)
+    def tail(self, request: Request, job_pk: int, log_pk: int):
+        serializer = LogStorageTailSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        offset = serializer.validated_data["offset"]
+        limit = serializer.validated_data["limit"]
+        log_storage = LogStorage.obj.get(pk=log_pk, job_id=job_pk)
+
+        # request does not wait for new lines to not hold API worker, client polls from returned offset until
+        # log is finished. Job status is checked before reading, so the last lines are read after job is finished
+        finished = not is_job_running(job_id=log_storage.job_id)
+        chunk, next_offset = read_log_chunk(log_storage=log_storage, offset=offset, limit=limit)
+
+        return Response(
+            data={
+                "content": chunk.decode(settings.ENCODING_UTF_8, errors="replace"),
+                "offset": next_offset,
+                "finished": finished,
+            },
+            status=HTTP_200_OK,
+        )
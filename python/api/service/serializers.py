@@ -86,8 +86,10 @@ class ServiceUISerializer(ServiceSerializer):
     def get_version(obj: ClusterObject) -> str:
         return obj.prototype.version
 
-    @staticmethod
-    def get_status(obj: ClusterObject) -> int:
+    def get_status(self, obj: ClusterObject) -> int:
+        if "status_batch" in self.context:
+            return self.context["status_batch"].get_service_status(obj)
+
         return get_service_status(obj)
 
 
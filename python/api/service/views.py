@@ -60,7 +60,7 @@ from cm.models import (
     ServiceComponent,
     TaskLog,
 )
-from cm.status_api import make_ui_service_status
+from cm.status_api import StatusBatch, make_ui_service_status
 from rbac.viewsets import DjangoOnlyObjectPermissions
 
 
@@ -73,6 +73,12 @@ class ServiceListView(PermissionListMixin, PaginatedView):
     filterset_fields = ("cluster_id",)
     ordering_fields = ("state", "prototype__display_name", "prototype__version_order")
 
+    def get_page_context(self, page) -> dict:
+        if not self._is_for_ui():
+            return {}
+
+        return {"status_batch": StatusBatch(services=page)}
+
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         if "cluster_id" in kwargs:
@@ -11,14 +11,18 @@
 # limitations under the License.
 
 from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from zoneinfo import ZoneInfo
 
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 
 from adcm.tests.base import BaseTestCase
-from cm.models import JobLog, LogStorage
+from cm.log import store_log_file
+from cm.models import JobLog, JobStatus, LogStorage
 
 
 class TestTaskAPI(BaseTestCase):
@@ -130,3 +134,101 @@ class TestTaskAPI(BaseTestCase):
         )
 
         self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def write_log_file(self, run_dir: str, content: str) -> None:
+        job_dir = Path(run_dir, str(self.job.pk))
+        job_dir.mkdir()
+        Path(job_dir, f"{self.log_storage_1.name}-{self.log_storage_1.type}.{self.log_storage_1.format}").write_text(
+            content, encoding="utf-8"
+        )
+
+    def test_download_from_file(self):
+        with TemporaryDirectory() as run_dir, override_settings(RUN_DIR=Path(run_dir)):
+            self.write_log_file(run_dir=run_dir, content="line 1\nline 2\n")
+
+            response = self.client.get(
+                reverse("joblog-download", kwargs={"job_pk": self.job.pk, "log_pk": self.log_storage_1.pk}),
+            )
+
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertEqual(b"".join(response.streaming_content), b"line 1\nline 2\n")
+            self.assertEqual(response["Content-Length"], "14")
+
+    def test_tail(self):
+        with TemporaryDirectory() as run_dir, override_settings(RUN_DIR=Path(run_dir)):
+            self.write_log_file(run_dir=run_dir, content="line 1\nline 2\n")
+            path = reverse("joblog-tail", kwargs={"job_pk": self.job.pk, "log_pk": self.log_storage_1.pk})
+
+            response: Response = self.client.get(path, {"limit": 7})
+
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertDictEqual(response.data, {"content": "line 1\n", "offset": 7, "finished": False})
+
+            response: Response = self.client.get(path, {"offset": 7})
+
+            self.assertDictEqual(response.data, {"content": "line 2\n", "offset": 14, "finished": False})
+
+            response: Response = self.client.get(path, {"offset": 14})
+
+            self.assertDictEqual(response.data, {"content": "", "offset": 14, "finished": False})
+
+    def test_tail_split_character(self):
+        self.log_storage_1.body = "ab\u00e9c"
+        self.log_storage_1.save(update_fields=["body"])
+        path = reverse("joblog-tail", kwargs={"job_pk": self.job.pk, "log_pk": self.log_storage_1.pk})
+
+        response: Response = self.client.get(path, {"limit": 3})
+
+        self.assertDictEqual(response.data, {"content": "ab", "offset": 2, "finished": False})
+
+        response: Response = self.client.get(path, {"offset": 2})
+
+        self.assertDictEqual(response.data, {"content": "\u00e9c", "offset": 5, "finished": False})
+
+    def test_tail_wrong_params(self):
+        response: Response = self.client.get(
+            reverse("joblog-tail", kwargs={"job_pk": self.job.pk, "log_pk": self.log_storage_1.pk}),
+            {"offset": -1},
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_tail_finished_job(self):
+        self.job.status = JobStatus.SUCCESS
+        self.job.save(update_fields=["status"])
+
+        with TemporaryDirectory() as run_dir, override_settings(RUN_DIR=Path(run_dir)):
+            self.write_log_file(run_dir=run_dir, content="line 1\nline 2\n")
+
+            response = self.client.get(
+                reverse("joblog-tail", kwargs={"job_pk": self.job.pk, "log_pk": self.log_storage_1.pk}),
+                {"offset": 7},
+            )
+
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertDictEqual(response.data, {"content": "line 2\n", "offset": 14, "finished": True})
+
+    def test_download_stored(self):
+        with (
+            TemporaryDirectory() as run_dir,
+            TemporaryDirectory() as storage_dir,
+            override_settings(RUN_DIR=Path(run_dir), LOG_STORAGE_DIR=Path(storage_dir)),
+        ):
+            self.write_log_file(run_dir=run_dir, content="line 1\nline 2\n")
+            store_log_file(self.log_storage_1)
+            Path(run_dir, str(self.job.pk), "log_storage_1-custom.txt").unlink()
+
+            response = self.client.get(
+                reverse("joblog-download", kwargs={"job_pk": self.job.pk, "log_pk": self.log_storage_1.pk}),
+            )
+
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertEqual(b"".join(response.streaming_content), b"line 1\nline 2\n")
+            self.assertEqual(response["Content-Length"], "14")
+
+            response: Response = self.client.get(
+                reverse("joblog-tail", kwargs={"job_pk": self.job.pk, "log_pk": self.log_storage_1.pk}),
+                {"offset": 7},
+            )
+
+            self.assertDictEqual(response.data, {"content": "line 2\n", "offset": 14, "finished": False})
@@ -190,7 +190,7 @@ class TestTaskAPI(BaseTestCase):
         self.assertEqual(response.status_code, HTTP_200_OK)
 
     def test_download(self):
-        with patch("api.job.views.get_task_download_archive_file_handler"):
+        with patch("api.job.views.get_task_download_archive_stream", return_value=iter([b""])):
             response: Response = self.client.get(
                 reverse("tasklog-download", kwargs={"task_pk": self.task_1.pk}),
             )
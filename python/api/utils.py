@@ -31,7 +31,7 @@ from rest_framework.status import (
 
 from cm.api import load_mm_objects
 from cm.errors import AdcmEx
-from cm.issue import update_hierarchy_issues, update_issue_after_deleting
+from cm.issue import HIERARCHY_CHANGE, DirtyIssues, update_issue_after_deleting
 from cm.job import start_task
 from cm.models import (
     Action,
@@ -40,6 +40,7 @@ from cm.models import (
     ConcernType,
     Host,
     HostComponent,
+    HostProvider,
     MaintenanceMode,
     Prototype,
     PrototypeConfig,
@@ -70,15 +71,17 @@ def _change_mm_via_action(
 
 
 def _update_mm_hierarchy_issues(obj: Host | ClusterObject | ServiceComponent) -> None:
+    issues = DirtyIssues()
     if isinstance(obj, Host):
-        update_hierarchy_issues(obj.provider)
+        issues.mark_hierarchy(obj.provider, HIERARCHY_CHANGE)
 
-    hosts = (host_component.host for host_component in HostComponent.objects.filter(cluster=obj.cluster))
-    for host in hosts:
-        update_hierarchy_issues(host.provider)
+    if obj.cluster is not None:
+        for provider in HostProvider.objects.filter(host__hostcomponent__cluster=obj.cluster).distinct():
+            issues.mark_hierarchy(provider, HIERARCHY_CHANGE)
 
-    update_hierarchy_issues(obj.cluster)
-    update_issue_after_deleting()
+    issues.mark_hierarchy(obj.cluster, HIERARCHY_CHANGE)
+    issues.recheck()
+    update_issue_after_deleting([obj, obj.cluster])
     load_mm_objects()
 
 
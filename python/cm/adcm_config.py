@@ -14,14 +14,16 @@
 
 import copy
 import json
+import os
+import pickle
 from collections import OrderedDict
 from collections.abc import Mapping
 from pathlib import Path
-from typing import Any, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 import yspec.checker
-from ansible.parsing.vault import VaultAES256, VaultSecret
 from django.conf import settings
+from django.db import transaction
 
 from cm.errors import raise_adcm_ex
 from cm.logger import logger
@@ -36,6 +38,7 @@ from cm.models import (
     PrototypeConfig,
 )
 from cm.variant import get_variant, process_variant
+from cm.vault import get_vault
 
 SECURE_PARAM_TYPES = ("password", "secrettext")
 
@@ -211,7 +214,66 @@ def init_object_config(proto: Prototype, obj: Any) -> Optional[ObjectConfig]:
     return obj_conf
 
 
+class PrototypeConfigCache:
+    """
+    Process-wide cache of results of `get_prototype_config` keyed by prototype and action ids.
+    Results are kept pickled, so every caller gets its own copy and could modify it.
+
+    Prototype configs are changed only on bundle load, update and delete, which reset the cache
+    and touch settings.BUNDLE_STAMP_FILE after commit, so other processes reset their caches too
+    """
+
+    def __init__(self):
+        self._specs: Dict[Tuple[int, Optional[int]], bytes] = {}
+        self._stamp = None
+
+    @staticmethod
+    def _get_stamp() -> Optional[int]:
+        try:
+            return os.stat(settings.BUNDLE_STAMP_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _touch_stamp() -> None:
+        stamp_file = Path(settings.BUNDLE_STAMP_FILE)
+        stamp_file.parent.mkdir(parents=True, exist_ok=True)
+        stamp_file.touch()
+
+    def get(self, key: Tuple[int, Optional[int]]) -> Optional[Tuple[dict, dict, dict, dict]]:
+        stamp = self._get_stamp()
+        if stamp != self._stamp:
+            self._specs.clear()
+            self._stamp = stamp
+
+        data = self._specs.get(key)
+        if data is None:
+            return None
+
+        return pickle.loads(data)
+
+    def set(self, key: Tuple[int, Optional[int]], value: Tuple[dict, dict, dict, dict]) -> None:
+        self._specs[key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def reset(self) -> None:
+        self._specs.clear()
+        transaction.on_commit(self._touch_stamp)
+
+
+_prototype_config_cache = PrototypeConfigCache()
+
+
+def reset_prototype_config_cache() -> None:
+    """Drop cached prototype configs, should be called after bundle is loaded, updated or deleted"""
+    _prototype_config_cache.reset()
+
+
 def get_prototype_config(proto: Prototype, action: Action = None) -> Tuple[dict, dict, dict, dict]:
+    key = (proto.pk, getattr(action, "pk", None))
+    cached = _prototype_config_cache.get(key)
+    if cached is not None:
+        return cached
+
     spec = {}
     flat_spec = OrderedDict()
     conf = {}
@@ -233,6 +295,8 @@ def get_prototype_config(proto: Prototype, action: Action = None) -> Tuple[dict,
             spec[c.name][c.subname] = obj_to_dict(c, flist)
             conf[c.name][c.subname] = get_default(c, proto)
 
+    _prototype_config_cache.set(key, (spec, flat_spec, conf, attr))
+
     return spec, flat_spec, conf, attr
 
 
@@ -398,17 +462,8 @@ def save_file_type(obj, key, subkey, value):
     return filename
 
 
-def ansible_encrypt(msg):
-    vault = VaultAES256()
-    secret = VaultSecret(bytes(settings.ANSIBLE_SECRET, settings.ENCODING_UTF_8))
-
-    return vault.encrypt(bytes(msg, settings.ENCODING_UTF_8), secret)
-
-
 def ansible_encrypt_and_format(msg):
-    ciphertext = ansible_encrypt(msg)
-
-    return f"{settings.ANSIBLE_VAULT_HEADER}\n{str(ciphertext, settings.ENCODING_UTF_8)}"
+    return get_vault().encrypt(msg)
 
 
 def process_file_type(obj: Any, spec: dict, conf: dict):
@@ -431,14 +486,7 @@ def process_file_type(obj: Any, spec: dict, conf: dict):
 
 
 def ansible_decrypt(msg):
-    if settings.ANSIBLE_VAULT_HEADER not in msg:
-        return msg
-
-    _, ciphertext = msg.split("\n")
-    vault = VaultAES256()
-    secret = VaultSecret(bytes(settings.ANSIBLE_SECRET, settings.ENCODING_UTF_8))
-
-    return str(vault.decrypt(ciphertext, secret), settings.ENCODING_UTF_8)
+    return get_vault().decrypt(msg)
 
 
 def is_ansible_encrypted(msg):
@@ -13,12 +13,16 @@
 # pylint: disable=too-many-lines
 
 import json
+from collections import defaultdict
 from functools import wraps
+from typing import Collection, Optional
 
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import MultipleObjectsReturned
 from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed
 from django.utils import timezone
-from version_utils import rpm
 
 from cm.adcm_config import (
     check_json_config,
@@ -30,12 +34,23 @@ from cm.adcm_config import (
 )
 from cm.api_context import ctx
 from cm.errors import raise_adcm_ex
+from cm.hierarchy import (
+    defer_maintenance_mode_update,
+    reset_hierarchy_cache,
+    update_maintenance_mode,
+)
 from cm.issue import (
-    check_bound_components,
-    check_component_constraint,
-    check_component_requires,
+    BIND_CHANGE,
+    CONFIG_CHANGE,
+    HIERARCHY_CHANGE,
+    HOST_CHANGE,
+    HOST_COMPONENT_CHANGE,
+    SERVICE_CHANGE,
+    DirtyIssues,
+    check_hc_constraints,
     update_hierarchy_issues,
     update_issue_after_deleting,
+    update_object_issues,
 )
 from cm.logger import logger
 from cm.models import (
@@ -59,7 +74,8 @@ from cm.models import (
     TaskLog,
 )
 from cm.status_api import api_request, post_event
-from rbac.models import re_apply_object_policy
+from cm.version import compare_versions
+from rbac.models import get_policies_for_objects, re_apply_object_policy
 
 
 def check_license(proto: Prototype) -> None:
@@ -71,97 +87,114 @@ def check_license(proto: Prototype) -> None:
 
 def version_in(version: str, ver: PrototypeImport) -> bool:
     if ver.min_strict:
-        if rpm.compare_versions(version, ver.min_version) <= 0:
+        if compare_versions(version, ver.min_version) <= 0:
             return False
     elif ver.min_version:
-        if rpm.compare_versions(version, ver.min_version) < 0:
+        if compare_versions(version, ver.min_version) < 0:
             return False
 
     if ver.max_strict:
-        if rpm.compare_versions(version, ver.max_version) >= 0:
+        if compare_versions(version, ver.max_version) >= 0:
             return False
     elif ver.max_version:
-        if rpm.compare_versions(version, ver.max_version) > 0:
+        if compare_versions(version, ver.max_version) > 0:
             return False
 
     return True
 
 
-def load_service_map():
-    comps = {}
-    hosts = {}
-    hc_map = {}
-    services = {}
-    passive = {}
-    for c in ServiceComponent.objects.filter(prototype__monitoring="passive"):
-        passive[c.pk] = True
-
-    for hc in HostComponent.objects.all():
-        if hc.component.pk in passive:
-            continue
-
-        key = f"{hc.host.pk}.{hc.component.pk}"
-        hc_map[key] = {"cluster": hc.cluster.pk, "service": hc.service.pk}
-        if str(hc.cluster.pk) not in comps:
-            comps[str(hc.cluster.pk)] = {}
-
-        if str(hc.service.pk) not in comps[str(hc.cluster.pk)]:
-            comps[str(hc.cluster.pk)][str(hc.service.pk)] = []
-
-        comps[str(hc.cluster.pk)][str(hc.service.pk)].append(key)
-
-    for host in Host.objects.filter(prototype__monitoring="active"):
-        if host.cluster:
-            cluster_pk = host.cluster.pk
-        else:
-            cluster_pk = 0
-
-        if cluster_pk not in hosts:
-            hosts[cluster_pk] = []
-
-        hosts[cluster_pk].append(host.pk)
-
-    for co in ClusterObject.objects.filter(prototype__monitoring="active"):
-        if co.cluster.pk not in services:
-            services[co.cluster.pk] = []
-
-        services[co.cluster.pk].append(co.pk)
+def get_service_map(cluster_ids: Optional[Collection[int]] = None) -> dict:
+    """
+    Get monitoring map of hosts, services and components of clusters with `cluster_ids`
+    (0 is for hosts out of clusters) or of all clusters if they are not set
+    """
+    host_components = HostComponent.objects.exclude(component__prototype__monitoring="passive")
+    hosts = Host.objects.filter(prototype__monitoring="active")
+    services = ClusterObject.objects.filter(prototype__monitoring="active")
+    if cluster_ids is not None:
+        host_components = host_components.filter(cluster_id__in=cluster_ids)
+        services = services.filter(cluster_id__in=cluster_ids)
+        hosts_filter = Q(cluster_id__in=cluster_ids)
+        if 0 in cluster_ids:
+            hosts_filter |= Q(cluster__isnull=True)
+        hosts = hosts.filter(hosts_filter)
 
-    m = {
+    hc_map = {}
+    comps = defaultdict(lambda: defaultdict(list))
+    for host_id, component_id, cluster_id, service_id in host_components.values_list(
+        "host_id", "component_id", "cluster_id", "service_id"
+    ):
+        key = f"{host_id}.{component_id}"
+        hc_map[key] = {"cluster": cluster_id, "service": service_id}
+        comps[str(cluster_id)][str(service_id)].append(key)
+
+    host_map = defaultdict(list)
+    for host_id, cluster_id in hosts.values_list("pk", "cluster_id"):
+        host_map[cluster_id or 0].append(host_id)
+
+    service_map = defaultdict(list)
+    for service_id, cluster_id in services.values_list("pk", "cluster_id"):
+        service_map[cluster_id].append(service_id)
+
+    return {
         "hostservice": hc_map,
         "component": comps,
-        "service": services,
-        "host": hosts,
+        "service": service_map,
+        "host": host_map,
     }
-    api_request("post", "/servicemap/", m)
+
+
+def load_service_map(cluster_ids: Optional[Collection[int]] = None):
+    """
+    Send monitoring map to status server. When `cluster_ids` are set only entries of these clusters
+    are replaced, whole map is sent if status server can't apply such patch
+    """
+    if cluster_ids is not None:
+        data = {"clusters": sorted(set(cluster_ids)), **get_service_map(cluster_ids)}
+        response = api_request("post", "/servicemap/patch/", data)
+        # status server loads whole map by itself after restart, so there is nothing to do when it is down
+        if response is None:
+            return
+
+        if response.status_code == 200:
+            load_mm_objects(cluster_ids)
+            return
+
+    api_request("post", "/servicemap/", get_service_map())
     load_mm_objects()
 
 
-def load_mm_objects():
-    """send ids of all objects in mm to status server"""
+def load_mm_objects(cluster_ids: Optional[Collection[int]] = None):
+    """
+    Send ids of all objects in mm to status server.
+    When `cluster_ids` are set only ids of objects of these clusters are replaced
+    """
     clusters = Cluster.objects.filter(prototype__type=ObjectType.Cluster, prototype__allow_maintenance_mode=True)
+    if cluster_ids is not None:
+        clusters = clusters.filter(pk__in=cluster_ids)
 
-    service_ids = set()
-    component_ids = set()
-    host_ids = []
+    services = ClusterObject.objects.filter(cluster__in=clusters, effective_maintenance_mode=MaintenanceMode.ON)
+    components = ServiceComponent.objects.filter(cluster__in=clusters, effective_maintenance_mode=MaintenanceMode.ON)
+    hosts = Host.objects.filter(cluster__in=clusters, maintenance_mode=MaintenanceMode.ON)
 
-    for service in ClusterObject.objects.filter(cluster__in=clusters).prefetch_related("servicecomponent_set"):
-        if service.maintenance_mode == MaintenanceMode.ON:
-            service_ids.add(service.pk)
-        for component in service.servicecomponent_set.all():
-            if component.maintenance_mode == MaintenanceMode.ON:
-                component_ids.add(component.pk)
+    data = {
+        "services": list(services.values_list("pk", flat=True)),
+        "components": list(components.values_list("pk", flat=True)),
+        "hosts": list(hosts.values_list("pk", flat=True)),
+    }
+    if cluster_ids is None:
+        return api_request("post", "/object/mm/", data)
 
-    for host in Host.objects.filter(cluster__in=clusters):
-        if host.maintenance_mode == MaintenanceMode.ON:
-            host_ids.append(host.pk)
+    hosts_filter = Q(cluster_id__in=cluster_ids)
+    if 0 in cluster_ids:
+        hosts_filter |= Q(cluster__isnull=True)
 
-    data = {
-        "services": list(service_ids),
-        "components": list(component_ids),
-        "hosts": host_ids,
+    remove = {
+        "services": list(ClusterObject.objects.filter(cluster_id__in=cluster_ids).values_list("pk", flat=True)),
+        "components": list(ServiceComponent.objects.filter(cluster_id__in=cluster_ids).values_list("pk", flat=True)),
+        "hosts": list(Host.objects.filter(hosts_filter).values_list("pk", flat=True)),
     }
-    return api_request("post", "/object/mm/", data)
+    return api_request("post", "/object/mm/patch/", {"add": data, "remove": remove})
 
 
 def update_mm_objects(func):
@@ -187,7 +220,7 @@ def add_cluster(proto, name, desc=""):
         update_hierarchy_issues(cluster)
 
     post_event("create", "cluster", cluster.pk)
-    load_service_map()
+    load_service_map([cluster.pk])
     logger.info("cluster #%s %s is added", cluster.pk, cluster.name)
 
     return cluster
@@ -212,11 +245,11 @@ def add_host(proto, provider, fqdn, desc=""):
         host.save()
         host.add_to_concerns(ctx.lock)
         update_hierarchy_issues(host.provider)
-        re_apply_object_policy(provider)
+        re_apply_object_policy(provider, [host])
 
     ctx.event.send_state()
     post_event("create", "host", host.pk, "provider", str(provider.pk))
-    load_service_map()
+    load_service_map([0])
     logger.info("host #%s %s is added", host.pk, host.fqdn)
 
     return host
@@ -278,10 +311,10 @@ def add_host_to_cluster(cluster, host):
         host.save()
         host.add_to_concerns(ctx.lock)
         update_hierarchy_issues(host)
-        re_apply_object_policy(cluster)
+        re_apply_object_policy(cluster, [host])
 
     post_event("add", "host", host.pk, "cluster", str(cluster.pk))
-    load_service_map()
+    load_service_map([cluster.pk, 0])
     logger.info("host #%s %s is added to cluster #%s %s", host.pk, host.fqdn, cluster.pk, cluster.name)
 
     return host
@@ -338,8 +371,8 @@ def delete_host(host, cancel_tasks=True):
     host_pk = host.pk
     host.delete()
     post_event("delete", "host", host_pk)
-    load_service_map()
-    update_issue_after_deleting()
+    load_service_map([0])
+    update_issue_after_deleting([host.provider])
     logger.info("host #%s is deleted", host_pk)
 
 
@@ -401,12 +434,13 @@ def delete_service_by_name(service_name, cluster_pk):
 
 def delete_service(service: ClusterObject) -> None:
     service_pk = service.pk
-    service.delete()
-    update_issue_after_deleting()
-    update_hierarchy_issues(service.cluster)
+    with defer_maintenance_mode_update():
+        service.delete()
+    update_issue_after_deleting([service.cluster])
+    update_hierarchy_issues(service.cluster, SERVICE_CHANGE)
     re_apply_object_policy(service.cluster)
     post_event("delete", "service", service_pk)
-    load_service_map()
+    load_service_map([service.cluster_id])
     logger.info("service #%s is deleted", service_pk)
 
 
@@ -424,10 +458,11 @@ def delete_cluster(cluster, cancel_tasks=True):
         MaintenanceMode.OFF,
         ", ".join(host_pks),
     )
-    cluster.delete()
-    update_issue_after_deleting()
+    with defer_maintenance_mode_update():
+        cluster.delete()
+    update_issue_after_deleting(Host.objects.filter(pk__in=host_pks))
     post_event("delete", "cluster", cluster_pk)
-    load_service_map()
+    load_service_map([cluster_pk, 0])
 
 
 def remove_host_from_cluster(host):
@@ -445,12 +480,12 @@ def remove_host_from_cluster(host):
             update_hierarchy_issues(host)
 
         host.remove_from_concerns(ctx.lock)
-        update_hierarchy_issues(cluster)
-        re_apply_object_policy(cluster)
+        update_hierarchy_issues(cluster, HOST_CHANGE)
+        re_apply_object_policy(cluster, [host])
 
     ctx.event.send_state()
     post_event("remove", "host", host.pk, "cluster", str(cluster.pk))
-    load_service_map()
+    load_service_map([cluster.pk, 0])
 
     return host
 
@@ -464,7 +499,7 @@ def unbind(cbind):
     with transaction.atomic():
         DummyData.objects.filter(id=1).update(date=timezone.now())
         cbind.delete()
-        update_hierarchy_issues(cbind.cluster)
+        update_hierarchy_issues(cbind.cluster, BIND_CHANGE)
 
     post_event("delete", "bind", cbind_pk, "cluster", str(cbind_cluster_pk))
 
@@ -488,11 +523,17 @@ def add_service_to_cluster(cluster, proto):
         cs.config = obj_conf
         cs.save()
         add_components_to_service(cluster, cs)
-        update_hierarchy_issues(cs)
-        re_apply_object_policy(cluster)
+        components = list(ServiceComponent.objects.filter(service=cs))
+        issues = DirtyIssues()
+        issues.mark_hierarchy(cs, SERVICE_CHANGE)
+        issues.mark(cs)
+        for component in components:
+            issues.mark(component)
+        issues.recheck()
+        re_apply_object_policy(cluster, [cs, *components])
 
     post_event("add", "service", cs.pk, "cluster", str(cluster.pk))
-    load_service_map()
+    load_service_map([cluster.pk])
     logger.info("service #%s %s is added to cluster #%s %s", cs.pk, cs.prototype.name, cluster.pk, cluster.name)
 
     return cs
@@ -504,7 +545,6 @@ def add_components_to_service(cluster, service):
         obj_conf = init_object_config(comp, sc)
         sc.config = obj_conf
         sc.save()
-        update_hierarchy_issues(sc)
 
 
 def get_license(proto: Prototype) -> str | None:
@@ -546,8 +586,8 @@ def update_obj_config(obj_conf, conf, attr, desc="") -> ConfigLog:
     new_conf = check_json_config(proto, group or obj, conf, old_conf.config, attr, old_conf.attr)
     with transaction.atomic():
         cl = save_obj_config(obj_conf, new_conf, attr, desc)
-        update_hierarchy_issues(obj)
-        re_apply_object_policy(obj)
+        update_object_issues(obj, CONFIG_CHANGE)
+        re_apply_object_policy(obj, [obj])
 
     if group is not None:
         post_event("change_config", "group-config", group.pk, "version", str(cl.pk))
@@ -597,19 +637,43 @@ def check_sub_key(hc_in):
             raise_adcm_ex("INVALID_INPUT", f"duplicate ({item}) in host service list")
 
 
+def _raise_not_found(model, **kwargs):
+    raise_adcm_ex(model.__error_code__, f"{model.__name__} {kwargs} does not exist")
+
+
 def make_host_comp_list(cluster, hc_in):
+    hosts = Host.objects.in_bulk({item["host_id"] for item in hc_in})
+    services = (
+        ClusterObject.objects.filter(cluster=cluster)
+        .select_related("prototype")
+        .in_bulk({item["service_id"] for item in hc_in})
+    )
+    components = (
+        ServiceComponent.objects.filter(cluster=cluster)
+        .select_related("prototype")
+        .in_bulk({item["component_id"] for item in hc_in})
+    )
     host_comp_list = []
     for item in hc_in:
-        host = Host.obj.get(pk=item["host_id"])
-        service = ClusterObject.obj.get(pk=item["service_id"], cluster=cluster)
-        comp = ServiceComponent.obj.get(pk=item["component_id"], cluster=cluster, service=service)
-        if not host.cluster:
+        host = hosts.get(item["host_id"])
+        if host is None:
+            _raise_not_found(Host, pk=item["host_id"])
+
+        service = services.get(item["service_id"])
+        if service is None:
+            _raise_not_found(ClusterObject, pk=item["service_id"], cluster=cluster)
+
+        comp = components.get(item["component_id"])
+        if comp is None or comp.service_id != service.pk:
+            _raise_not_found(ServiceComponent, pk=item["component_id"], cluster=cluster, service=service)
+
+        if not host.cluster_id:
             raise_adcm_ex("FOREIGN_HOST", f"host #{host.pk} {host.fqdn} does not belong to any cluster")
 
-        if host.cluster.pk != cluster.pk:
+        if host.cluster_id != cluster.pk:
             raise_adcm_ex(
                 "FOREIGN_HOST",
-                f"host {host.fqdn} (cluster #{host.cluster.pk}) does not belong to cluster #{cluster.pk}",
+                f"host {host.fqdn} (cluster #{host.cluster_id}) does not belong to cluster #{cluster.pk}",
             )
 
         host_comp_list.append((service, host, comp))
@@ -620,89 +684,140 @@ def make_host_comp_list(cluster, hc_in):
 def check_hc(cluster, hc_in):
     check_sub_key(hc_in)
     host_comp_list = make_host_comp_list(cluster, hc_in)
-    for service in ClusterObject.objects.filter(cluster=cluster):
-        check_component_constraint(cluster, service.prototype, [i for i in host_comp_list if i[0] == service])
-
-    check_component_requires(host_comp_list)
-    check_bound_components(host_comp_list)
+    check_hc_constraints(cluster, host_comp_list)
     check_maintenance_mode(cluster, host_comp_list)
 
     return host_comp_list
 
 
 def check_maintenance_mode(cluster, host_comp_list):
+    current = set(HostComponent.objects.filter(cluster=cluster).values_list("service_id", "host_id", "component_id"))
     for (service, host, comp) in host_comp_list:
-        try:
-            HostComponent.objects.get(cluster=cluster, service=service, host=host, component=comp)
-        except HostComponent.DoesNotExist:
-            if host.maintenance_mode == MaintenanceMode.ON:
-                raise_adcm_ex("INVALID_HC_HOST_IN_MM")
+        if (service.pk, host.pk, comp.pk) not in current and host.maintenance_mode == MaintenanceMode.ON:
+            raise_adcm_ex("INVALID_HC_HOST_IN_MM")
+
+
+class HostComponentDiff:
+    """Difference between current hostcomponent map of cluster and the new one"""
+
+    def __init__(self, cluster: Cluster, host_comp_list: list[tuple[ClusterObject, Host, ServiceComponent]]):
+        current = {
+            (hc.service_id, hc.host_id, hc.component_id): hc
+            for hc in HostComponent.objects.filter(cluster=cluster).select_related("service", "host", "component")
+        }
+        self.added = []
+        self.kept = []
+        new_keys = set()
+        for (service, host, comp) in host_comp_list:
+            key = (service.pk, host.pk, comp.pk)
+            if key in new_keys:
+                continue
 
+            new_keys.add(key)
+            if key in current:
+                self.kept.append(current[key])
+            else:
+                self.added.append(HostComponent(cluster=cluster, service=service, host=host, component=comp))
 
-def still_existed_hc(cluster, host_comp_list):
-    result = []
-    for (service, host, comp) in host_comp_list:
-        try:
-            existed_hc = HostComponent.objects.get(cluster=cluster, service=service, host=host, component=comp)
-            result.append(existed_hc)
-        except HostComponent.DoesNotExist:
-            continue
+        self.removed = [hc for key, hc in current.items() if key not in new_keys]
 
-    return result
+    @property
+    def changed(self) -> list[HostComponent]:
+        return self.added + self.removed
 
+    @property
+    def old_hosts(self) -> set[Host]:
+        return {hc.host for hc in self.kept + self.removed}
 
-def save_hc(cluster, host_comp_list):
-    # pylint: disable=too-many-locals
+    @property
+    def new_hosts(self) -> set[Host]:
+        return {hc.host for hc in self.kept + self.added}
 
-    hc_queryset = HostComponent.objects.filter(cluster=cluster)
-    service_map = {hc.service for hc in hc_queryset}
-    old_hosts = {i.host for i in hc_queryset.select_related("host").all()}
-    new_hosts = {i[1] for i in host_comp_list}
+
+def _remove_hosts_from_group_configs(hc_diff: HostComponentDiff) -> None:
+    """
+    Remove hosts from group configs of components they are not mapped to anymore
+    and from group configs of services which have no components on them anymore
+    """
+    if not hc_diff.removed:
+        return
+
+    service_type = ContentType.objects.get_for_model(ClusterObject)
+    component_type = ContentType.objects.get_for_model(ServiceComponent)
+    remaining_service_hosts = {(hc.service_id, hc.host_id) for hc in hc_diff.kept + hc_diff.added}
+    outdated = {(component_type.pk, hc.component_id, hc.host_id) for hc in hc_diff.removed}
+    outdated.update(
+        (service_type.pk, hc.service_id, hc.host_id)
+        for hc in hc_diff.removed
+        if (hc.service_id, hc.host_id) not in remaining_service_hosts
+    )
+
+    through = GroupConfig.hosts.through
+    links = through.objects.filter(
+        host_id__in={hc.host_id for hc in hc_diff.removed},
+        groupconfig__object_type__in=(service_type, component_type),
+        groupconfig__object_id__in={object_id for _, object_id, _ in outdated},
+    ).values_list("pk", "groupconfig_id", "groupconfig__object_type_id", "groupconfig__object_id", "host_id")
+    removed_links = []
+    removed_hosts = {}
+    for link_id, group_config_id, object_type_id, object_id, host_id in links:
+        if (object_type_id, object_id, host_id) in outdated:
+            removed_links.append(link_id)
+            removed_hosts.setdefault(group_config_id, set()).add(host_id)
+
+    if not removed_links:
+        return
+
+    through.objects.filter(pk__in=removed_links).delete()
+    for group_config in GroupConfig.objects.filter(pk__in=removed_hosts):
+        m2m_changed.send(
+            sender=through,
+            instance=group_config,
+            action="post_remove",
+            reverse=False,
+            model=Host,
+            pk_set=removed_hosts[group_config.pk],
+            using=through.objects.db,
+        )
+
+
+def save_hc(cluster, host_comp_list):
+    hc_diff = HostComponentDiff(cluster, host_comp_list)
+    old_hosts = hc_diff.old_hosts
+    new_hosts = hc_diff.new_hosts
     for removed_host in old_hosts.difference(new_hosts):
         removed_host.remove_from_concerns(ctx.lock)
 
     for added_host in new_hosts.difference(old_hosts):
         added_host.add_to_concerns(ctx.lock)
 
-    still_hc = still_existed_hc(cluster, host_comp_list)
-    host_service_of_still_hc = {(hc.host, hc.service) for hc in still_hc}
-    for removed_hc in set(hc_queryset) - set(still_hc):
-        groupconfigs = GroupConfig.objects.filter(
-            object_type__model__in=["clusterobject", "servicecomponent"], hosts=removed_hc.host
-        )
-        for gc in groupconfigs:
-            if (gc.object_type.model == "clusterobject") and (
-                (removed_hc.host, removed_hc.service) in host_service_of_still_hc
-            ):
-                continue
-
-            gc.hosts.remove(removed_hc.host)
+    _remove_hosts_from_group_configs(hc_diff)
+    with defer_maintenance_mode_update():
+        HostComponent.objects.filter(pk__in=[hc.pk for hc in hc_diff.removed]).delete()
+        HostComponent.objects.bulk_create(hc_diff.added)
+        reset_hierarchy_cache()
+        update_maintenance_mode(cluster.pk)
 
-    hc_queryset.delete()
-    result = []
-    for proto, host, comp in host_comp_list:
-        hc = HostComponent(
-            cluster=cluster,
-            service=proto,
-            host=host,
-            component=comp,
-        )
-        hc.save()
-        result.append(hc)
+    saved = {
+        (hc.service_id, hc.host_id, hc.component_id): hc
+        for hc in HostComponent.objects.filter(cluster=cluster).select_related("service")
+    }
+    result = [saved[(service.pk, host.pk, comp.pk)] for (service, host, comp) in host_comp_list]
 
     ctx.event.send_state()
     post_event("change_hostcomponentmap", "cluster", cluster.pk)
-    update_hierarchy_issues(cluster)
-    for provider in [host.provider for host in Host.objects.filter(cluster=cluster)]:
-        update_hierarchy_issues(provider)
-
-    update_issue_after_deleting()
-    load_service_map()
-    for service in service_map:
-        re_apply_object_policy(service)
-
-    for hc in result:
-        re_apply_object_policy(hc.service)
+    changed_hosts = {hc.host_id for hc in hc_diff.changed}
+    issues = DirtyIssues()
+    issues.mark_hierarchy(cluster, HOST_COMPONENT_CHANGE)
+    for provider in HostProvider.objects.filter(host__in=changed_hosts).distinct():
+        issues.mark_hierarchy(provider, HIERARCHY_CHANGE)
+    issues.recheck()
+
+    update_issue_after_deleting([cluster, *Host.objects.filter(pk__in=changed_hosts)])
+    load_service_map([cluster.pk])
+    changed_objects = {hc.service for hc in hc_diff.changed} | {hc.component for hc in hc_diff.changed}
+    for policy in get_policies_for_objects(changed_objects):
+        policy.apply(changed_objects={hc.host for hc in hc_diff.changed})
 
     return result
 
@@ -923,7 +1038,7 @@ def multi_bind(cluster, service, bind_list):
             cb.save()
             logger.info("bind %s to %s", obj_ref(export_obj), obj_ref(import_obj))
 
-        update_hierarchy_issues(cluster)
+        update_hierarchy_issues(cluster, BIND_CHANGE)
 
     return get_import(cluster, service)
 
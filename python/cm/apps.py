@@ -37,6 +37,8 @@ class CmConfig(AppConfig):
     def ready(self):
         # pylint: disable-next=import-outside-toplevel,unused-import
         from cm.signals import (
+            hierarchy_change,
+            hierarchy_request_started,
             m2m_change,
             mark_deleted_audit_object_handler,
             model_change,
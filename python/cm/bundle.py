@@ -10,7 +10,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import functools
 import hashlib
 import shutil
 import tarfile
@@ -18,11 +17,16 @@ from pathlib import Path
 
 from django.conf import settings
 from django.db import IntegrityError, transaction
-from version_utils import rpm
+from django.db.models import F, Max
 
 import cm.stack
 import cm.status_api
-from cm.adcm_config import init_object_config, proto_ref, switch_config
+from cm.adcm_config import (
+    init_object_config,
+    proto_ref,
+    reset_prototype_config_cache,
+    switch_config,
+)
 from cm.errors import raise_adcm_ex as err
 from cm.logger import logger
 from cm.models import (
@@ -46,6 +50,7 @@ from cm.models import (
     SubAction,
     Upgrade,
 )
+from cm.version import compare_versions, get_version_key
 from rbac.models import Role
 from rbac.upgrade.role import prepare_action_roles
 
@@ -75,6 +80,7 @@ def load_bundle(bundle_file):
 
     try:
         bundle = copy_stage(bundle_hash, bundle_proto)
+        reset_prototype_config_cache()
         order_versions()
         clear_stage()
         ProductCategory.re_collect()
@@ -94,6 +100,7 @@ def update_bundle(bundle):
         get_stage_bundle(bundle.name)
         second_pass()
         update_bundle_from_stage(bundle)
+        reset_prototype_config_cache()
         order_versions()
         clear_stage()
     except:
@@ -102,21 +109,18 @@ def update_bundle(bundle):
 
 
 def order_model_versions(model):
-    items = []
-    for obj in model.objects.all():
-        items.append(obj)
-    ver = ""
-    count = 0
-    for obj in sorted(
-        items,
-        key=functools.cmp_to_key(lambda obj1, obj2: rpm.compare_versions(obj1.version, obj2.version)),
-    ):
-        if ver != obj.version:
-            count += 1
-        obj.version_order = count
-        ver = obj.version
-    # Update all table in one time. That is much faster than one by one method
-    model.objects.bulk_update(items, ["version_order"])
+    """
+    Set `version_order` of new objects (which have it 0) to place them among already ordered ones by version key.
+    Orders of objects with newer versions are shifted in DB instead of re-sorting all objects
+    """
+    ordered = model.objects.exclude(version_order=0)
+    for version_key in sorted(set(model.objects.filter(version_order=0).values_list("version_key", flat=True))):
+        order = ordered.filter(version_key=version_key).values_list("version_order", flat=True).first()
+        if order is None:
+            previous = ordered.filter(version_key__lt=version_key).aggregate(order=Max("version_order"))["order"]
+            order = (previous or 0) + 1
+            ordered.filter(version_key__gt=version_key).update(version_order=F("version_order") + 1)
+        model.objects.filter(version_order=0, version_key=version_key).update(version_order=order)
 
 
 def order_versions():
@@ -187,6 +191,7 @@ def load_adcm():
     try:
         cm.stack.save_definition("", adcm_file, conf, {}, "adcm", True)
         process_adcm()
+        reset_prototype_config_cache()
     except:
         clear_stage()
         raise
@@ -201,7 +206,7 @@ def process_adcm():
         new_proto = adcm_stage_proto
         if old_proto.version == new_proto.version:
             logger.debug("adcm vesrion %s, skip upgrade", old_proto.version)
-        elif rpm.compare_versions(old_proto.version, new_proto.version) < 0:
+        elif compare_versions(old_proto.version, new_proto.version) < 0:
             bundle = copy_stage("adcm", adcm_stage_proto)
             upgrade_adcm(adcm[0], bundle)
         else:
@@ -226,7 +231,7 @@ def init_adcm(bundle):
 def upgrade_adcm(adcm, bundle):
     old_proto = adcm.prototype
     new_proto = Prototype.objects.get(type="adcm", bundle=bundle)
-    if rpm.compare_versions(old_proto.version, new_proto.version) >= 0:
+    if compare_versions(old_proto.version, new_proto.version) >= 0:
         msg = "Current adcm version {} is more than or equal to upgrade version {}"
         err("UPGRADE_ERROR", msg.format(old_proto.version, new_proto.version))
     with transaction.atomic():
@@ -413,6 +418,7 @@ def copy_stage_prototype(stage_prototypes, bundle):
                 "allow_maintenance_mode",
             ),
         )
+        proto.version_key = get_version_key(proto.version)
         if proto.license_path:
             proto.license = "unaccepted"
             if check_license(proto):
@@ -554,6 +560,7 @@ def copy_stage_component(stage_components, stage_proto, prototype, bundle):
                 "venv",
             ),
         )
+        comp.version_key = get_version_key(comp.version)
         comp.bundle = bundle
         comp.parent = prototype
         componets.append(comp)
@@ -864,6 +871,7 @@ def delete_bundle(bundle):
             )
     bundle_id = bundle.id
     bundle.delete()
+    reset_prototype_config_cache()
     for role in Role.objects.filter(class_name="ParentRole"):
         if not role.child.all():
             role.delete()
@@ -883,7 +891,7 @@ def check_services():
 def check_adcm_version(bundle):
     if not bundle.adcm_min_version:
         return
-    if rpm.compare_versions(bundle.adcm_min_version, settings.ADCM_VERSION) > 0:
+    if compare_versions(bundle.adcm_min_version, settings.ADCM_VERSION) > 0:
         msg = "This bundle required ADCM version equal to {} or newer."
         err("BUNDLE_VERSION_ERROR", msg.format(bundle.adcm_min_version))
 
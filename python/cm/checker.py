@@ -28,7 +28,11 @@
 #
 # pylint: disable=W0212
 
+from collections.abc import Hashable
+from typing import Any, Callable, List, Optional, Tuple
+
 import ruyaml
+import yaml
 
 
 def round_trip_load(stream, version=None, preserve_quotes=None, allow_duplicate_keys=False):
@@ -55,6 +59,77 @@ def round_trip_load(stream, version=None, preserve_quotes=None, allow_duplicate_
             pass
 
 
+class FastLoadError(Exception):
+    pass
+
+
+class FastLoader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+    """
+    Loader of PyYAML (C accelerated when libyaml is available) which resolves and orders data of YAML 1.1
+    document the way round_trip_load() does, documents which it can't load the same way are failed
+    """
+
+    bool_values = {**yaml.SafeLoader.bool_values, 'y': True, 'n': False}
+    yaml_implicit_resolvers = {}
+
+    def construct_mapping(self, node, deep=False):
+        # keys of mapping go before keys merged into it as round_trip_load() orders them
+        mapping = {}
+        merged = []
+        for key_node, value_node in node.value:
+            if key_node.tag == 'tag:yaml.org,2002:merge':
+                merged.append(value_node)
+                continue
+
+            key = self.construct_object(key_node, deep=deep)
+            if key in mapping:
+                raise FastLoadError(f'Duplicate key "{key}"')
+            mapping[key] = self.construct_object(value_node, deep=deep)
+
+        for value_node in merged:
+            sources = value_node.value if isinstance(value_node, yaml.SequenceNode) else [value_node]
+            for source in sources:
+                if not isinstance(source, yaml.MappingNode):
+                    raise FastLoadError(f'Merged value should be a map, not {source.id}')
+                for key, value in self.construct_object(source, deep=True).items():
+                    mapping.setdefault(key, value)
+
+        return mapping
+
+    def construct_yaml_timestamp(self, node):
+        value = super().construct_yaml_timestamp(node)
+        if getattr(value, 'tzinfo', None) is not None:
+            self.construct_unsupported(node)
+
+        return value
+
+    def construct_unsupported(self, node):
+        raise FastLoadError(f'Value of tag {node.tag} is loaded differently by round_trip_load(){node.start_mark}')
+
+
+for _versions, _tag, _regexp, _first in ruyaml.resolver.implicit_resolvers:
+    if (1, 1) in _versions:
+        FastLoader.add_implicit_resolver(_tag, _regexp, _first)
+
+FastLoader.add_constructor('tag:yaml.org,2002:timestamp', FastLoader.construct_yaml_timestamp)
+for _tag in ('omap', 'pairs', 'set'):
+    FastLoader.add_constructor(f'tag:yaml.org,2002:{_tag}', FastLoader.construct_unsupported)
+
+
+def fast_load(stream):
+    """
+    Parse YAML document in a stream several times faster than round_trip_load() does.
+
+    FastLoadError is raised for any document which round_trip_load() with allowed duplicate keys
+    could load differently (duplicate keys, reused anchors) or fail to load. Such document should be
+    loaded with round_trip_load() to get the same data or error
+    """
+    try:
+        return yaml.load(stream, Loader=FastLoader)
+    except (yaml.YAMLError, ValueError, TypeError) as e:
+        raise FastLoadError(str(e)) from e
+
+
 class FormatError(Exception):
     def __init__(self, path, message, data=None, rule=None, parent=None, caused_by=None):
         self.path = path
@@ -94,109 +169,202 @@ def check_match_type(match, data, data_type, path, rule, parent=None):
         raise FormatError(path, msg, data, rule, parent)
 
 
-def match_none(data, rules, rule, path, parent=None, is_service=False):
-    if data is not None:
-        msg = 'Object should be empty'
-        if path:
-            last = path[-1]
-            msg = f'{last[0]} "{last[1]}" should be empty'
-        raise FormatError(path, msg, data, rule, parent)
+Path = Optional[Tuple["Path", Tuple[str, Any]]]
 
 
-def match_any(data, rules, rule, path, parent=None, is_service=False):
-    pass
+def _get_path(path: Path) -> List[Tuple[str, Any]]:
+    """Path of data node is linked through parents' paths while data is valid, it's unwound only for errors"""
+    steps = []
+    while path is not None:
+        path, step = path
+        steps.append(step)
+    steps.reverse()
+    return steps
 
 
-def match_list(data, rules, rule, path, parent=None, is_service=False):
-    check_match_type('match_list', data, list, path, rule, parent)
-    for i, v in enumerate(data):
-        process_rule(v, rules, rules[rule]['item'], path + [('Value of list index', i)], parent, is_service)
-    return True
+class Schema:
+    """
+    YSpec rules compiled to tree of closures. Each rule is looked up and checked once on compilation
+    instead of on every node of data, errors are reported the same way in any case.
+    Closure of rule takes data node, path, parent node and flag of being inside service definition
+    """
 
+    def __init__(self, rules):
+        self.rules = rules
+        self._compiled = {}
+        self.validate_root = self.get_validator('root')
 
-def match_dict(data, rules, rule, path, parent=None, is_service=False):
-    check_match_type('match_dict', data, dict, path, rule, parent)
+    def validate(self, data) -> None:
+        self.validate_root(data, None, None, False)
 
-    if is_service is False:
-        is_service = data.get("type") == "service"
+    def check(self, data) -> None:
+        """Validate data loaded by round_trip_load(), so errors are reported with line numbers"""
+        if not isinstance(data, ruyaml.comments.CommentedBase):
+            raise DataError("You should use ruyaml.round_trip_load() to parse data yaml")
+        self.validate(data)
 
-    if 'required_items' in rules[rule]:
-        for i in rules[rule]['required_items']:
-            if i not in data:
-                if is_service and i == "service":
-                    continue
+    def get_validator(self, name: str) -> Callable:
+        if name not in self._compiled:
+            self._compiled[name] = None  # rule referenced from itself is resolved after it's compiled
+            self._compiled[name] = self._compile(name)
 
-                raise FormatError(path, f'There is no required key "{i}" in map.', data, rule)
+        validator = self._compiled[name]
+        if validator is None:
+            return lambda *args: self._compiled[name](*args)
 
-    for k in data:
-        new_path = path + [('Value of map key', k)]
-        if 'items' in rules[rule] and k in rules[rule]['items']:
-            process_rule(data[k], rules, rules[rule]['items'][k], new_path, data, is_service)
-        elif 'default_item' in rules[rule]:
-            process_rule(data[k], rules, rules[rule]['default_item'], new_path, data, is_service)
-        else:
-            msg = f'Map key "{k}" is not allowed here (rule "{rule}")'
+        return validator
 
-            raise FormatError(path, msg, data, rule)
+    def _compile(self, name: str) -> Callable:
+        # errors of schema are raised on validation as they would be without compilation
+        def schema_error(msg):
+            def raise_schema_error(data, path, parent, is_service):
+                raise SchemaError(msg)
 
+            return raise_schema_error
 
-def match_dict_key_selection(data, rules, rule, path, parent=None, is_service=False):
-    check_match_type('dict_key_selection', data, dict, path, rule, parent)
-    key = rules[rule]['selector']
-    if key not in data:
-        msg = f'There is no key "{key}" in map.'
-        raise FormatError(path, msg, data, rule, parent)
-    value = data[key]
-    if value in rules[rule]['variants']:
-        process_rule(data, rules, rules[rule]['variants'][value], path, parent, is_service)
-    elif 'default_variant' in rule:
-        process_rule(data, rules, rules[rule]['default_variant'], path, parent, is_service)
-    else:
-        msg = f'Value "{value}" is not allowed for map key "{key}".'
-        raise FormatError(path, msg, data, rule, parent)
+        if name not in self.rules:
+            return schema_error(f"There is no rule {name} in schema.")
 
+        rule = self.rules[name]
+        if 'match' not in rule:
+            return schema_error(f"There is no mandatory match attr in rule {rule} in schema.")
 
-def match_one_of(data, rules, rule, path, parent=None, is_service=False):
-    errors = []
-    sub_errors = []
-    for obj in rules[rule]['variants']:
-        try:
-            process_rule(data, rules, obj, path, parent, is_service)
-        except FormatError as e:
-            if e.errors:
-                sub_errors += e.errors
-            errors.append(e)
-    if len(errors) == len(rules[rule]['variants']):
-        errors += sub_errors
-        msg = f'None of the variants for rule "{rule}" match'
-        raise FormatError(path, msg, data, rule, parent, caused_by=errors)
-
-
-def match_set(data, rules, rule, path, parent=None, is_service=False):
-    if data not in rules[rule]['variants']:
-        msg = f'Value "{data}" not in set {rules[rule]["variants"]}'
-        raise FormatError(path, msg, data, rule, parent=parent)
-
-
-def match_simple_type(obj_type):
-    def match(data, rules, rule, path, parent=None, is_service=False):
-        check_type(data, obj_type, path, rule, parent=parent)
-
-    return match
-
-
-MATCH = {
-    'list': match_list,
-    'dict': match_dict,
-    'one_of': match_one_of,
-    'dict_key_selection': match_dict_key_selection,
-    'set': match_set,
-    'string': match_simple_type(str),
-    'bool': match_simple_type(bool),
-    'int': match_simple_type(int),
-    'float': match_simple_type(float),
-    'none': match_none,
-    'any': match_any,
+        match = rule['match']
+        if match in SIMPLE_TYPES:
+            return self._compile_simple_type(name, SIMPLE_TYPES[match])
+
+        compile_match = getattr(self, f'_compile_{match}', None)
+        if compile_match is None:
+            return schema_error(f"Unknown match {match} from schema. Impossible to handle that.")
+
+        return compile_match(name, rule)
+
+    @staticmethod
+    def _compile_simple_type(name, obj_type):
+        def match(data, path, parent, is_service):
+            if not isinstance(data, obj_type):
+                check_type(data, obj_type, _get_path(path), name, parent=parent)
+
+        return match
+
+    @staticmethod
+    def _compile_none(name, rule):
+        def match(data, path, parent, is_service):
+            if data is not None:
+                path = _get_path(path)
+                msg = 'Object should be empty'
+                if path:
+                    last = path[-1]
+                    msg = f'{last[0]} "{last[1]}" should be empty'
+                raise FormatError(path, msg, data, name, parent)
+
+        return match
+
+    @staticmethod
+    def _compile_any(name, rule):
+        def match(data, path, parent, is_service):
+            pass
+
+        return match
+
+    def _compile_list(self, name, rule):
+        item = self.get_validator(rule['item'])
+
+        def match(data, path, parent, is_service):
+            if not isinstance(data, list):
+                check_match_type('match_list', data, list, _get_path(path), name, parent)
+            for i, v in enumerate(data):
+                item(v, (path, ('Value of list index', i)), parent, is_service)
+
+        return match
+
+    def _compile_dict(self, name, rule):
+        required_items = list(rule.get('required_items', ()))
+        items = {key: self.get_validator(item) for key, item in rule.get('items', {}).items()}
+        default_item = self.get_validator(rule['default_item']) if 'default_item' in rule else None
+
+        def match(data, path, parent, is_service):
+            if not isinstance(data, dict):
+                check_match_type('match_dict', data, dict, _get_path(path), name, parent)
+
+            if is_service is False:
+                is_service = data.get("type") == "service"
+
+            for i in required_items:
+                if i not in data:
+                    if is_service and i == "service":
+                        continue
+
+                    raise FormatError(_get_path(path), f'There is no required key "{i}" in map.', data, name)
+
+            for k in data:
+                validator = items.get(k, default_item)
+                if validator is None:
+                    msg = f'Map key "{k}" is not allowed here (rule "{name}")'
+
+                    raise FormatError(_get_path(path), msg, data, name)
+
+                validator(data[k], (path, ('Value of map key', k)), data, is_service)
+
+        return match
+
+    def _compile_dict_key_selection(self, name, rule):
+        key = rule['selector']
+        variants = {value: self.get_validator(variant) for value, variant in rule['variants'].items()}
+        default_variant = self.get_validator(rule['default_variant']) if 'default_variant' in name else None
+
+        def match(data, path, parent, is_service):
+            if not isinstance(data, dict):
+                check_match_type('dict_key_selection', data, dict, _get_path(path), name, parent)
+            if key not in data:
+                msg = f'There is no key "{key}" in map.'
+                raise FormatError(_get_path(path), msg, data, name, parent)
+            value = data[key]
+            validator = variants.get(value, default_variant) if isinstance(value, Hashable) else default_variant
+            if validator is None:
+                msg = f'Value "{value}" is not allowed for map key "{key}".'
+                raise FormatError(_get_path(path), msg, data, name, parent)
+            validator(data, path, parent, is_service)
+
+        return match
+
+    def _compile_one_of(self, name, rule):
+        variants = [self.get_validator(variant) for variant in rule['variants']]
+
+        def match(data, path, parent, is_service):
+            errors = []
+            sub_errors = []
+            for variant in variants:
+                try:
+                    variant(data, path, parent, is_service)
+                except FormatError as e:
+                    if e.errors:
+                        sub_errors += e.errors
+                    errors.append(e)
+            if len(errors) == len(variants):
+                errors += sub_errors
+                msg = f'None of the variants for rule "{name}" match'
+                raise FormatError(_get_path(path), msg, data, name, parent, caused_by=errors)
+
+        return match
+
+    @staticmethod
+    def _compile_set(name, rule):
+        variants = rule['variants']
+
+        def match(data, path, parent, is_service):
+            if data not in variants:
+                msg = f'Value "{data}" not in set {variants}'
+                raise FormatError(_get_path(path), msg, data, name, parent=parent)
+
+        return match
+
+
+SIMPLE_TYPES = {
+    'string': str,
+    'bool': bool,
+    'int': int,
+    'float': float,
 }
 
 
@@ -210,24 +378,9 @@ def check_rule(rules):
     return True, ''
 
 
-def process_rule(data, rules, name, path=None, parent=None, is_service=False):
-    if path is None:
-        path = []
-    if name not in rules:
-        raise SchemaError(f"There is no rule {name} in schema.")
-    rule = rules[name]
-    if 'match' not in rule:
-        raise SchemaError(f"There is no mandatory match attr in rule {rule} in schema.")
-    match = rule['match']
-    if match not in MATCH:
-        raise SchemaError(f"Unknown match {match} from schema. Impossible to handle that.")
-
-    MATCH[match](data, rules, name, path=path, parent=parent, is_service=is_service)
-
-
 def check(data, rules):
     if not isinstance(data, ruyaml.comments.CommentedBase):
         raise DataError("You should use ruyaml.round_trip_load() to parse data yaml")
     if not isinstance(rules, ruyaml.comments.CommentedBase):
         raise SchemaError("You should use ruyaml.round_trip_load() to parse schema yaml")
-    process_rule(data, rules, 'root')
+    Schema(rules).check(data)
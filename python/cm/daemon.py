@@ -83,6 +83,7 @@ class Daemon:
         atexit.register(self.delpid)
         pid = str(os.getpid())
         pidfile.write(f"{pid}\n")
+        pidfile.close()
 
     def delpid(self):
         os.remove(self.pidfile)
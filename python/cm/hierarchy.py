@@ -10,17 +10,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Optional, Set, Tuple
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from cm.models import (
     ADCMEntity,
+    Cluster,
     ClusterObject,
     Host,
     HostComponent,
+    HostProvider,
     MaintenanceMode,
     ServiceComponent,
 )
 
+NodeKey = Tuple[str, int]
+ROOT_KEY = ('root', 0)
+
 
 class HierarchyError(Exception):
     def __init__(self, *args, **kwargs):
@@ -36,9 +43,13 @@ class Node:
 
     order = ('root', 'cluster', 'service', 'component', 'host', 'provider')
 
-    def __init__(self, value: Optional[ADCMEntity]):
+    def __init__(self, value: Optional[ADCMEntity], key: Optional[NodeKey] = None):
         self.children = set()
-        if value is None:  # tree virtual root
+        if key is not None and key != ROOT_KEY:  # value is going to be loaded later
+            self.type, self.id = key
+            self.value = value
+            self.parents = set()
+        elif value is None:  # tree virtual root
             self.id = 0
             self.type = 'root'
             self.value = None
@@ -76,14 +87,14 @@ class Node:
         return result
 
     @staticmethod
-    def get_obj_key(obj: ADCMEntity) -> Tuple[str, int]:
+    def get_obj_key(obj: ADCMEntity) -> NodeKey:
         """Make simple unique key for caching in tree"""
         if obj is None:
-            return 'root', 0
+            return ROOT_KEY
         return obj.prototype.type, obj.pk
 
     @property
-    def key(self) -> Tuple[str, int]:
+    def key(self) -> NodeKey:
         """Simple key unique in tree"""
         return self.type, self.id
 
@@ -94,94 +105,334 @@ class Node:
         return self.key == other.key
 
 
+def _effective_maintenance_mode(own_mode: str, host_modes: List[str], parent_mode: str = MaintenanceMode.OFF) -> str:
+    if own_mode != MaintenanceMode.OFF:
+        return own_mode
+    if parent_mode == MaintenanceMode.ON:
+        return parent_mode
+    if host_modes:
+        return MaintenanceMode.ON if all(mode == MaintenanceMode.ON for mode in host_modes) else MaintenanceMode.OFF
+    return own_mode
+
+
+def get_effective_maintenance_modes(cluster_id: int) -> Dict[NodeKey, Tuple[str, str]]:
+    """
+    Calculate maintenance mode of cluster services and components derived from their own, service's and hosts' ones
+    Result is a map of node key to pair of calculated and currently stored modes
+    """
+    services = {
+        service_id: (own_mode, stored_mode)
+        for service_id, own_mode, stored_mode in ClusterObject.objects.filter(cluster_id=cluster_id).values_list(
+            'id', '_maintenance_mode', 'effective_maintenance_mode'
+        )
+    }
+    components = {
+        component_id: (service_id, own_mode, stored_mode)
+        for component_id, service_id, own_mode, stored_mode in ServiceComponent.objects.filter(
+            cluster_id=cluster_id
+        ).values_list('id', 'service_id', '_maintenance_mode', 'effective_maintenance_mode')
+    }
+    component_host_modes = defaultdict(list)
+    for component_id, host_mode in HostComponent.objects.filter(cluster_id=cluster_id).values_list(
+        'component_id', 'host__maintenance_mode'
+    ):
+        component_host_modes[component_id].append(host_mode)
+
+    service_components = defaultdict(list)
+    for component_id, (service_id, _, _) in components.items():
+        service_components[service_id].append(component_id)
+
+    result = {}
+    for service_id, (own_mode, stored_mode) in services.items():
+        component_ids = service_components[service_id]
+        if own_mode == MaintenanceMode.OFF and component_ids:
+            if all(components[component_id][1] == MaintenanceMode.ON for component_id in component_ids):
+                result[('service', service_id)] = MaintenanceMode.ON, stored_mode
+                continue
+        host_modes = [mode for component_id in component_ids for mode in component_host_modes[component_id]]
+        result[('service', service_id)] = _effective_maintenance_mode(own_mode, host_modes), stored_mode
+
+    for component_id, (service_id, own_mode, stored_mode) in components.items():
+        result[('component', component_id)] = (
+            _effective_maintenance_mode(
+                own_mode, component_host_modes[component_id], services.get(service_id, (MaintenanceMode.OFF,))[0]
+            ),
+            stored_mode,
+        )
+
+    return result
+
+
+class MaintenanceModeUpdater:
+    """Stores derived maintenance mode of services and components, updates could be deferred to run once per cluster"""
+
+    def __init__(self):
+        self.deferred: Optional[Set[int]] = None
+
+    def update(self, cluster_id: int) -> Dict[NodeKey, str]:
+        if self.deferred is not None:
+            self.deferred.add(cluster_id)
+            return {}
+
+        modes = {}
+        changed = defaultdict(lambda: defaultdict(list))
+        for (node_type, node_id), (mode, stored_mode) in get_effective_maintenance_modes(cluster_id).items():
+            modes[(node_type, node_id)] = mode
+            if mode != stored_mode:
+                changed[node_type][mode].append(node_id)
+
+        for node_type, ids_by_mode in changed.items():
+            model = ClusterObject if node_type == 'service' else ServiceComponent
+            for mode, ids in ids_by_mode.items():
+                model.objects.filter(pk__in=ids).update(effective_maintenance_mode=mode)
+        if changed:
+            _cache.reset()
+
+        return modes
+
+    @contextmanager
+    def defer(self):
+        if self.deferred is not None:
+            yield
+            return
+
+        self.deferred = set()
+        try:
+            yield
+        except BaseException:
+            # changes are rolled back or left inconsistent, queries of updates would hide the original error
+            self.deferred = None
+            raise
+
+        cluster_ids, self.deferred = self.deferred, None
+        for cluster_id in sorted(cluster_ids):
+            self.update(cluster_id)
+
+
+class ClusterHierarchy:
+    """
+    Adjacency lists of cluster, its services, components and hosts loaded with a few bulk queries.
+    `children` links are unconditional, `parents` links skip objects in maintenance mode like `Tree` does
+    """
+
+    def __init__(self, cluster_id: int):
+        self.cluster_id = cluster_id
+        self.children: Dict[NodeKey, List[NodeKey]] = defaultdict(list)
+        self.parents: Dict[NodeKey, List[NodeKey]] = defaultdict(list)
+        self.members: Set[NodeKey] = set()
+
+        cluster_key = ('cluster', cluster_id)
+        self.parents[cluster_key].append(ROOT_KEY)
+
+        for service_id, service_mode in ClusterObject.objects.filter(cluster_id=cluster_id).values_list(
+            'id', 'effective_maintenance_mode'
+        ):
+            service_key = ('service', service_id)
+            self.members.add(service_key)
+            self.children[cluster_key].append(service_key)
+            if service_mode == MaintenanceMode.OFF:
+                self.parents[service_key].append(cluster_key)
+
+        for component_id, service_id, component_mode in ServiceComponent.objects.filter(
+            cluster_id=cluster_id
+        ).values_list('id', 'service_id', 'effective_maintenance_mode'):
+            component_key = ('component', component_id)
+            service_key = ('service', service_id)
+            self.members.add(component_key)
+            self.children[service_key].append(component_key)
+            if component_mode == MaintenanceMode.OFF:
+                self.parents[component_key].append(service_key)
+
+        for host_id, component_id, host_mode in HostComponent.objects.filter(cluster_id=cluster_id).values_list(
+            'host_id', 'component_id', 'host__maintenance_mode'
+        ):
+            component_key = ('component', component_id)
+            host_key = ('host', host_id)
+            self.members.add(host_key)
+            self.children[component_key].append(host_key)
+            if host_mode != MaintenanceMode.ON:
+                self.parents[host_key].append(component_key)
+
+
+class ProviderHierarchy:
+    """Adjacency lists of host provider and its hosts"""
+
+    def __init__(self, provider_id: int):
+        provider_key = ('provider', provider_id)
+        self.host_clusters = dict(Host.objects.filter(provider_id=provider_id).values_list('id', 'cluster_id'))
+        self.children = {provider_key: [('host', host_id) for host_id in self.host_clusters]}
+        self.parents = self.children
+
+
+class HierarchyCache:
+    """
+    In-process cache of cluster and provider hierarchies used to build `Tree` without a query per node.
+    It is reset on any change of hierarchy objects (see cm.signals), `version` is increased on every reset
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._clusters: Dict[int, ClusterHierarchy] = {}
+        self._providers: Dict[int, ProviderHierarchy] = {}
+        self._object_clusters: Dict[NodeKey, Optional[int]] = {}
+
+    def reset(self) -> None:
+        self.version += 1
+        self._clusters.clear()
+        self._providers.clear()
+        self._object_clusters.clear()
+
+    def get_cluster(self, cluster_id: int) -> ClusterHierarchy:
+        if cluster_id not in self._clusters:
+            hierarchy = ClusterHierarchy(cluster_id)
+            for key in hierarchy.members:
+                self._object_clusters[key] = cluster_id
+            self._clusters[cluster_id] = hierarchy
+        return self._clusters[cluster_id]
+
+    def get_provider(self, provider_id: int) -> ProviderHierarchy:
+        if provider_id not in self._providers:
+            hierarchy = ProviderHierarchy(provider_id)
+            for host_id, cluster_id in hierarchy.host_clusters.items():
+                self._object_clusters[('host', host_id)] = cluster_id
+            self._providers[provider_id] = hierarchy
+        return self._providers[provider_id]
+
+    def set_object_cluster(self, obj: ADCMEntity) -> None:
+        """Remember cluster of object which is not loaded as part of any hierarchy yet"""
+        key = Node.get_obj_key(obj)
+        if key[0] in ('service', 'component', 'host') and key not in self._object_clusters:
+            self._object_clusters[key] = obj.cluster_id
+
+    def _get_object_cluster(self, key: NodeKey) -> Optional[int]:
+        if key not in self._object_clusters:
+            model = {'service': ClusterObject, 'component': ServiceComponent, 'host': Host}[key[0]]
+            self._object_clusters[key] = model.objects.filter(pk=key[1]).values_list('cluster_id', flat=True).first()
+        return self._object_clusters[key]
+
+    def _get_hierarchy(self, key: NodeKey) -> ClusterHierarchy | ProviderHierarchy | None:
+        if key[0] == 'cluster':
+            return self.get_cluster(key[1])
+        if key[0] == 'provider':
+            return self.get_provider(key[1])
+        if key[0] in ('service', 'component', 'host'):
+            cluster_id = self._get_object_cluster(key)
+            if cluster_id is not None:
+                return self.get_cluster(cluster_id)
+        return None
+
+    def get_parents(self, key: NodeKey) -> Iterable[NodeKey]:
+        hierarchy = self._get_hierarchy(key)
+        if hierarchy is None:
+            return []
+        return hierarchy.parents.get(key, [])
+
+    def get_children(self, key: NodeKey) -> Iterable[NodeKey]:
+        hierarchy = self._get_hierarchy(key)
+        if hierarchy is None:
+            return []
+        return hierarchy.children.get(key, [])
+
+
+_cache = HierarchyCache()
+
+
+def reset_hierarchy_cache() -> None:
+    """Drop cached hierarchies, should be called after changes which are not tracked by cm.signals"""
+    _cache.reset()
+
+
+def get_hierarchy_cache_version() -> int:
+    """Version of cached hierarchies, caches derived from hierarchy objects are outdated when it is changed"""
+    return _cache.version
+
+
+_mm_updater = MaintenanceModeUpdater()
+
+
+def update_maintenance_mode(cluster_id: int) -> Dict[NodeKey, str]:
+    """
+    Store derived maintenance mode of cluster services and components, should be called after changes of
+    maintenance mode or hostcomponent map which are not tracked by cm.signals
+    """
+    return _mm_updater.update(cluster_id)
+
+
+def defer_maintenance_mode_update():
+    """Context manager to update maintenance mode of all clusters changed inside it once on exit"""
+    return _mm_updater.defer()
+
+
 class Tree:
     """
     Hierarchy tree class keep links and relations between its nodes like this:
         common_virtual_root -> *cluster -> *service -> *component -> *host -> provider
     """
 
-    def __init__(self, obj: ADCMEntity):
+    models = {
+        'cluster': Cluster,
+        'service': ClusterObject,
+        'component': ServiceComponent,
+        'host': Host,
+        'provider': HostProvider,
+    }
+
+    def __init__(self, obj: ADCMEntity, load_values: bool = True):
         self.root = Node(value=None)
         self._nodes = {self.root.key: self.root}
-        self.built_from = self._make_node(obj)
+        self.version = _cache.version
+        if obj is None:
+            self.built_from = self.root
+        else:
+            self.built_from = Node(value=obj)
+            self._nodes[self.built_from.key] = self.built_from
+            _cache.set_object_cluster(obj)
         self._build_tree_up(self.built_from)  # go to the root ...
         self._build_tree_down(self.root)  # ... and find all its children
+        if load_values:
+            self._load_values()
 
-    def _make_node(self, obj: ADCMEntity) -> Node:
-        cached = self._nodes.get(Node.get_obj_key(obj))
+    def _make_node(self, key: NodeKey) -> Node:
+        cached = self._nodes.get(key)
         if cached:
             return cached
         else:
-            node = Node(value=obj)
+            node = Node(value=None, key=key)
             self._nodes[node.key] = node
             return node
 
     def _build_tree_down(self, node: Node) -> None:
-        children_values = []
         if node.type == 'root':
-            children_values = [n.value for n in node.children]
-
-        if node.type == 'cluster':
-            children_values = ClusterObject.objects.filter(cluster=node.value).all()
-
-        elif node.type == 'service':
-            children_values = ServiceComponent.objects.filter(cluster=node.value.cluster, service=node.value).all()
-
-        elif node.type == 'component':
-            children_values = [
-                c.host
-                for c in HostComponent.objects.filter(
-                    cluster=node.value.service.cluster,
-                    service=node.value.service,
-                    component=node.value,
-                )
-                .select_related('host')
-                .all()
-            ]
-
-        elif node.type == 'host':
-            children_values = []
-
-        elif node.type == 'provider':
-            children_values = Host.objects.filter(provider=node.value)
-
-        for value in children_values:
-            child = self._make_node(value)
+            children_keys = [n.key for n in node.children]
+        else:
+            children_keys = _cache.get_children(node.key)
+
+        for key in children_keys:
+            child = self._make_node(key)
             node.add_child(child)
             child.add_parent(node)
             self._build_tree_down(child)
 
     def _build_tree_up(self, node: Node) -> None:
-        parent_values = []
-        if node.type == 'cluster':
-            parent_values = [None]
-        elif node.type == 'service':
-            if node.value.maintenance_mode == MaintenanceMode.OFF:
-                parent_values = [node.value.cluster]
-            else:
-                parent_values = []
-        elif node.type == 'component':
-            if node.value.maintenance_mode == MaintenanceMode.OFF:
-                parent_values = [node.value.service]
-            else:
-                parent_values = []
-        elif node.type == 'host':
-            parent_values = [
-                hc.component
-                for hc in HostComponent.objects.filter(host=node.value)
-                .exclude(host__maintenance_mode=MaintenanceMode.ON)
-                .select_related('component')
-                .all()
-            ]
-        elif node.type == 'provider':
-            parent_values = Host.objects.filter(provider=node.value).all()
-
-        for value in parent_values:
-            parent = self._make_node(value)
+        for key in _cache.get_parents(node.key):
+            parent = self._make_node(key)
             node.add_parent(parent)
             parent.add_child(node)
             self._build_tree_up(parent)
 
+    def _load_values(self) -> None:
+        """Load objects of all nodes with a query per object type"""
+        keys_by_type = defaultdict(list)
+        for node in self._nodes.values():
+            if node.value is None and node != self.root:
+                keys_by_type[node.type].append(node.id)
+        for node_type, ids in keys_by_type.items():
+            objects = self.models[node_type].objects.select_related('prototype').in_bulk(ids)
+            for pk in ids:
+                if pk not in objects:
+                    raise HierarchyError(f'Object {(node_type, pk)} does not exist')
+                self._nodes[(node_type, pk)].value = objects[pk]
+
     def get_node(self, obj: ADCMEntity) -> Node:
         """Get tree node by its object"""
         key = Node.get_obj_key(obj)
@@ -10,11 +10,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import json
+from collections import defaultdict
 from itertools import chain
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, Q
 
 from cm.adcm_config import get_prototype_config, process_config
 from cm.logger import logger
@@ -39,7 +42,7 @@ MAINTENANCE_MODE = "maintenance_mode"
 
 
 def process_config_and_attr(obj, conf, attr=None, spec=None):
-    if not spec:
+    if spec is None:
         if isinstance(obj, GroupConfig):
             prototype = obj.object.prototype
         else:
@@ -209,16 +212,16 @@ def get_host_vars(host: Host, obj):
                     }
                 }
             )
-            variables["services"][group.object.service.prototype.name][
-                group.object.prototype.name
-            ] = get_component_variables(group.object, component_config=group_config)
+            variables["services"][group.object.service.prototype.name][group.object.prototype.name] = (
+                get_component_variables(group.object, component_config=group_config)
+            )
 
             for component in ServiceComponent.objects.filter(
                 cluster=group.object.cluster, service=group.object.service
             ).exclude(pk=group.object.id):
-                variables["services"][component.service.prototype.name][
-                    component.prototype.name
-                ] = get_component_variables(component, component_config=get_group_config(component, host))
+                variables["services"][component.service.prototype.name][component.prototype.name] = (
+                    get_component_variables(component, component_config=get_group_config(component, host))
+                )
 
         else:  # HostProvider
             variables.update({"provider": get_provider_variables(group.object, provider_config=group_config)})
@@ -324,14 +327,388 @@ def get_target_host(host_id):
     return groups
 
 
-def prepare_job_inventory(obj, job_id, action, delta, action_host=None):
+def get_cluster_group_configs(cluster: Cluster):
+    content_types = ContentType.objects.get_for_models(Cluster, ClusterObject, ServiceComponent)
+    return GroupConfig.objects.filter(
+        Q(object_type=content_types[Cluster], object_id=cluster.pk)
+        | Q(
+            object_type=content_types[ClusterObject],
+            object_id__in=ClusterObject.objects.filter(cluster=cluster).values("pk"),
+        )
+        | Q(
+            object_type=content_types[ServiceComponent],
+            object_id__in=ServiceComponent.objects.filter(cluster=cluster).values("pk"),
+        )
+    )
+
+
+class ClusterInventory:
+    """
+    Inventory builder working on cluster snapshot loaded with a fixed number of bulk queries.
+
+    Hosts, services, components, host-components, group configs and current config logs are fetched
+    once, so result of `get_cluster_hosts` and `get_host_groups` is the same as of module level functions,
+    but count of queries does not depend on count of hosts in cluster
+    """
+
+    def __init__(self, cluster: Cluster):
+        self.cluster = cluster
+        self.hosts = {
+            host.pk: host
+            for host in Host.objects.filter(cluster=cluster).select_related("prototype", "config").order_by("pk")
+        }
+        self.services = {
+            service.pk: service
+            for service in ClusterObject.objects.filter(cluster=cluster)
+            .select_related("prototype", "config")
+            .order_by("pk")
+        }
+        self.components = {}
+        for component in (
+            ServiceComponent.objects.filter(cluster=cluster).select_related("prototype", "config").order_by("pk")
+        ):
+            component.cluster = cluster
+            component.service = self.services[component.service_id]
+            self.components[component.pk] = component
+
+        self.host_components = list(
+            HostComponent.objects.filter(cluster=cluster).order_by("pk").values_list("host_id", "component_id")
+        )
+        self.component_hosts = defaultdict(list)
+        for host_id, component_id in self.host_components:
+            self.component_hosts[component_id].append(host_id)
+
+        self._load_groups()
+        self._load_config_logs()
+        self._specs = {}
+        self._obj_configs = {}
+        self._group_configs = {}
+        self._variables = {}
+
+    def _load_groups(self) -> None:
+        self.groups = {}
+        for group in get_cluster_group_configs(self.cluster).select_related("config", "object_type").order_by("pk"):
+            if group.object_type.model_class() is Cluster:
+                group.object = self.cluster
+            elif group.object_type.model_class() is ClusterObject:
+                group.object = self.services[group.object_id]
+            else:
+                group.object = self.components[group.object_id]
+            self.groups[group.pk] = group
+
+        # host could be a member of only one group of the object, the last one wins as in `get_group_config`
+        self.host_groups = {}
+        for group_id, host_id in (
+            GroupConfig.hosts.through.objects.filter(groupconfig_id__in=list(self.groups))
+            .order_by("groupconfig_id")
+            .values_list("groupconfig_id", "host_id")
+        ):
+            group = self.groups[group_id]
+            self.host_groups[(host_id, group.object.prototype.type, group.object_id)] = group
+
+    def _load_config_logs(self) -> None:
+        self.config_logs = {
+            config_log.pk: config_log
+            for config_log in ConfigLog.objects.filter(
+                Q(obj_ref__cluster=self.cluster)
+                | Q(obj_ref__clusterobject__cluster=self.cluster)
+                | Q(obj_ref__servicecomponent__cluster=self.cluster)
+                | Q(obj_ref__host__cluster=self.cluster)
+                | Q(obj_ref__group_config__in=list(self.groups)),
+                id=F("obj_ref__current"),
+            )
+        }
+
+    def _get_spec(self, prototype: Prototype) -> dict:
+        if prototype.pk not in self._specs:
+            self._specs[prototype.pk], _, _, _ = get_prototype_config(prototype)
+
+        return self._specs[prototype.pk]
+
+    def _get_config_log(self, obj_config) -> ConfigLog:
+        config_log = self.config_logs.get(obj_config.current)
+        if config_log is None:
+            config_log = ConfigLog.objects.get(obj_ref=obj_config, id=obj_config.current)
+            self.config_logs[config_log.pk] = config_log
+
+        return config_log
+
+    def get_obj_config(self, obj: Cluster | ClusterObject | ServiceComponent | Host) -> dict:
+        key = (obj.prototype.type, obj.pk)
+        if key not in self._obj_configs:
+            if obj.config is None:
+                self._obj_configs[key] = {}
+            else:
+                config_log = self._get_config_log(obj.config)
+                self._obj_configs[key] = process_config_and_attr(
+                    obj, config_log.config, config_log.attr, spec=self._get_spec(obj.prototype)
+                )
+
+        return self._obj_configs[key]
+
+    def get_group_config(self, obj: Cluster | ClusterObject | ServiceComponent, host: Host) -> dict | None:
+        group = self.host_groups.get((host.pk, obj.prototype.type, obj.pk))
+        if group is None:
+            return None
+
+        if group.pk not in self._group_configs:
+            conf, attr = group.get_config_and_attr(
+                object_cl=self._get_config_log(obj.config),
+                group_cl=self._get_config_log(group.config),
+            )
+            self._group_configs[group.pk] = process_config_and_attr(
+                group, conf, attr, spec=self._get_spec(obj.prototype)
+            )
+
+        return self._group_configs[group.pk]
+
+    def _get_variables(self, obj: Cluster | ClusterObject | ServiceComponent, config: dict | None = None) -> dict:
+        key = (obj.prototype.type, obj.pk)
+        if key not in self._variables:
+            if isinstance(obj, Cluster):
+                self._variables[key] = get_cluster_variables(obj, cluster_config=self.get_obj_config(obj))
+            elif isinstance(obj, ClusterObject):
+                self._variables[key] = get_service_variables(obj, service_config=self.get_obj_config(obj))
+            else:
+                self._variables[key] = get_component_variables(obj, component_config=self.get_obj_config(obj))
+
+        variables = dict(self._variables[key])
+        if config:
+            variables["config"] = config
+
+        return variables
+
+    def get_service_components(self, service: ClusterObject) -> list[ServiceComponent]:
+        return [component for component in self.components.values() if component.service_id == service.pk]
+
+    def get_host_vars(self, host: Host, obj: Cluster | ClusterObject | ServiceComponent) -> dict:
+        group_config = self.get_group_config(obj, host)
+        if group_config is None:
+            return {}
+
+        if isinstance(obj, Cluster):
+            return {"cluster": self._get_variables(obj, group_config)}
+
+        if isinstance(obj, ClusterObject):
+            services = {obj.prototype.name: self._get_variables(obj, group_config)}
+            for service in self.services.values():
+                if service.pk == obj.pk:
+                    continue
+
+                services[service.prototype.name] = self._get_variables(service, self.get_group_config(service, host))
+                for component in self.get_service_components(service):
+                    services[service.prototype.name][component.prototype.name] = self._get_variables(
+                        component, self.get_group_config(component, host)
+                    )
+
+            for component in self.get_service_components(obj):
+                services[obj.prototype.name][component.prototype.name] = self._get_variables(
+                    component, self.get_group_config(component, host)
+                )
+
+            return {"services": services}
+
+        service = obj.service
+        service_variables = self._get_variables(service, self.get_group_config(service, host))
+        service_variables[obj.prototype.name] = self._get_variables(obj, group_config)
+        for component in self.get_service_components(service):
+            if component.pk == obj.pk:
+                continue
+
+            service_variables[component.prototype.name] = self._get_variables(
+                component, self.get_group_config(component, host)
+            )
+
+        return {"services": {service.prototype.name: service_variables}}
+
+    def get_cluster_config(self) -> dict:
+        res = {
+            "cluster": self._get_variables(self.cluster),
+            "services": {},
+        }
+        imports = get_import(self.cluster)
+        if imports:
+            res["cluster"]["imports"] = imports
+        for service in self.services.values():
+            res["services"][service.prototype.name] = self._get_variables(service)
+            for component in self.get_service_components(service):
+                res["services"][service.prototype.name][component.prototype.name] = self._get_variables(component)
+        return res
+
+    def get_hosts(self, action_host=None) -> dict:
+        hosts = {}
+        for host in self.hosts.values():
+            if host.maintenance_mode == MaintenanceMode.ON or (action_host and host.id not in action_host):
+                continue
+            hosts[host.fqdn] = {
+                **self.get_obj_config(host),
+                "adcm_hostid": host.id,
+                "state": host.state,
+                "multi_state": host.multi_state,
+                **self.get_host_vars(host, self.cluster),
+            }
+
+        return hosts
+
+    def get_cluster_hosts(self, action_host=None) -> dict:
+        return {"CLUSTER": {"hosts": self.get_hosts(action_host), "vars": self.get_cluster_config()}}
+
+    def get_host_groups(self, delta: dict, action_host=None) -> dict:
+        groups = {}
+        for host_id, component_id in self.host_components:
+            if action_host and host_id not in action_host:
+                continue
+
+            host = self.hosts[host_id]
+            component = self.components[component_id]
+            service = component.service
+            key_object_pairs = (
+                (f"{service.prototype.name}.{component.prototype.name}", component),
+                (f"{service.prototype.name}", service),
+            )
+            for key, adcm_object in key_object_pairs:
+                if host.maintenance_mode == MaintenanceMode.ON:
+                    key = f"{key}.{MAINTENANCE_MODE}"
+
+                if key not in groups:
+                    groups[key] = {"hosts": {}}
+
+                groups[key]["hosts"][host.fqdn] = {
+                    **self.get_obj_config(host),
+                    **self.get_host_vars(host, adcm_object),
+                }
+
+        self.add_delta_groups(groups, delta)
+
+        return groups
+
+    def add_delta_groups(self, groups: dict, delta: dict) -> None:
+        for htype in delta:
+            for key in delta[htype]:
+                lkey = f"{key}.{htype}"
+                if lkey not in groups:
+                    groups[lkey] = {"hosts": {}}
+                for fqdn in delta[htype][key]:
+                    host = delta[htype][key][fqdn]
+                    if host.maintenance_mode != MaintenanceMode.ON:
+                        groups[lkey]["hosts"][host.fqdn] = dict(self.get_obj_config(host))
+
+
+def _get_hash(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode(settings.ENCODING_UTF_8)).hexdigest()
+
+
+def get_cluster_fingerprint(cluster: Cluster) -> tuple[str, dict[int, str]]:
+    """
+    Get hash of cluster state which its inventory is built from and hashes of own state of each cluster's host.
+    Change of host's own config or state affects only entries of this host in inventory,
+    any other change (hostcomponent map, set of hosts, maintenance mode, configs, states, binds) affects it all
+    """
+    object_fields = ("pk", "prototype_id", "state", "_multi_state", "config__current")
+    mm_fields = ("_maintenance_mode", "effective_maintenance_mode")
+    cluster_state = (
+        list(Cluster.objects.filter(pk=cluster.pk).values_list(*object_fields, "name", "before_upgrade")),
+        list(ClusterObject.objects.filter(cluster=cluster).order_by("pk").values_list(*object_fields, *mm_fields)),
+        list(ServiceComponent.objects.filter(cluster=cluster).order_by("pk").values_list(*object_fields, *mm_fields)),
+        list(Host.objects.filter(cluster=cluster).order_by("pk").values_list("pk", "fqdn", "maintenance_mode")),
+        list(HostComponent.objects.filter(cluster=cluster).order_by("pk").values_list("host_id", "component_id")),
+        list(
+            get_cluster_group_configs(cluster)
+            .order_by("pk")
+            .values_list("pk", "object_type_id", "object_id", "config__current")
+        ),
+        list(
+            GroupConfig.hosts.through.objects.filter(groupconfig__in=get_cluster_group_configs(cluster))
+            .order_by("pk")
+            .values_list("groupconfig_id", "host_id")
+        ),
+        list(
+            ClusterBind.objects.filter(cluster=cluster)
+            .order_by("pk")
+            .values_list("pk", "service_id", "source_cluster__config__current", "source_service__config__current")
+        ),
+    )
+    host_hashes = {
+        host_id: _get_hash(host_state)
+        for host_id, *host_state in Host.objects.filter(cluster=cluster).values_list(*object_fields)
+    }
+
+    return _get_hash(cluster_state), host_hashes
+
+
+class ClusterInventoryCache:
+    """
+    Cluster part of inventory of the previous job of a task with fingerprint of cluster state it was built from.
+    Next jobs of the task reuse it while cluster is not changed, and if only own configs or states of some hosts
+    are changed (e.g. by adcm_config or adcm_state plugins), only entries of these hosts are rebuilt
+    """
+
+    def __init__(self):
+        self._key = None
+        self._cluster_hash = None
+        self._host_hashes = {}
+        self._children = None
+
+    @staticmethod
+    def _get_key(cluster: Cluster, delta: dict, action_host) -> str:
+        delta_hosts = {htype: {key: sorted(hosts) for key, hosts in delta[htype].items()} for htype in delta}
+        return _get_hash((cluster.pk, delta_hosts, sorted(action_host or ())))
+
+    def get_children(self, cluster: Cluster, delta: dict, action_host=None) -> dict:
+        key = self._get_key(cluster, delta, action_host)
+        cluster_hash, host_hashes = get_cluster_fingerprint(cluster)
+        if self._children is None or key != self._key or cluster_hash != self._cluster_hash:
+            logger.info("build inventory of cluster #%s", cluster.pk)
+            cluster_inventory = ClusterInventory(cluster)
+            self._children = {
+                **cluster_inventory.get_cluster_hosts(action_host),
+                **cluster_inventory.get_host_groups(delta, action_host),
+            }
+        else:
+            changed = {host_id for host_id, host_hash in host_hashes.items() if self._host_hashes[host_id] != host_hash}
+            logger.info("reuse inventory of cluster #%s, rebuild entries of %s hosts", cluster.pk, len(changed))
+            if changed:
+                self._patch(ClusterInventory(cluster), delta, action_host, changed)
+
+        self._key, self._cluster_hash, self._host_hashes = key, cluster_hash, host_hashes
+
+        return self._children
+
+    def _patch(self, cluster_inventory: ClusterInventory, delta: dict, action_host, changed: set[int]) -> None:
+        # set of hosts and hostcomponent map are the same, so are groups each host is a member of
+        host_ids = [host_id for host_id in changed if not action_host or host_id in action_host]
+        groups = {"CLUSTER": {"hosts": {}}}
+        if host_ids:
+            groups["CLUSTER"]["hosts"] = cluster_inventory.get_hosts(host_ids)
+            groups.update(cluster_inventory.get_host_groups({}, host_ids))
+
+        # hosts of delta are not filtered by action hosts
+        cluster_inventory.add_delta_groups(
+            groups,
+            {
+                htype: {
+                    key: {fqdn: host for fqdn, host in hosts.items() if host.pk in changed}
+                    for key, hosts in delta[htype].items()
+                }
+                for htype in delta
+            },
+        )
+        for group_name, group in groups.items():
+            self._children[group_name]["hosts"].update(group["hosts"])
+
+
+def prepare_job_inventory(obj, job_id, action, delta, action_host=None, inventory_cache=None):
     logger.info("prepare inventory for job #%s, object: %s", job_id, obj)
     fd = open(settings.RUN_DIR / f"{job_id}/inventory.json", "w", encoding=settings.ENCODING_UTF_8)
     inv = {"all": {"children": {}}}
     cluster = get_object_cluster(obj)
     if cluster:
-        inv["all"]["children"].update(get_cluster_hosts(cluster, action_host))
-        inv["all"]["children"].update(get_host_groups(cluster, delta, action_host))
+        if inventory_cache is None:
+            cluster_inventory = ClusterInventory(cluster)
+            inv["all"]["children"].update(cluster_inventory.get_cluster_hosts(action_host))
+            inv["all"]["children"].update(cluster_inventory.get_host_groups(delta, action_host))
+        else:
+            inv["all"]["children"].update(inventory_cache.get_children(cluster, delta, action_host))
     if obj.prototype.type == "host":
         inv["all"]["children"].update(get_host(obj.id))
         if action.host_action:
@@ -10,12 +10,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
 from cm.adcm_config import get_prototype_config, obj_ref, proto_ref
 from cm.errors import AdcmEx
 from cm.errors import raise_adcm_ex as err
-from cm.hierarchy import Tree
+from cm.hierarchy import NodeKey, Tree
 from cm.logger import logger
 from cm.models import (
+    ADCM,
     ADCMEntity,
     Cluster,
     ClusterBind,
@@ -115,7 +122,9 @@ def do_check_import(cluster, service=None):
 
 def check_hc(cluster):
     shc_list = []
-    for hc in HostComponent.objects.filter(cluster=cluster):
+    for hc in HostComponent.objects.filter(cluster=cluster).select_related(
+        "service__prototype", "host", "component__prototype"
+    ):
         shc_list.append((hc.service, hc.host, hc.component))
 
     if not shc_list:
@@ -127,14 +136,8 @@ def check_hc(cluster):
                 logger.debug("void host components for %s", proto_ref(co.prototype))
                 return False
 
-    for service in ClusterObject.objects.filter(cluster=cluster):
-        try:
-            check_component_constraint(cluster, service.prototype, [i for i in shc_list if i[0] == service])
-        except AdcmEx:
-            return False
     try:
-        check_component_requires(shc_list)
-        check_bound_components(shc_list)
+        check_hc_constraints(cluster, shc_list)
     except AdcmEx:
         return False
     return True
@@ -195,9 +198,9 @@ def get_obj_config(obj):
     return (cl.config, attr)
 
 
-def check_component_constraint(cluster, service_prototype, hc_in, old_bundle=None):
+def _check_component_amount(service_prototype, comp, count, get_host_count):
     ref = f"in host component list for {service_prototype.type} {service_prototype.name}"
-    all_host = Host.objects.filter(cluster=cluster)
+    const = comp.constraint
 
     def cc_err(msg):
         raise AdcmEx("COMPONENT_CONSTRAINT_ERROR", msg)
@@ -217,27 +220,33 @@ def check_component_constraint(cluster, service_prototype, hc_in, old_bundle=Non
             msg = 'amount ({}) of component "{}" should be odd ({}) {}'
             cc_err(msg.format(count, comp.name, const, ref))
 
-    def check(comp, const):
+    if isinstance(const[0], int):
+        check_min(count, const[0], comp)
+        if len(const) < 2:
+            check_max(count, const[0], comp)
+
+    if len(const) > 1:
+        if isinstance(const[1], int):
+            check_max(count, const[1], comp)
+        elif const[1] == "odd" and count:
+            check_odd(count, const[1], comp)
+
+    if const[0] == "+":
+        check_min(count, get_host_count(), comp)
+    elif const[0] == "odd":
+        check_odd(count, const[0], comp)
+
+
+def check_component_constraint(cluster, service_prototype, hc_in, old_bundle=None):
+    all_host = Host.objects.filter(cluster=cluster)
+
+    def check(comp):
         count = 0
         for (_, _, c) in hc_in:
             if comp.name == c.prototype.name:
                 count += 1
 
-        if isinstance(const[0], int):
-            check_min(count, const[0], comp)
-            if len(const) < 2:
-                check_max(count, const[0], comp)
-
-        if len(const) > 1:
-            if isinstance(const[1], int):
-                check_max(count, const[1], comp)
-            elif const[1] == "odd" and count:
-                check_odd(count, const[1], comp)
-
-        if const[0] == "+":
-            check_min(count, len(all_host), comp)
-        elif const[0] == "odd":
-            check_odd(count, const[0], comp)
+        _check_component_amount(service_prototype, comp, count, lambda: len(all_host))
 
     for c in Prototype.objects.filter(parent=service_prototype, type="component"):
         if old_bundle:
@@ -248,7 +257,62 @@ def check_component_constraint(cluster, service_prototype, hc_in, old_bundle=Non
                 Prototype.objects.get(parent=old_service_proto, bundle=old_bundle, type="component", name=c.name)
             except Prototype.DoesNotExist:
                 continue
-        check(c, c.constraint)
+        check(c)
+
+
+def check_hc_constraints(cluster, shc_list):
+    """
+    Check hostcomponent list against constraints of all cluster services, requires and bound_to of components.
+    It is the same as `check_component_constraint` for every service followed by `check_component_requires`
+    and `check_bound_components`, but counters and indexes are built in a single pass over the list
+    """
+    amount = defaultdict(int)
+    comp_hosts = defaultdict(list)
+    host_comps = set()
+    for (service, host, comp) in shc_list:
+        amount[(service.pk, comp.prototype.name)] += 1
+        comp_hosts[(service.prototype.name, comp.prototype.name)].append(host)
+        host_comps.add((host.pk, comp.prototype_id))
+
+    services = list(ClusterObject.objects.filter(cluster=cluster).select_related("prototype"))
+    service_comps = defaultdict(list)
+    for comp in Prototype.objects.filter(parent__in=[s.prototype_id for s in services], type="component"):
+        service_comps[comp.parent_id].append(comp)
+
+    host_count = None
+
+    def get_host_count():
+        nonlocal host_count
+        if host_count is None:
+            host_count = Host.objects.filter(cluster=cluster).count()
+        return host_count
+
+    for service in services:
+        for comp in service_comps[service.prototype_id]:
+            _check_component_amount(service.prototype, comp, amount[(service.pk, comp.name)], get_host_count)
+
+    for (service, _, comp) in shc_list:
+        for r in comp.prototype.requires or []:
+            if (r["service"], r["component"]) not in comp_hosts:
+                ref = f'component "{comp.prototype.name}" of service "{service.prototype.name}"'
+                msg = 'no required component "{}" of service "{}" for {}'
+                err("COMPONENT_CONSTRAINT_ERROR", msg.format(r["component"], r["service"], ref))
+
+    for (_, _, comp) in shc_list:
+        if not comp.prototype.bound_to:
+            continue
+
+        service_name = comp.prototype.bound_to["service"]
+        comp_name = comp.prototype.bound_to["component"]
+        ref = f'component "{comp_name}" of service "{service_name}"'
+        if (service_name, comp_name) not in comp_hosts:
+            msg = f'bound service "{service_name}", component "{comp_name}" not in hc for {ref}'
+            err("COMPONENT_CONSTRAINT_ERROR", msg)
+
+        for host in comp_hosts[(service_name, comp_name)]:
+            if (host.pk, comp.prototype_id) not in host_comps:
+                msg = 'No bound component "{}" on host "{}" for {}'
+                err("COMPONENT_CONSTRAINT_ERROR", msg.format(comp.prototype.name, host.fqdn, ref))
 
 
 _issue_check_map = {
@@ -270,6 +334,13 @@ _prototype_issue_map = {
     ObjectType.Provider: (ConcernCause.Config,),
     ObjectType.Host: (ConcernCause.Config,),
 }
+# Issue causes which could be affected by a kind of change, they are rechecked on all directly affected objects
+HOST_COMPONENT_CHANGE = (ConcernCause.HostComponent,)
+HOST_CHANGE = (ConcernCause.HostComponent,)  # constraint "+" depends on amount of cluster hosts
+SERVICE_CHANGE = (ConcernCause.Service, ConcernCause.HostComponent, ConcernCause.Import)  # service binds are cascaded
+BIND_CHANGE = (ConcernCause.Import,)
+CONFIG_CHANGE = (ConcernCause.Config,)
+HIERARCHY_CHANGE = tuple()  # e.g. maintenance mode, existing issues are only added to new related objects
 _issue_template_map = {
     ConcernCause.Config: MessageTemplate.KnownNames.ConfigIssue,
     ConcernCause.Import: MessageTemplate.KnownNames.RequiredImportIssue,
@@ -302,9 +373,7 @@ def create_issue(obj: ADCMEntity, issue_cause: ConcernCause) -> None:
         issue.delete()
         issue = _create_concern_item(obj, issue_cause)
     tree = Tree(obj)
-    affected_nodes = tree.get_directly_affected(tree.built_from)
-    for node in affected_nodes:
-        node.value.add_to_concerns(issue)
+    issue.add_related_objects(node.value for node in tree.get_directly_affected(tree.built_from))
 
 
 def remove_issue(obj: ADCMEntity, issue_cause: ConcernCause) -> None:
@@ -315,35 +384,151 @@ def remove_issue(obj: ADCMEntity, issue_cause: ConcernCause) -> None:
     issue.delete()
 
 
-def recheck_issues(obj: ADCMEntity) -> None:
-    """Re-check for object's type-specific issues"""
+def recheck_issues(obj: ADCMEntity, causes: Optional[Iterable[ConcernCause]] = None) -> None:
+    """Re-check for object's type-specific issues, only `causes` are rechecked if they are specified"""
     issue_causes = _prototype_issue_map.get(obj.prototype.type, [])
     for issue_cause in issue_causes:
+        if causes is not None and issue_cause not in causes:
+            continue
         if not _issue_check_map[issue_cause](obj):
             create_issue(obj, issue_cause)
         else:
             remove_issue(obj, issue_cause)
 
 
-def update_hierarchy_issues(obj: ADCMEntity):
-    """Update issues on all directly connected objects"""
-    tree = Tree(obj)
-    affected_nodes = tree.get_directly_affected(tree.built_from)
-    for node in affected_nodes:
-        node_value = node.value
-        recheck_issues(node_value)
-
-
-def update_issue_after_deleting():
-    """Remove issues which have no owners after object deleting"""
-    for concern in ConcernItem.objects.exclude(type=ConcernType.Lock):
-        tree = Tree(concern.owner)
-        affected = {node.value for node in tree.get_directly_affected(tree.built_from)}
-        related = set(concern.related_objects)  # pylint: disable=consider-using-set-comprehension
-        if concern.owner is None:
-            concern_str = str(concern)
-            concern.delete()
-            logger.info("Deleted %s", concern_str)
-        elif related != affected:
-            for object_moved_out_hierarchy in related.difference(affected):
-                object_moved_out_hierarchy.remove_from_concerns(concern)
+class DirtyIssues:
+    """
+    Set of objects with issue causes to recheck collected from one or several changes.
+    Each object is rechecked once for all its causes; existing issues of marked objects which are not rechecked
+    are added to concerns of objects which became related to them
+    """
+
+    def __init__(self):
+        self._objects: Dict[NodeKey, ADCMEntity] = {}
+        self._causes: Dict[NodeKey, Set[ConcernCause]] = defaultdict(set)
+
+    def mark(self, obj: ADCMEntity, causes: Optional[Iterable[ConcernCause]] = None) -> None:
+        """Mark issues of object itself, all its type-specific causes by default"""
+        key = (obj.prototype.type, obj.pk)
+        self._objects.setdefault(key, obj)
+        type_causes = _prototype_issue_map.get(obj.prototype.type, ())
+        self._causes[key].update(cause for cause in type_causes if causes is None or cause in causes)
+
+    def mark_hierarchy(self, obj: ADCMEntity, causes: Optional[Iterable[ConcernCause]] = None) -> None:
+        """Mark issues of all objects directly connected with object, all type-specific causes by default"""
+        if causes is not None:
+            causes = set(causes)
+        tree = Tree(obj)
+        for node in tree.get_directly_affected(tree.built_from):
+            self.mark(node.value, causes)
+
+    def recheck(self) -> None:
+        """Recheck marked causes and add not rechecked issues to concerns of all related objects"""
+        for key, obj in self._objects.items():
+            recheck_issues(obj, self._causes[key])
+
+        objects_by_type = defaultdict(dict)
+        for obj in self._objects.values():
+            objects_by_type[ContentType.objects.get_for_model(obj)][obj.pk] = obj
+
+        unchecked = defaultdict(list)
+        for content_type, objects in objects_by_type.items():
+            for issue in ConcernItem.objects.filter(
+                type=ConcernType.Issue, owner_type=content_type, owner_id__in=objects
+            ).order_by("pk"):
+                owner = objects[issue.owner_id]
+                if issue.cause not in self._causes[(owner.prototype.type, owner.pk)]:
+                    unchecked[(owner.prototype.type, owner.pk)].append(issue)
+
+        for key, issues in unchecked.items():
+            tree = Tree(self._objects[key])
+            affected = [node.value for node in tree.get_directly_affected(tree.built_from)]
+            for issue in issues:
+                issue.add_related_objects(affected)
+
+
+def update_hierarchy_issues(obj: ADCMEntity, causes: Optional[Iterable[ConcernCause]] = None) -> None:
+    """Update issues on all directly connected objects, only `causes` are rechecked if they are specified"""
+    issues = DirtyIssues()
+    issues.mark_hierarchy(obj, causes)
+    issues.recheck()
+
+
+def update_object_issues(obj: ADCMEntity, causes: Optional[Iterable[ConcernCause]] = None) -> None:
+    """Update issues of object itself and add them to concerns of directly connected objects"""
+    issues = DirtyIssues()
+    issues.mark(obj, causes)
+    issues.recheck()
+
+
+def _get_hierarchy_models() -> Dict[str, type]:
+    return {'adcm': ADCM, **Tree.models}
+
+
+def _delete_orphan_concerns() -> None:
+    """Delete concerns which owners were deleted, one query per owner type"""
+    orphans = Q(owner_type__isnull=True)
+    for model in _get_hierarchy_models().values():
+        orphans |= Q(owner_type=ContentType.objects.get_for_model(model)) & ~Q(owner_id__in=model.objects.values("pk"))
+    for concern in ConcernItem.objects.exclude(type=ConcernType.Lock).filter(orphans):
+        concern_str = str(concern)
+        concern.delete()
+        logger.info("Deleted %s", concern_str)
+
+
+def update_issue_after_deleting(changed: Optional[Iterable[ADCMEntity]] = None) -> None:
+    """
+    Remove issues which have no owners after object deleting and detach concerns from objects
+    which are out of owner's hierarchy now. Only concerns owned by or related to `changed` objects are
+    checked for the latter if they are specified, otherwise all concerns are checked
+    """
+    _delete_orphan_concerns()
+
+    models = _get_hierarchy_models()
+    concerns = ConcernItem.objects.exclude(type=ConcernType.Lock).exclude(owner_type__isnull=True)
+    if changed is not None:
+        changed_by_model = defaultdict(set)
+        for obj in changed:
+            if obj is not None and obj.pk is not None:
+                changed_by_model[obj.__class__].add(obj.pk)
+
+        scope = Q(pk__in=[])
+        for model, ids in changed_by_model.items():
+            scope |= Q(owner_type=ContentType.objects.get_for_model(model), owner_id__in=ids)
+            scope |= Q(**{f"{model._meta.model_name}_entities__in": ids})
+        concerns = concerns.filter(scope).distinct()
+
+    concerns = list(concerns)
+    if not concerns:
+        return
+
+    related = defaultdict(set)
+    for obj_type, model in models.items():
+        through = model.concerns.through
+        entity_field = model.concerns.field.m2m_column_name()
+        concern_field = model.concerns.field.m2m_reverse_name()
+        for concern_id, entity_id in through.objects.filter(
+            **{f"{concern_field}__in": [concern.pk for concern in concerns]}
+        ).values_list(concern_field, entity_field):
+            related[concern_id].add((obj_type, entity_id))
+
+    owners_by_type = defaultdict(set)
+    for concern in concerns:
+        owners_by_type[concern.owner_type_id].add(concern.owner_id)
+    owners = {}
+    for owner_type_id, ids in owners_by_type.items():
+        model = ContentType.objects.get_for_id(owner_type_id).model_class()
+        for pk, owner in model.objects.select_related("prototype").in_bulk(ids).items():
+            owners[(owner_type_id, pk)] = owner
+
+    for concern in concerns:
+        owner = owners.get((concern.owner_type_id, concern.owner_id))
+        if owner is None:
+            continue
+        tree = Tree(owner, load_values=False)
+        affected = {node.key for node in tree.get_directly_affected(tree.built_from)}
+        moved_out = defaultdict(list)
+        for obj_type, pk in related[concern.pk].difference(affected):
+            moved_out[models[obj_type]].append(pk)
+        for model, ids in moved_out.items():
+            concern.remove_related_objects(model.objects.filter(pk__in=ids))
@@ -45,9 +45,15 @@ from cm.api import (
     save_hc,
 )
 from cm.api_context import ctx
+from cm.daemon import Daemon
 from cm.errors import AdcmEx, raise_adcm_ex
 from cm.hierarchy import Tree
-from cm.inventory import get_obj_config, prepare_job_inventory, process_config_and_attr
+from cm.inventory import (
+    ClusterInventoryCache,
+    get_obj_config,
+    prepare_job_inventory,
+    process_config_and_attr,
+)
 from cm.issue import (
     check_bound_components,
     check_component_constraint,
@@ -74,12 +80,14 @@ from cm.models import (
     MaintenanceMode,
     ObjectType,
     Prototype,
+    QueuedTask,
     ServiceComponent,
     SubAction,
     TaskLog,
     Upgrade,
     get_object_cluster,
 )
+from cm.scheduler import get_task_priority
 from cm.status_api import post_event
 from cm.variant import process_variant
 from rbac.roles import re_apply_policy_for_jobs
@@ -189,6 +197,14 @@ def restart_task(task: TaskLog):
 
 
 def cancel_task(task: TaskLog):
+    deleted, _ = QueuedTask.objects.filter(task=task, claimed=False).delete()
+    if deleted:
+        logger.info("cancel queued task #%s", task.pk)
+        finish_task(task, None, JobStatus.ABORTED)
+        ctx.event.send_state()
+
+        return
+
     task.cancel(ctx.event)
 
 
@@ -495,7 +511,7 @@ def get_old_hc(saved_hc: List[dict]):
     return old_hc
 
 
-def re_prepare_job(task: TaskLog, job: JobLog):
+def re_prepare_job(task: TaskLog, job: JobLog, inventory_cache: ClusterInventoryCache | None = None):
     conf = None
     hosts = None
     delta = {}
@@ -517,7 +533,7 @@ def re_prepare_job(task: TaskLog, job: JobLog):
         old_hc = get_old_hc(task.hostcomponentmap)
         delta = cook_delta(cluster, new_hc, action.hostcomponentmap, old_hc)
 
-    prepare_job(action, sub_action, job.pk, obj, conf, delta, hosts, task.verbose)
+    prepare_job(action, sub_action, job.pk, obj, conf, delta, hosts, task.verbose, inventory_cache)
 
 
 def prepare_job(
@@ -529,9 +545,10 @@ def prepare_job(
     delta: dict,
     hosts: List[Host],
     verbose: bool,
+    inventory_cache: ClusterInventoryCache | None = None,
 ):
     prepare_job_config(action, sub_action, job_id, obj, conf, verbose)
-    prepare_job_inventory(obj, job_id, action, delta, hosts)
+    prepare_job_inventory(obj, job_id, action, delta, hosts, inventory_cache)
     prepare_ansible_config(job_id, action, sub_action)
 
 
@@ -683,6 +700,7 @@ def create_task(
     verbose: bool,
     post_upgrade_hc: List[dict],
 ) -> TaskLog:
+    selector = get_selector(obj, action)
     task = TaskLog.objects.create(
         action=action,
         task_object=obj,
@@ -695,32 +713,43 @@ def create_task(
         start_date=timezone.now(),
         finish_date=timezone.now(),
         status=JobStatus.CREATED,
-        selector=get_selector(obj, action),
+        selector=selector,
     )
     set_task_status(task, JobStatus.CREATED, ctx.event)
 
     if action.type == ActionType.Job.value:
         sub_actions = [None]
     else:
-        sub_actions = SubAction.objects.filter(action=action).all()
-
-    for sub_action in sub_actions:
-        job = JobLog.obj.create(
-            task=task,
-            action=action,
-            sub_action=sub_action,
-            log_files=action.log_files,
-            start_date=timezone.now(),
-            finish_date=timezone.now(),
-            status=JobStatus.CREATED,
-            selector=get_selector(obj, action),
-        )
+        sub_actions = list(SubAction.objects.filter(action=action).order_by("id"))
+
+    now = timezone.now()
+    JobLog.objects.bulk_create(
+        [
+            JobLog(
+                task=task,
+                action=action,
+                sub_action=sub_action,
+                log_files=action.log_files,
+                start_date=now,
+                finish_date=now,
+                status=JobStatus.CREATED,
+                selector=selector,
+            )
+            for sub_action in sub_actions
+        ]
+    )
+    # not every DB backend sets primary keys of bulk created objects, jobs are read back in order of creation
+    jobs = JobLog.objects.filter(task=task).order_by("id")
+    log_storages = []
+    for sub_action, job in zip(sub_actions, jobs):
         log_type = sub_action.script_type if sub_action else action.script_type
-        LogStorage.objects.create(job=job, name=log_type, type="stdout", format="txt")
-        LogStorage.objects.create(job=job, name=log_type, type="stderr", format="txt")
-        set_job_status(job.pk, JobStatus.CREATED, ctx.event)
+        log_storages.append(LogStorage(job=job, name=log_type, type="stdout", format="txt"))
+        log_storages.append(LogStorage(job=job, name=log_type, type="stderr", format="txt"))
+        ctx.event.set_job_status(job.pk, JobStatus.CREATED)
         Path(settings.RUN_DIR, f"{job.pk}", "tmp").mkdir(parents=True, exist_ok=True)
 
+    LogStorage.objects.bulk_create(log_storages)
+
     tree = Tree(obj)
     affected = (node.value for node in tree.get_all_affected(tree.built_from))
     task.lock_affected(affected)
@@ -906,6 +935,14 @@ def log_custom(job_id, name, log_format, body):
 
 
 def run_task(task: TaskLog, event, args: str = ""):
+    if Daemon(settings.EXECUTOR_PID_FILE).checkpid():
+        # resident task executor runs the task when concurrency limits allow, see cm.scheduler
+        QueuedTask.objects.create(task=task, args=args, priority=get_task_priority(task))
+        set_task_status(task, JobStatus.CREATED, event)
+        logger.info("task run #%s, queued to executor", task.pk)
+
+        return
+
     err_file = open(Path(settings.LOG_DIR, "task_runner.err"), "a+", encoding=settings.ENCODING_UTF_8)
     cmd = [
         "/adcm/python/job_venv_wrapper.sh",
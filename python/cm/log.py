@@ -0,0 +1,144 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+from typing import Iterator, Tuple
+
+from django.conf import settings
+
+from cm.errors import AdcmEx
+from cm.log_storage import LogBlob, log_blob_storage
+from cm.models import JobLog, JobStatus, LogStorage
+
+LOG_CHUNK_SIZE = 64 * 1024
+LOG_TAIL_MAX_LIMIT = 1024 * 1024
+
+
+def get_log_file_path(log_storage: LogStorage) -> Path:
+    return Path(
+        settings.RUN_DIR, str(log_storage.job_id), f"{log_storage.name}-{log_storage.type}.{log_storage.format}"
+    )
+
+
+def trim_incomplete_char(chunk: bytes) -> bytes:
+    """Cut off trailing bytes of UTF-8 character which is split by the end of chunk"""
+    for i in range(1, min(4, len(chunk)) + 1):
+        byte = chunk[-i]
+        if byte & 0xC0 == 0x80:  # continuation byte
+            continue
+
+        if byte >= 0xF0:
+            char_length = 4
+        elif byte >= 0xE0:
+            char_length = 3
+        elif byte >= 0xC0:
+            char_length = 2
+        else:
+            char_length = 1
+
+        if i < char_length:
+            return chunk[:-i]
+
+        break
+
+    return chunk
+
+
+def open_log_blob(log_storage: LogStorage) -> LogBlob:
+    try:
+        return log_blob_storage.open(log_storage.checksum)
+    except FileNotFoundError as e:
+        raise AdcmEx("LOG_NOT_FOUND", f'Stored log "{log_storage.name}-{log_storage.type}" not found') from e
+
+
+def store_log_file(log_storage: LogStorage) -> None:
+    """Move body of finished job's log from its run directory to log storage"""
+    with open(get_log_file_path(log_storage), "rb") as f:
+        checksum, size = log_blob_storage.save(f)
+
+    LogStorage.objects.filter(pk=log_storage.pk).update(checksum=checksum, size=size, body=None)
+    log_storage.checksum, log_storage.size, log_storage.body = checksum, size, None
+
+
+def iter_text(text: str) -> Iterator[bytes]:
+    for i in range(0, len(text), LOG_CHUNK_SIZE):
+        yield text[i : i + LOG_CHUNK_SIZE].encode(settings.ENCODING_UTF_8)
+
+
+def _iter_file(file_path: Path) -> Iterator[bytes]:
+    with open(file_path, "rb") as f:
+        while chunk := f.read(LOG_CHUNK_SIZE):
+            yield chunk
+
+
+def get_log_size(log_storage: LogStorage) -> int:
+    if log_storage.checksum:
+        return log_storage.size
+
+    if log_storage.body is not None:
+        return sum(len(chunk) for chunk in iter_text(log_storage.body))
+
+    file_path = get_log_file_path(log_storage)
+    if file_path.is_file():
+        return file_path.stat().st_size
+
+    return 0
+
+
+def iter_log(log_storage: LogStorage) -> Iterator[bytes]:
+    """Get iterator over chunks of log wherever its body is: in log storage, DB or job's run directory"""
+    if log_storage.checksum:
+        return open_log_blob(log_storage).iter_chunks()
+
+    if log_storage.body is not None:
+        return iter_text(log_storage.body)
+
+    file_path = get_log_file_path(log_storage)
+    if file_path.is_file():
+        return _iter_file(file_path)
+
+    return iter(())
+
+
+def get_log_content(log_storage: LogStorage) -> str:
+    if not log_storage.checksum and log_storage.body is None and not get_log_file_path(log_storage).is_file():
+        raise AdcmEx("LOG_NOT_FOUND", f'File "{log_storage.name}-{log_storage.type}.{log_storage.format}" not found')
+
+    return b"".join(iter_log(log_storage)).decode(settings.ENCODING_UTF_8, errors="replace")
+
+
+def read_log_chunk(log_storage: LogStorage, offset: int, limit: int) -> Tuple[bytes, int]:
+    """
+    Read up to `limit` bytes of log starting from byte `offset`, return them with offset of the next chunk.
+    Log is read from job's run directory while it is not moved to log storage
+    """
+    if log_storage.checksum:
+        chunk = open_log_blob(log_storage).read(offset=offset, limit=limit)
+    elif log_storage.body is not None:
+        chunk = log_storage.body.encode(settings.ENCODING_UTF_8)[offset : offset + limit]
+    else:
+        file_path = get_log_file_path(log_storage)
+        if not file_path.is_file():
+            return b"", offset
+
+        with open(file_path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(limit)
+
+    # chunk is not trimmed to nothing, otherwise client would never get past too long character
+    chunk = trim_incomplete_char(chunk) or chunk
+
+    return chunk, offset + len(chunk)
+
+
+def is_job_running(job_id: int) -> bool:
+    return JobLog.objects.filter(pk=job_id, status__in=(JobStatus.CREATED, JobStatus.RUNNING)).exists()
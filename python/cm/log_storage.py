@@ -0,0 +1,159 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Content-addressed storage of job log bodies.
+
+Each body is kept in file named by sha256 of its content, so the same log is stored once.
+File consists of zlib compressed blocks of BLOCK_SIZE bytes of the body, index of blocks' end offsets
+and footer with magic, block size and body size. Index allows to read any range of the body
+decompressing only blocks which contain it.
+"""
+
+import hashlib
+import os
+import struct
+import time
+import zlib
+from io import BytesIO
+from pathlib import Path
+from tempfile import mkstemp
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+BLOCK_SIZE = 256 * 1024
+MAGIC = b"ALOG"
+FOOTER = struct.Struct("<4sIQ")
+BLOCK_END = struct.Struct("<Q")
+# unused blobs younger than this are kept, they could be saved just before DB row referencing them
+UNUSED_BLOB_TTL = 24 * 60 * 60
+
+
+def _read_block(source: BinaryIO) -> bytes:
+    block = source.read(BLOCK_SIZE)
+    while block and len(block) < BLOCK_SIZE:
+        data = source.read(BLOCK_SIZE - len(block))
+        if not data:
+            break
+
+        block += data
+
+    return block
+
+
+class LogBlob:
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(-FOOTER.size, os.SEEK_END)
+            magic, self.block_size, self.size = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a log blob")
+
+            count = -(-self.size // self.block_size)
+            f.seek(-FOOTER.size - count * BLOCK_END.size, os.SEEK_END)
+            self.block_ends: List[int] = list(struct.unpack(f"<{count}Q", f.read(count * BLOCK_END.size)))
+
+    def iter_chunks(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[bytes]:
+        """Yield decompressed body from byte `offset` up to `limit` bytes, one chunk per block"""
+        end = self.size if limit is None else min(self.size, offset + limit)
+        if offset >= end:
+            return
+
+        with open(self.path, "rb") as f:
+            for i in range(offset // self.block_size, (end - 1) // self.block_size + 1):
+                block_offset = self.block_ends[i - 1] if i else 0
+                f.seek(block_offset)
+                block = zlib.decompress(f.read(self.block_ends[i] - block_offset))
+                block_start = i * self.block_size
+                yield block[max(offset - block_start, 0) : end - block_start]
+
+    def read(self, offset: int = 0, limit: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_chunks(offset=offset, limit=limit))
+
+
+class LogBlobStorage:
+    def __init__(self, root: Optional[Path] = None):
+        self._root = root
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root or settings.LOG_STORAGE_DIR)
+
+    def get_path(self, checksum: str) -> Path:
+        return self.root / checksum[:2] / checksum
+
+    def open(self, checksum: str) -> LogBlob:
+        return LogBlob(self.get_path(checksum))
+
+    def save(self, source: BinaryIO) -> Tuple[str, int]:
+        """Compress content of `source` block by block to storage, return its checksum and size"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        block_ends = []
+        size = 0
+        fd, tmp_path = mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while block := _read_block(source):
+                    digest.update(block)
+                    size += len(block)
+                    f.write(zlib.compress(block))
+                    block_ends.append(f.tell())
+
+                f.write(struct.pack(f"<{len(block_ends)}Q", *block_ends))
+                f.write(FOOTER.pack(MAGIC, BLOCK_SIZE, size))
+
+            checksum = digest.hexdigest()
+            path = self.get_path(checksum)
+            if path.exists():
+                # the same content is already stored, it's marked as used recently to not be removed as unused
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            raise
+
+        return checksum, size
+
+    def save_text(self, text: str) -> Tuple[str, int]:
+        return self.save(BytesIO(text.encode(settings.ENCODING_UTF_8)))
+
+    def remove_unused(self, used: Iterable[str]) -> int:
+        """Remove blobs which checksums are not in `used`, return number of removed blobs"""
+        if not self.root.is_dir():
+            return 0
+
+        used = set(used)
+        threshold = time.time() - UNUSED_BLOB_TTL
+        removed = 0
+        for path in (*self.root.glob("??/*"), *self.root.glob(".tmp-*")):
+            if path.name in used:
+                continue
+
+            try:
+                if path.stat().st_mtime < threshold:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+
+log_blob_storage = LogBlobStorage()
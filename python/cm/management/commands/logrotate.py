@@ -23,6 +23,7 @@ from django.utils import timezone
 
 from audit.models import AuditLogOperationResult
 from audit.utils import make_audit_log
+from cm.log_storage import log_blob_storage
 from cm.models import (
     ADCM,
     Cluster,
@@ -33,6 +34,7 @@ from cm.models import (
     Host,
     HostProvider,
     JobLog,
+    LogStorage,
     ObjectConfig,
     ServiceComponent,
     TaskLog,
@@ -238,6 +240,10 @@ class Command(BaseCommand):
                         # valid as long as `on_delete=models.SET_NULL` in JobLog.task field
                         JobLog.objects.filter(task__isnull=True).delete()
 
+                removed = log_blob_storage.remove_unused(
+                    used=LogStorage.objects.exclude(checksum="").values_list("checksum", flat=True)
+                )
+                self.__log(f"{removed} unused stored job logs removed", "info")
                 self.__log("db JobLog rotated", "info")
             if days_delta_fs > 0:  # pylint: disable=too-many-nested-blocks
                 for name in os.listdir(settings.RUN_DIR):
@@ -0,0 +1,82 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def get_mode(own_mode, host_modes, parent_mode="OFF"):
+    if own_mode != "OFF":
+        return own_mode
+    if parent_mode == "ON":
+        return parent_mode
+    if host_modes:
+        return "ON" if all(mode == "ON" for mode in host_modes) else "OFF"
+    return own_mode
+
+
+def calculate_effective_maintenance_mode(apps, schema_editor):
+    service_model = apps.get_model("cm", "ClusterObject")
+    component_model = apps.get_model("cm", "ServiceComponent")
+    hc_model = apps.get_model("cm", "HostComponent")
+
+    component_host_modes = defaultdict(list)
+    for component_id, host_mode in hc_model.objects.values_list("component_id", "host__maintenance_mode"):
+        component_host_modes[component_id].append(host_mode)
+
+    services = dict(service_model.objects.values_list("id", "_maintenance_mode"))
+    service_components = defaultdict(list)
+    component_objects = list(component_model.objects.all())
+    for component in component_objects:
+        service_components[component.service_id].append(component)
+        component.effective_maintenance_mode = get_mode(
+            component._maintenance_mode, component_host_modes[component.pk], services.get(component.service_id)
+        )
+    component_model.objects.bulk_update(component_objects, ["effective_maintenance_mode"], batch_size=BATCH_SIZE)
+
+    service_objects = list(service_model.objects.all())
+    for service in service_objects:
+        components = service_components[service.pk]
+        if service._maintenance_mode == "OFF" and components and all(c._maintenance_mode == "ON" for c in components):
+            service.effective_maintenance_mode = "ON"
+        else:
+            host_modes = [mode for component in components for mode in component_host_modes[component.pk]]
+            service.effective_maintenance_mode = get_mode(service._maintenance_mode, host_modes)
+    service_model.objects.bulk_update(service_objects, ["effective_maintenance_mode"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cm', '0098_auto_20221115_1255'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clusterobject',
+            name='effective_maintenance_mode',
+            field=models.CharField(
+                choices=[('ON', 'ON'), ('OFF', 'OFF'), ('CHANGING', 'CHANGING')], default='OFF', max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name='servicecomponent',
+            name='effective_maintenance_mode',
+            field=models.CharField(
+                choices=[('ON', 'ON'), ('OFF', 'OFF'), ('CHANGING', 'CHANGING')], default='OFF', max_length=64
+            ),
+        ),
+        migrations.RunPython(code=calculate_effective_maintenance_mode, reverse_code=migrations.RunPython.noop),
+    ]
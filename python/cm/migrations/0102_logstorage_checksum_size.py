@@ -0,0 +1,120 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import struct
+import zlib
+from pathlib import Path
+from tempfile import mkstemp
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+# format of log blobs is copied from cm.log_storage as it is at this migration, so later changes don't affect it
+BLOB_BLOCK_SIZE = 256 * 1024
+BLOB_MAGIC = b'ALOG'
+BLOB_FOOTER = struct.Struct('<4sIQ')
+BLOB_BLOCK_END = struct.Struct('<Q')
+
+
+def get_blob_path(checksum):
+    return Path(settings.LOG_STORAGE_DIR, checksum[:2], checksum)
+
+
+def save_blob(body):
+    checksum = hashlib.sha256(body).hexdigest()
+    path = get_blob_path(checksum)
+    if path.exists():
+        os.utime(path)
+        return checksum
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = mkstemp(dir=settings.LOG_STORAGE_DIR, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        block_ends = []
+        for start in range(0, len(body), BLOB_BLOCK_SIZE):
+            f.write(zlib.compress(body[start : start + BLOB_BLOCK_SIZE]))
+            block_ends.append(f.tell())
+
+        f.write(struct.pack(f'<{len(block_ends)}Q', *block_ends))
+        f.write(BLOB_FOOTER.pack(BLOB_MAGIC, BLOB_BLOCK_SIZE, len(body)))
+
+    os.replace(tmp_path, path)
+
+    return checksum
+
+
+def read_blob(checksum):
+    with open(get_blob_path(checksum), 'rb') as f:
+        f.seek(-BLOB_FOOTER.size, os.SEEK_END)
+        _, block_size, size = BLOB_FOOTER.unpack(f.read(BLOB_FOOTER.size))
+        count = -(-size // block_size)
+        f.seek(-BLOB_FOOTER.size - count * BLOB_BLOCK_END.size, os.SEEK_END)
+        block_ends = struct.unpack(f'<{count}Q', f.read(count * BLOB_BLOCK_END.size))
+        f.seek(0)
+        blocks = []
+        block_start = 0
+        for block_end in block_ends:
+            blocks.append(zlib.decompress(f.read(block_end - block_start)))
+            block_start = block_end
+
+    return b''.join(blocks)
+
+
+def iter_batches(queryset):
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield list(queryset.model.objects.filter(id__in=ids[start : start + BATCH_SIZE]))
+
+
+def move_log_bodies(apps, schema_editor):
+    log_storage_model = apps.get_model('cm', 'LogStorage')
+    queryset = log_storage_model.objects.filter(type__in=('stdout', 'stderr'), body__isnull=False)
+    for batch in iter_batches(queryset):
+        for log_storage in batch:
+            body = log_storage.body.encode(settings.ENCODING_UTF_8)
+            log_storage.checksum, log_storage.size = save_blob(body), len(body)
+            log_storage.body = None
+
+        log_storage_model.objects.bulk_update(batch, ['checksum', 'size', 'body'])
+
+
+def restore_log_bodies(apps, schema_editor):
+    log_storage_model = apps.get_model('cm', 'LogStorage')
+    for batch in iter_batches(log_storage_model.objects.exclude(checksum='')):
+        for log_storage in batch:
+            log_storage.body = read_blob(log_storage.checksum).decode(settings.ENCODING_UTF_8)
+
+        log_storage_model.objects.bulk_update(batch, ['body'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cm', '0101_queuedtask_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logstorage',
+            name='checksum',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='logstorage',
+            name='size',
+            field=models.BigIntegerField(default=None, null=True),
+        ),
+        migrations.RunPython(move_log_bodies, restore_log_bodies),
+    ]
@@ -0,0 +1,89 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Generated by Django 3.2.15 on 2026-10-17 10:14
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+# version keys are copied from cm.version as they are at this migration, so later changes don't affect it
+TILDE = '0'
+END = '1'
+SEPARATOR = '2'
+LETTERS = '3'
+DIGITS = '4'
+LETTERS_END = '!'
+DIGITS_LENGTH_WIDTH = 3
+
+
+def get_char_class(char):
+    if char == '~':
+        return TILDE
+    if char.isdigit():
+        return DIGITS
+    if char.isalpha():
+        return LETTERS
+    return SEPARATOR
+
+
+def get_version_key(version):
+    blocks = [(char_class, ''.join(chars)) for char_class, chars in groupby(str(version), key=get_char_class)]
+    key = []
+    for i, (char_class, chars) in enumerate(blocks):
+        if char_class == TILDE:
+            key.append(TILDE * len(chars))
+        elif char_class == DIGITS:
+            digits = chars.lstrip('0')
+            key.append(f'{DIGITS}{len(digits):0{DIGITS_LENGTH_WIDTH}d}{digits}')
+        elif char_class == LETTERS:
+            key.append(f'{LETTERS}{chars}{LETTERS_END}')
+        elif i == len(blocks) - 1:
+            key.append(SEPARATOR * len(chars))
+    key.append(END)
+
+    return ''.join(key)
+
+
+def set_version_keys(apps, schema_editor):
+    for model_name in ('Bundle', 'Prototype'):
+        model = apps.get_model('cm', model_name)
+        objects = list(model.objects.all())
+        for obj in objects:
+            obj.version_key = get_version_key(obj.version)
+
+        orders = {key: order for order, key in enumerate(sorted({obj.version_key for obj in objects}), start=1)}
+        for obj in objects:
+            obj.version_order = orders[obj.version_key]
+
+        model.objects.bulk_update(objects, ['version_key', 'version_order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cm', '0102_logstorage_checksum_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bundle',
+            name='version_key',
+            field=models.CharField(db_index=True, default='', max_length=512),
+        ),
+        migrations.AddField(
+            model_name='prototype',
+            name='version_key',
+            field=models.CharField(db_index=True, default='', max_length=512),
+        ),
+        migrations.RunPython(set_version_keys, migrations.RunPython.noop),
+    ]
@@ -36,6 +36,7 @@ from django.utils import timezone
 
 from cm.errors import AdcmEx
 from cm.logger import logger
+from cm.version import get_version_key
 
 
 def validate_line_break_character(value: str) -> None:
@@ -177,6 +178,7 @@ class ADCMModel(models.Model):
 class Bundle(ADCMModel):
     name = models.CharField(max_length=160)
     version = models.CharField(max_length=80)
+    version_key = models.CharField(max_length=512, default="", db_index=True)
     version_order = models.PositiveIntegerField(default=0)
     edition = models.CharField(max_length=80, default="community")
     hash = models.CharField(max_length=64)
@@ -189,6 +191,10 @@ class Bundle(ADCMModel):
     class Meta:
         unique_together = (("name", "version", "edition"),)
 
+    def save(self, *args, **kwargs):
+        self.version_key = get_version_key(self.version)
+        super().save(*args, **kwargs)
+
 
 class ProductCategory(ADCMModel):
     """
@@ -244,6 +250,7 @@ class Prototype(ADCMModel):
     license_hash = models.CharField(max_length=64, default=None, null=True)
     display_name = models.CharField(max_length=256, blank=True)
     version = models.CharField(max_length=80)
+    version_key = models.CharField(max_length=512, default="", db_index=True)
     version_order = models.PositiveIntegerField(default=0)
     required = models.BooleanField(default=False)
     shared = models.BooleanField(default=False)
@@ -265,6 +272,10 @@ class Prototype(ADCMModel):
     class Meta:
         unique_together = (("bundle", "type", "parent", "name", "version"),)
 
+    def save(self, *args, **kwargs):
+        self.version_key = get_version_key(self.version)
+        super().save(*args, **kwargs)
+
 
 class ObjectConfig(ADCMModel):
     current = models.PositiveIntegerField()
@@ -716,6 +727,11 @@ class ClusterObject(ADCMEntity):
         choices=MaintenanceMode.choices,
         default=MaintenanceMode.OFF,
     )
+    effective_maintenance_mode = models.CharField(
+        max_length=64,
+        choices=MaintenanceMode.choices,
+        default=MaintenanceMode.OFF,
+    )
 
     __error_code__ = "CLUSTER_SERVICE_NOT_FOUND"
 
@@ -761,31 +777,7 @@ class ClusterObject(ADCMEntity):
         if self._maintenance_mode != MaintenanceMode.OFF:
             return self._maintenance_mode
 
-        service_components = ServiceComponent.objects.filter(service=self)
-        if service_components:
-            if all(
-                service_component.maintenance_mode_attr == MaintenanceMode.ON
-                for service_component in service_components
-            ):
-                return MaintenanceMode.ON
-
-            hosts_maintenance_modes = []
-            for service_component in service_components:
-                host_ids = HostComponent.objects.filter(
-                    component=service_component,
-                ).values_list("host_id", flat=True)
-                hosts_maintenance_modes.extend(Host.objects.get(pk=host_id).maintenance_mode for host_id in host_ids)
-
-            if hosts_maintenance_modes:
-                return (
-                    MaintenanceMode.ON
-                    if all(
-                        host_maintenance_mode == MaintenanceMode.ON for host_maintenance_mode in hosts_maintenance_modes
-                    )
-                    else MaintenanceMode.OFF
-                )
-
-        return self._maintenance_mode
+        return self.effective_maintenance_mode
 
     @maintenance_mode.setter
     def maintenance_mode(self, value: MaintenanceMode.choices) -> None:
@@ -814,6 +806,11 @@ class ServiceComponent(ADCMEntity):
         choices=MaintenanceMode.choices,
         default=MaintenanceMode.OFF,
     )
+    effective_maintenance_mode = models.CharField(
+        max_length=64,
+        choices=MaintenanceMode.choices,
+        default=MaintenanceMode.OFF,
+    )
 
     __error_code__ = "COMPONENT_NOT_FOUND"
 
@@ -863,18 +860,7 @@ class ServiceComponent(ADCMEntity):
         if self._maintenance_mode != MaintenanceMode.OFF:
             return self._maintenance_mode
 
-        if self.service.maintenance_mode_attr == MaintenanceMode.ON:
-            return self.service.maintenance_mode_attr
-
-        host_ids = HostComponent.objects.filter(component=self).values_list("host_id", flat=True)
-        if host_ids:
-            return (
-                MaintenanceMode.ON
-                if all(Host.objects.get(pk=host_id).maintenance_mode == MaintenanceMode.ON for host_id in host_ids)
-                else MaintenanceMode.OFF
-            )
-
-        return self._maintenance_mode
+        return self.effective_maintenance_mode
 
     @maintenance_mode.setter
     def maintenance_mode(self, value: MaintenanceMode.choices) -> None:
@@ -1033,16 +1019,21 @@ class GroupConfig(ADCMModel):
         attr = {k: v for k, v in cl.attr.items() if k not in ("group_keys", "custom_group_keys")}
         return attr
 
-    def get_config_and_attr(self):
-        """Return merge object config with group config and merge attr"""
+    def get_config_and_attr(self, object_cl: ConfigLog | None = None, group_cl: ConfigLog | None = None):
+        """
+        Return merge object config with group config and merge attr
+        Current config logs of object and group could be passed if they are already loaded
+        """
 
-        object_cl = ConfigLog.objects.get(id=self.object.config.current)
+        if object_cl is None:
+            object_cl = ConfigLog.objects.get(id=self.object.config.current)
         object_config = object_cl.config
         object_attr = object_cl.attr
-        group_cl = ConfigLog.objects.get(id=self.config.current)
+        if group_cl is None:
+            group_cl = ConfigLog.objects.get(id=self.config.current)
         group_config = group_cl.config
         group_keys = group_cl.attr.get("group_keys", {})
-        group_attr = self.get_config_attr()
+        group_attr = {k: v for k, v in group_cl.attr.items() if k not in ("group_keys", "custom_group_keys")}
         config = self.merge_config(object_config, group_config, group_keys)
         attr = self.merge_attr(object_attr, group_attr, group_keys)
         self.preparing_file_type_field(config)
@@ -1489,8 +1480,7 @@ class TaskLog(ADCMModel):
             cause=ConcernCause.Job.value,
         )
         self.save()
-        for obj in objects:
-            obj.add_to_concerns(self.lock)
+        self.lock.add_related_objects(objects)
 
     def unlock_affected(self) -> None:
         if not self.lock:
@@ -1506,6 +1496,18 @@ class TaskLog(ADCMModel):
         Cancel running task process
         task status will be updated in separate process of task runner
         """
+        if QueuedTask.objects.filter(task=self, claimed=False).delete()[0]:
+            # task is not started by executor yet, so there is no process to terminate
+            self.unlock_affected()
+            self.status = JobStatus.ABORTED
+            self.finish_date = timezone.now()
+            self.save(update_fields=["status", "finish_date"])
+            if event_queue:
+                event_queue.set_task_status(self.pk, self.status)
+                event_queue.send_state()
+
+            return
+
         if self.pid == 0:
             raise AdcmEx(
                 "NOT_ALLOWED_TERMINATION",
@@ -1536,6 +1538,17 @@ class TaskLog(ADCMModel):
         os.kill(self.pid, signal.SIGTERM)
 
 
+class QueuedTask(ADCMModel):
+    """Task waiting to be run by resident task executor (see task_executor.py)"""
+
+    task = models.ForeignKey(TaskLog, on_delete=models.CASCADE)
+    args = models.CharField(max_length=16, blank=True, default="")
+    priority = models.IntegerField(default=0)
+    date = models.DateTimeField(auto_now_add=True)
+    # task is taken by executor to be run, item is removed when task process is started
+    claimed = models.BooleanField(default=False)
+
+
 class JobLog(ADCMModel):
     task = models.ForeignKey(TaskLog, on_delete=models.SET_NULL, null=True, default=None)
     action = models.ForeignKey(Action, on_delete=models.SET_NULL, null=True, default=None)
@@ -1587,6 +1600,9 @@ class LogStorage(ADCMModel):
     body = models.TextField(blank=True, null=True)
     type = models.CharField(max_length=16, choices=LOG_TYPE)
     format = models.CharField(max_length=16, choices=FORMAT_TYPE)
+    # body of finished job's stdout and stderr is moved to cm.log_storage
+    checksum = models.CharField(max_length=64, blank=True, default="")
+    size = models.BigIntegerField(null=True, default=None)
 
     class Meta:
         constraints = [
@@ -1868,8 +1884,66 @@ class ConcernItem(ADCMModel):
             self.host_entities.all(),
         )
 
+    @staticmethod
+    def _group_by_model(objects: Iterable[ADCMEntity]) -> Dict[type, Dict[int, ADCMEntity]]:
+        grouped = {}
+        for obj in objects:
+            grouped.setdefault(obj.__class__, {})[obj.pk] = obj
+        return grouped
+
+    def add_related_objects(self, objects: Iterable[ADCMEntity]) -> None:
+        """Bulk version of `ADCMEntity.add_to_concerns`, makes one insert per object type"""
+        if self.pk is None:
+            return
+
+        for model, model_objects in self._group_by_model(objects).items():
+            through = model.concerns.through
+            entity_field = model.concerns.field.m2m_column_name()
+            concern_field = model.concerns.field.m2m_reverse_name()
+            existing = set(
+                through.objects.filter(**{concern_field: self.pk, f"{entity_field}__in": model_objects}).values_list(
+                    entity_field, flat=True
+                )
+            )
+            new_objects = [obj for pk, obj in model_objects.items() if pk not in existing]
+            through.objects.bulk_create(
+                [through(**{entity_field: obj.pk, concern_field: self.pk}) for obj in new_objects]
+            )
+            for obj in new_objects:
+                m2m_changed.send(
+                    sender=through,
+                    instance=obj,
+                    action="post_add",
+                    reverse=False,
+                    model=ConcernItem,
+                    pk_set={self.pk},
+                    using=through.objects.db,
+                )
+
+    def remove_related_objects(self, objects: Iterable[ADCMEntity]) -> None:
+        """Bulk version of `ADCMEntity.remove_from_concerns`, makes one delete per object type"""
+        if self.pk is None:
+            return
+
+        for model, model_objects in self._group_by_model(objects).items():
+            through = model.concerns.through
+            entity_field = model.concerns.field.m2m_column_name()
+            concern_field = model.concerns.field.m2m_reverse_name()
+            links = through.objects.filter(**{concern_field: self.pk, f"{entity_field}__in": model_objects})
+            removed = set(links.values_list(entity_field, flat=True))
+            links.delete()
+            for pk in removed:
+                m2m_changed.send(
+                    sender=through,
+                    instance=model_objects[pk],
+                    action="post_remove",
+                    reverse=False,
+                    model=ConcernItem,
+                    pk_set={self.pk},
+                    using=through.objects.db,
+                )
+
     def delete(self, using=None, keep_parents=False):
         """Explicit remove many-to-many references before deletion in order to emit signals"""
-        for entity in self.related_objects:
-            entity.remove_from_concerns(self)
+        self.remove_related_objects(self.related_objects)
         return super().delete(using, keep_parents)
@@ -0,0 +1,139 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from cm.adcm_config import get_adcm_config
+from cm.models import (
+    Host,
+    HostProvider,
+    JobStatus,
+    QueuedTask,
+    TaskLog,
+    get_object_cluster,
+)
+
+DEFAULT_LIMITS = {
+    "max_tasks": 10,
+    "max_cluster_tasks": 5,
+    "max_provider_tasks": 5,
+}
+HIGH_PRIORITY = 10
+TaskScope = Tuple[Optional[int], Optional[int]]
+
+
+def get_task_priority(task: TaskLog) -> int:
+    """Built-in maintenance mode and service deletion actions are short and unblock users, so they go first"""
+    if task.action and task.action.name in settings.ADCM_SERVICE_ACTION_NAMES_SET:
+        return HIGH_PRIORITY
+
+    return 0
+
+
+def get_task_scope(task: TaskLog) -> TaskScope:
+    """Get ids of cluster and host provider task is run on"""
+    obj = task.task_object
+    cluster = get_object_cluster(obj)
+    provider = None
+    if isinstance(obj, HostProvider):
+        provider = obj
+    elif isinstance(obj, Host):
+        provider = obj.provider
+
+    return getattr(cluster, "pk", None), getattr(provider, "pk", None)
+
+
+class TaskScheduler:
+    """
+    Takes queued tasks in priority order while global, per-cluster and per-provider limits
+    of running tasks set in ADCM config allow it
+    """
+
+    def __init__(self):
+        self._scopes: Dict[int, TaskScope] = {}
+
+    @staticmethod
+    def get_limits() -> dict:
+        _, config = get_adcm_config("job_scheduler")
+        limits = dict(DEFAULT_LIMITS)
+        limits.update({key: value for key, value in (config or {}).items() if value})
+
+        return limits
+
+    def _get_scope(self, task: TaskLog) -> TaskScope:
+        if task.pk not in self._scopes:
+            self._scopes[task.pk] = get_task_scope(task)
+
+        return self._scopes[task.pk]
+
+    @staticmethod
+    def release(item: QueuedTask) -> None:
+        """Return claimed task to the queue, e.g. when its process is failed to start"""
+        TaskLog.objects.filter(pk=item.task_id).update(status=JobStatus.CREATED)
+        QueuedTask.objects.filter(pk=item.pk).update(claimed=False)
+
+    def release_claimed(self) -> None:
+        """
+        Return to the queue tasks claimed by stopped executor before their processes are started.
+        Task process sets pid of the task, tasks which are started are only removed from the queue
+        """
+        for item in QueuedTask.objects.filter(claimed=True).select_related("task"):
+            if item.task.pid:
+                item.delete()
+            else:
+                self.release(item)
+
+    def schedule(self) -> List[QueuedTask]:
+        """
+        Claim tasks which could be run now and return their queue items.
+        Item should be removed from the queue when task process is started or released otherwise
+        """
+        queued = list(QueuedTask.objects.filter(claimed=False).select_related("task").order_by("-priority", "id"))
+        if not queued:
+            return []
+
+        limits = self.get_limits()
+        running = list(TaskLog.objects.filter(status=JobStatus.RUNNING))
+        known_ids = {task.pk for task in running} | {item.task_id for item in queued}
+        self._scopes = {task_id: scope for task_id, scope in self._scopes.items() if task_id in known_ids}
+        clusters, providers = Counter(), Counter()
+        for task in running:
+            cluster_id, provider_id = self._get_scope(task)
+            clusters[cluster_id] += 1
+            providers[provider_id] += 1
+
+        total = len(running)
+        result = []
+        for item in queued:
+            if total >= limits["max_tasks"]:
+                break
+
+            cluster_id, provider_id = self._get_scope(item.task)
+            if cluster_id is not None and clusters[cluster_id] >= limits["max_cluster_tasks"]:
+                continue
+            if provider_id is not None and providers[provider_id] >= limits["max_provider_tasks"]:
+                continue
+
+            # task could be cancelled while it is queued
+            if not QueuedTask.objects.filter(pk=item.pk, claimed=False).update(claimed=True):
+                continue
+
+            item.claimed = True
+            total += 1
+            clusters[cluster_id] += 1
+            providers[provider_id] += 1
+            result.append(item)
+
+        return result
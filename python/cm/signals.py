@@ -10,6 +10,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import casestyle
+from django.core.signals import request_started
 from django.db import transaction
 from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
@@ -17,6 +18,8 @@ from django.utils import timezone
 
 from audit.models import MODEL_TO_AUDIT_OBJECT_TYPE_MAP, AuditObject
 from audit.utils import mark_deleted_audit_object
+from cm.adcm_config import reset_prototype_config_cache
+from cm.hierarchy import reset_hierarchy_cache, update_maintenance_mode
 from cm.logger import logger
 from cm.models import (
     ADCM,
@@ -27,8 +30,10 @@ from cm.models import (
     DummyData,
     GroupConfig,
     Host,
+    HostComponent,
     HostProvider,
     Prototype,
+    PrototypeConfig,
     ServiceComponent,
 )
 from cm.status_api import post_event
@@ -154,3 +159,85 @@ def m2m_change(sender, **kwargs):
     args = (action, module, name, obj.pk)
     logger.info('%s %s %s #%s', *args)
     _post_event(*args)
+
+
+@receiver(post_save, sender=Cluster)
+@receiver(post_save, sender=ClusterObject)
+@receiver(post_save, sender=ServiceComponent)
+@receiver(post_save, sender=Host)
+@receiver(post_save, sender=HostProvider)
+@receiver(post_save, sender=HostComponent)
+@receiver(post_delete, sender=Cluster)
+@receiver(post_delete, sender=ClusterObject)
+@receiver(post_delete, sender=ServiceComponent)
+@receiver(post_delete, sender=Host)
+@receiver(post_delete, sender=HostProvider)
+@receiver(post_delete, sender=HostComponent)
+def hierarchy_change(sender, **kwargs):
+    """Hierarchy links or maintenance mode could be changed, so cached hierarchies are outdated"""
+    reset_hierarchy_cache()
+
+
+def _is_maintenance_mode_changed(instance, created=False, update_fields=None, **kwargs) -> bool:
+    """Compare own maintenance mode with the value loaded from DB, saves of other fields don't change derived modes"""
+    if created:
+        # new host is not mapped to components yet, new service or component could change modes of their parents
+        return not isinstance(instance, Host)
+
+    field = "maintenance_mode" if isinstance(instance, Host) else "_maintenance_mode"
+    if update_fields is not None and field not in update_fields:
+        return False
+
+    loaded_values = getattr(instance, "_loaded_values", None)
+    if loaded_values is None:
+        return True
+
+    mode = getattr(instance, field)
+    if loaded_values.get(field) == mode:
+        return False
+
+    # the next save of the same instance is compared with the saved mode
+    loaded_values[field] = mode
+
+    return True
+
+
+@receiver(post_save, sender=ClusterObject)
+@receiver(post_save, sender=ServiceComponent)
+@receiver(post_save, sender=Host)
+@receiver(post_save, sender=HostComponent)
+@receiver(post_delete, sender=ServiceComponent)
+@receiver(post_delete, sender=HostComponent)
+def maintenance_mode_change(sender, instance, **kwargs):
+    """Derived maintenance mode of services and components depends on own modes, hosts and hostcomponent map"""
+    if kwargs.get("raw"):
+        return
+
+    if not isinstance(instance, HostComponent) and kwargs.get("signal") is post_save:
+        if not _is_maintenance_mode_changed(instance, **kwargs):
+            return
+
+    if isinstance(instance, Host):
+        # only hosts mapped to components affect derived maintenance mode
+        for cluster_id in HostComponent.objects.filter(host=instance).values_list("cluster_id", flat=True).distinct():
+            update_maintenance_mode(cluster_id)
+        return
+
+    modes = update_maintenance_mode(instance.cluster_id)
+    if isinstance(instance, (ClusterObject, ServiceComponent)) and kwargs.get("signal") is post_save:
+        key = ("service" if isinstance(instance, ClusterObject) else "component", instance.pk)
+        if key in modes:
+            instance.effective_maintenance_mode = modes[key]
+
+
+@receiver(request_started)
+def hierarchy_request_started(sender, **kwargs):
+    """Other processes could change hierarchy since previous request"""
+    reset_hierarchy_cache()
+
+
+@receiver(post_save, sender=Prototype)
+@receiver(post_save, sender=PrototypeConfig)
+def prototype_config_change(sender, **kwargs):
+    """Prototype configs are saved one by one on bundle update, cached specs of them are outdated"""
+    reset_prototype_config_cache()
@@ -17,6 +17,7 @@ import os
 import re
 import warnings
 from copy import deepcopy
+from functools import lru_cache
 from typing import Any
 
 import ruyaml
@@ -25,7 +26,6 @@ import yspec.checker
 from django.conf import settings
 from django.db import IntegrityError
 from rest_framework import status
-from version_utils import rpm
 
 import cm.checker
 from cm.adcm_config import (
@@ -45,6 +45,7 @@ from cm.models import (
     StageSubAction,
     StageUpgrade,
 )
+from cm.version import compare_versions
 
 NAME_REGEX = r"[0-9a-zA-Z_\.-]+"
 
@@ -123,11 +124,24 @@ def get_config_files(path, bundle_hash):
     return conf_list
 
 
+@lru_cache(maxsize=None)
+def get_adcm_schema() -> cm.checker.Schema:
+    with open(settings.CODE_DIR / "cm" / "adcm_schema.yaml", encoding=settings.ENCODING_UTF_8) as fd:
+        return cm.checker.Schema(ruyaml.round_trip_load(fd))
+
+
 def check_adcm_config(conf_file):
     warnings.simplefilter("error", ruyaml.error.ReusedAnchorWarning)
-    schema_file = settings.CODE_DIR / "cm" / "adcm_schema.yaml"
-    with open(schema_file, encoding=settings.ENCODING_UTF_8) as fd:
-        rules = ruyaml.round_trip_load(fd)
+    schema = get_adcm_schema()
+    try:
+        with open(conf_file, encoding=settings.ENCODING_UTF_8) as fd:
+            data = cm.checker.fast_load(fd)
+        schema.validate(data)
+        return data
+    except (cm.checker.FastLoadError, cm.checker.FormatError):
+        # file is loaded again by ruyaml to report errors with line numbers
+        pass
+
     try:
         with open(conf_file, encoding=settings.ENCODING_UTF_8) as fd:
             data = cm.checker.round_trip_load(fd, version="1.1", allow_duplicate_keys=True)
@@ -141,7 +155,7 @@ def check_adcm_config(conf_file):
     except ruyaml.composer.ComposerError as e:
         err("STACK_LOAD_ERROR", f"YAML Composer error: {e}")
     try:
-        cm.checker.check(data, rules)
+        schema.check(data)
         return data
     except cm.checker.FormatError as e:
         args = ""
@@ -403,7 +417,7 @@ def save_import(proto, conf):
             check_versions(proto, conf["import"][key], f"import \"{key}\"")
             set_version(si, conf["import"][key])
             if si.min_version and si.max_version:
-                if rpm.compare_versions(str(si.min_version), str(si.max_version)) > 0:
+                if compare_versions(str(si.min_version), str(si.max_version)) > 0:
                     msg = "Min version should be less or equal max version"
                     err("INVALID_VERSION_DEFINITION", msg)
         dict_to_obj(conf["import"][key], "required", si)
@@ -11,11 +11,13 @@
 # limitations under the License.
 
 import json
+import os
 from collections import defaultdict
-from typing import Iterable
+from typing import Dict, Iterable, List
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 from cm.logger import logger
 from cm.models import (
@@ -29,6 +31,15 @@ from cm.models import (
 
 API_URL = "http://localhost:8020/api/v1"
 TIMEOUT = 0.01
+EVENT_TIMEOUT = 0.5
+EVENT_BATCH_SIZE = 100
+EVENT_BUFFER_SIZE = 1000
+EVENT_SEND_ATTEMPTS = 2
+POOL_SIZE = 4
+STATE_OBJECT_TYPES = ("cluster", "service", "host", "provider", "component")
+COALESCED_EVENTS = ("change_state", "change_job_status")
+
+_sessions: Dict[int, requests.Session] = {}
 
 
 class Event:
@@ -39,39 +50,117 @@ class Event:
         self.send_state()
 
     def send_state(self):
-        while self.events:
-            try:
-                func, args = self.events.pop(0)
-                func(*args)
-            except IndexError:
-                pass
+        events, self.events = self.events, []
+        event_publisher.publish(events)
 
     def set_object_state(self, obj_type, obj_id, state):
-        self.events.append((set_obj_state, (obj_type, obj_id, state)))
+        if check_state_object_type(obj_type):
+            self.events.append(make_event("change_state", obj_type, obj_id, "state", state))
 
     def change_object_multi_state(self, obj_type, obj_id, multi_state):
-        self.events.append((change_obj_multi_state, (obj_type, obj_id, multi_state)))
+        if check_state_object_type(obj_type):
+            self.events.append(make_event("change_state", obj_type, obj_id, "multi_state", multi_state))
 
     def set_job_status(self, job_id, status):
-        self.events.append((set_job_status, (job_id, status)))
+        self.events.append(make_event("change_job_status", "job", job_id, "status", status))
 
     def set_task_status(self, task_id, status):
-        self.events.append((set_task_status, (task_id, status)))
-
-
-def api_request(method, url, data=None):
+        self.events.append(make_event("change_job_status", "task", task_id, "status", status))
+
+
+class EventPublisher:
+    """
+    Sends events to status server in batches through pooled connections.
+    State changes of the same object are coalesced to the last one. Events which could not be sent
+    are kept in bounded buffer and resent with the next batch, the oldest of them are dropped on overflow
+    """
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self.buffer: List[dict] = []
+        self.buffer_size = buffer_size
+        self.sent = 0
+        self.dropped = 0
+
+    @staticmethod
+    def coalesce(events: Iterable[dict]) -> List[dict]:
+        result = {}
+        for index, event in enumerate(events):
+            details = event["object"]["details"]
+            if event["event"] in COALESCED_EVENTS and isinstance(details, dict):
+                key = (event["event"], event["object"]["type"], event["object"]["id"], details["type"])
+            else:
+                key = index
+
+            # event is moved to the position of the last change
+            result.pop(key, None)
+            result[key] = event
+
+        return list(result.values())
+
+    def publish(self, events: Iterable[dict]) -> None:
+        events = self.coalesce([*self.buffer, *events])
+        self.buffer = []
+        for start in range(0, len(events), EVENT_BATCH_SIZE):
+            batch = events[start : start + EVENT_BATCH_SIZE]
+            if not self._send(batch):
+                self._keep(events[start:])
+                return
+
+    def _send(self, batch: List[dict]) -> bool:
+        logger.debug("post_event batch %s", batch)
+        for _ in range(EVENT_SEND_ATTEMPTS):
+            response = api_request("post", "/event/bulk/", batch, timeout=EVENT_TIMEOUT)
+            if response is None or response.status_code >= 500:
+                continue
+
+            if response.status_code in (200, 201):
+                self.sent += len(batch)
+            else:
+                # status server rejects the batch itself, there is no point to resend it
+                self.dropped += len(batch)
+
+            return True
+
+        return False
+
+    def _keep(self, events: List[dict]) -> None:
+        overflow = len(events) - self.buffer_size
+        if overflow > 0:
+            self.dropped += overflow
+            logger.error("%s events are dropped as status server is unavailable", overflow)
+            events = events[overflow:]
+
+        self.buffer = events
+
+
+event_publisher = EventPublisher()
+
+
+def get_session() -> requests.Session:
+    """Get session with connection pool of current process, forked process must not share it with parent"""
+    pid = os.getpid()
+    if pid not in _sessions:
+        _sessions.clear()
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+        _sessions[pid] = session
+
+    return _sessions[pid]
+
+
+def api_request(method, url, data=None, timeout=None):
     url = API_URL + url
     kwargs = {
         "headers": {
             "Content-Type": "application/json",
             "Authorization": f"Token {settings.ADCM_TOKEN}",
         },
-        "timeout": TIMEOUT,
+        "timeout": timeout or TIMEOUT,
     }
     if data is not None:
         kwargs["data"] = json.dumps(data)
     try:
-        request = requests.request(method, url, **kwargs)
+        request = get_session().request(method, url, **kwargs)
         if request.status_code not in (200, 201):
             logger.error("%s %s error %d: %s", method, url, request.status_code, request.text)
         return request
@@ -83,11 +172,11 @@ def api_request(method, url, data=None):
         return None
 
 
-def post_event(event, obj_type, obj_id, det_type=None, det_val=None):
+def make_event(event, obj_type, obj_id, det_type=None, det_val=None) -> dict:
     details = {"type": det_type, "value": det_val}
     if det_type and not det_val:
         details = det_type
-    data = {
+    return {
         "event": event,
         "object": {
             "type": obj_type,
@@ -95,6 +184,10 @@ def post_event(event, obj_type, obj_id, det_type=None, det_val=None):
             "details": details,
         },
     }
+
+
+def post_event(event, obj_type, obj_id, det_type=None, det_val=None):
+    data = make_event(event, obj_type, obj_id, det_type, det_val)
     logger.debug("post_event %s", data)
     return api_request("post", "/event/", data)
 
@@ -107,20 +200,23 @@ def set_task_status(task_id, status):
     return post_event("change_job_status", "task", task_id, "status", status)
 
 
-def set_obj_state(obj_type, obj_id, state):
+def check_state_object_type(obj_type) -> bool:
     if obj_type == "adcm":
-        return None
-    if obj_type not in ("cluster", "service", "host", "provider", "component"):
+        return False
+    if obj_type not in STATE_OBJECT_TYPES:
         logger.error("Unknown object type: '%s'", obj_type)
+        return False
+    return True
+
+
+def set_obj_state(obj_type, obj_id, state):
+    if not check_state_object_type(obj_type):
         return None
     return post_event("change_state", obj_type, obj_id, "state", state)
 
 
 def change_obj_multi_state(obj_type, obj_id, multi_state):
-    if obj_type == "adcm":
-        return None
-    if obj_type not in ("cluster", "service", "host", "provider", "component"):
-        logger.error("Unknown object type: '%s'", obj_type)
+    if not check_state_object_type(obj_type):
         return None
     return post_event("change_state", obj_type, obj_id, "multi_state", multi_state)
 
@@ -169,6 +265,106 @@ def get_component_status(comp: ServiceComponent):
     return get_status(comp, f"/component/{comp.id}/")
 
 
+class StatusBatch:
+    """
+    Statuses of many objects fetched from status server with a single request.
+    Lookups return the same codes as get_*_status functions, objects which were not
+    fetched in batch are requested one by one
+    """
+
+    kinds = ("clusters", "services", "hosts", "components", "hostcomponents")
+
+    def __init__(
+        self,
+        clusters: Iterable[Cluster] = (),
+        services: Iterable[ClusterObject] = (),
+        hosts: Iterable[Host] = (),
+        components: Iterable[ServiceComponent] = (),
+        host_components: Iterable[HostComponent] = (),
+    ):
+        self.error = None
+        self.statuses = {kind: {} for kind in self.kinds}
+        self.requested = {kind: set() for kind in self.kinds}
+        data = {
+            "clusters": [cluster.id for cluster in clusters],
+            "services": [[service.cluster_id, service.id] for service in services],
+            "hosts": [host.id for host in hosts],
+            "components": [component.id for component in components],
+            "hostcomponents": [[hc.host_id, hc.component_id] for hc in host_components],
+        }
+        for kind in self.kinds:
+            for item in data[kind]:
+                self.requested[kind].add(self._key(kind, item))
+
+        if any(data.values()):
+            self._fetch(data)
+
+    @staticmethod
+    def _key(kind: str, item) -> str:
+        if kind == "services":
+            return str(item[1])
+        if kind == "hostcomponents":
+            return f"{item[0]}.{item[1]}"
+        return str(item)
+
+    def _fetch(self, data: dict) -> None:
+        r = api_request("post", "/status/", data)
+        if r is None:
+            self.error = 32
+            return
+        try:
+            js = r.json()
+        except ValueError:
+            self.error = 8
+            return
+        for kind in self.kinds:
+            if isinstance(js.get(kind), dict):
+                self.statuses[kind] = js[kind]
+
+    def _get(self, kind: str, key: str) -> int:
+        if self.error is not None:
+            return self.error
+        return self.statuses[kind].get(key, 4)
+
+    def get_cluster_status(self, cluster: Cluster) -> int:
+        key = str(cluster.id)
+        if key not in self.requested["clusters"]:
+            return get_cluster_status(cluster)
+        return self._get("clusters", key)
+
+    def get_service_status(self, service: ClusterObject) -> int:
+        key = str(service.id)
+        if key not in self.requested["services"]:
+            return get_service_status(service)
+        if service.prototype.monitoring == "passive":
+            return 0
+        return self._get("services", key)
+
+    def get_host_status(self, host: Host) -> int:
+        key = str(host.id)
+        if key not in self.requested["hosts"]:
+            return get_host_status(host)
+        if host.prototype.monitoring == "passive":
+            return 0
+        return self._get("hosts", key)
+
+    def get_component_status(self, component: ServiceComponent) -> int:
+        key = str(component.id)
+        if key not in self.requested["components"]:
+            return get_component_status(component)
+        if component.prototype.monitoring == "passive":
+            return 0
+        return self._get("components", key)
+
+    def get_hc_status(self, hc: HostComponent) -> int:
+        key = f"{hc.host_id}.{hc.component_id}"
+        if key not in self.requested["hostcomponents"]:
+            return get_hc_status(hc)
+        if hc.component.prototype.monitoring == "passive":
+            return 0
+        return self._get("hostcomponents", key)
+
+
 def get_object_map(obj: ADCMEntity, url_type: str):
     if url_type == "service":
         r = api_request("get", f"/cluster/{obj.cluster.id}/service/{obj.id}/?view=interface")
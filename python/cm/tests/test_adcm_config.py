@@ -10,10 +10,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import Mock, call, patch
 
+from django.test import override_settings
+
 from adcm.tests.base import BaseTestCase
-from cm.adcm_config import process_config
+from cm.adcm_config import get_prototype_config, process_config
+from cm.tests.utils import gen_action, gen_bundle, gen_prototype, gen_prototype_config
 
 
 class TestAdcmConfig(BaseTestCase):
@@ -44,3 +49,42 @@ class TestAdcmConfig(BaseTestCase):
                 call(obj_mock, "global", "test"),
             ]
         )
+
+    def test_prototype_config_cache(self):
+        prototype = gen_prototype(gen_bundle(), "cluster")
+        action = gen_action(prototype=prototype)
+        gen_prototype_config(prototype, "group", "group", limits={"activatable": True, "active": False})
+        gen_prototype_config(prototype, "group", "string", subname="string", default="value")
+        gen_prototype_config(prototype, "param", "integer", action=action, default=1)
+
+        spec, flat_spec, conf, attr = get_prototype_config(prototype)
+        spec["group"]["string"]["default"] = "changed"
+        flat_spec["group/string"].limits["changed"] = True
+        conf["group"]["string"] = "changed"
+
+        with self.assertNumQueries(0):
+            cached_spec, cached_flat_spec, cached_conf, cached_attr = get_prototype_config(prototype)
+
+        self.assertEqual(cached_spec["group"]["string"]["default"], "value")
+        self.assertDictEqual(cached_flat_spec["group/string"].limits, {})
+        self.assertDictEqual(cached_conf, {"group": {"string": "value"}})
+        self.assertDictEqual(cached_attr, {"group": {"active": False}})
+        self.assertDictEqual(get_prototype_config(prototype, action)[2], {"param": 1})
+
+        gen_prototype_config(prototype, "other", "string", default="other")
+
+        self.assertDictEqual(get_prototype_config(prototype)[2], {"group": {"string": "value"}, "other": "other"})
+
+    def test_prototype_config_cache_reset_by_other_process(self):
+        prototype = gen_prototype(gen_bundle(), "cluster")
+        gen_prototype_config(prototype, "param", "string", default="value")
+
+        with TemporaryDirectory() as tmp_dir, override_settings(BUNDLE_STAMP_FILE=Path(tmp_dir, "bundle_stamp")):
+            get_prototype_config(prototype)
+            with self.assertNumQueries(0):
+                get_prototype_config(prototype)
+
+            Path(tmp_dir, "bundle_stamp").touch()
+
+            with self.assertNumQueries(2):
+                get_prototype_config(prototype)
@@ -24,6 +24,7 @@ from rest_framework.status import HTTP_201_CREATED
 
 from adcm.tests.base import BaseTestCase
 from cm.adcm_config import ansible_decrypt
+from cm.bundle import order_versions
 from cm.models import Bundle, Cluster, ConfigLog, Prototype
 
 # Since this module is beyond QA responsibility we will not fix docstrings here
@@ -253,3 +254,19 @@ class TestBundle(BaseTestCase):
 
         self.assertIn(settings.ANSIBLE_VAULT_HEADER, new_config_log.config["secretmap"]["key"])
         self.assertEqual(new_value, ansible_decrypt(new_config_log.config["secretmap"]["key"]))
+
+    def test_order_versions(self):
+        def get_orders():
+            return dict(Bundle.objects.values_list("version", "version_order"))
+
+        for version in ("2.0", "1.10", "1.9"):
+            Bundle.objects.create(name="test_bundle", version=version)
+        order_versions()
+
+        self.assertDictEqual(get_orders(), {"1.9": 1, "1.10": 2, "2.0": 3})
+
+        for version in ("1.9.1", "1.0~rc1", "02.0"):
+            Bundle.objects.create(name="test_bundle", version=version)
+        order_versions()
+
+        self.assertDictEqual(get_orders(), {"1.0~rc1": 1, "1.9": 2, "1.9.1": 3, "1.10": 4, "2.0": 5, "02.0": 5})
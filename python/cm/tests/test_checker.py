@@ -0,0 +1,113 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from django.test import TestCase
+
+from cm.checker import (
+    FastLoadError,
+    FormatError,
+    Schema,
+    SchemaError,
+    fast_load,
+    round_trip_load,
+)
+
+SCHEMA = """
+root:
+  match: list
+  item: object
+object:
+  match: dict
+  items:
+    name: string
+    type: type
+    objects: root
+    service: string
+  required_items:
+    - name
+    - service
+type:
+  match: set
+  variants: [cluster, service]
+string:
+  match: string
+"""
+
+MERGED = """
+base: &base {x: 1, y: 2}
+other: &other {w: 3, y: 9, q: 1}
+merged:
+  z: 0
+  <<: [*base, *other]
+  x: 5
+flags: [y, n, yes, off, 1e3, 017]
+"""
+
+
+class TestFastLoad(TestCase):
+    def test_same_as_round_trip_load(self):
+        data = fast_load(MERGED)
+        expected = round_trip_load(MERGED, version="1.1", allow_duplicate_keys=True)
+
+        self.assertEqual(data, expected)
+        self.assertListEqual(list(data["merged"].items()), list(expected["merged"].items()))
+
+    def test_duplicate_key(self):
+        with self.assertRaises(FastLoadError):
+            fast_load("a: 1\nb: 2\na: 3\n")
+
+    def test_reused_anchor(self):
+        with self.assertRaises(FastLoadError):
+            fast_load("a: &x 1\nb: &x 2\nc: *x\n")
+
+
+class TestSchema(TestCase):
+    def setUp(self) -> None:
+        self.schema = Schema(round_trip_load(SCHEMA))
+
+    def test_valid(self):
+        data = "- name: cluster\n  type: cluster\n  service: s\n  objects:\n    - name: service\n      type: service\n"
+
+        self.schema.check(round_trip_load(data))
+        self.schema.validate(fast_load(data))
+
+    def test_error_line(self):
+        data = round_trip_load(
+            "- name: cluster\n  service: s\n  objects:\n    - name: service\n      service: s\n      type: host\n"
+        )
+
+        with self.assertRaises(FormatError) as e:
+            self.schema.check(data)
+
+        self.assertEqual(e.exception.message, "Value \"host\" not in set ['cluster', 'service']")
+        self.assertEqual(e.exception.line, 3)
+        self.assertListEqual(
+            e.exception.path,
+            [("Value of list index", 0), ("Value of map key", "objects"), ("Value of list index", 0)]
+            + [("Value of map key", "type")],
+        )
+
+    def test_service_key_is_not_required_in_service(self):
+        self.schema.validate(fast_load("- name: service\n  type: service\n"))
+
+        with self.assertRaises(FormatError) as e:
+            self.schema.validate(fast_load("- name: cluster\n  type: cluster\n"))
+
+        self.assertEqual(e.exception.message, 'There is no required key "service" in map.')
+
+    def test_unknown_rule(self):
+        schema = Schema(round_trip_load("root:\n  match: list\n  item: unknown\n"))
+
+        schema.validate([])
+
+        with self.assertRaises(SchemaError):
+            schema.validate([1])
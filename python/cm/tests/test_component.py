@@ -76,11 +76,15 @@ class TestComponent(BaseTestCase):
             component=self.component,
         )
 
+        self.component.refresh_from_db()
+
         self.assertEqual(self.component.maintenance_mode, MaintenanceMode.ON)
 
         host_2.maintenance_mode = MaintenanceMode.OFF
         host_2.save(update_fields=["maintenance_mode"])
 
+        self.component.refresh_from_db()
+
         self.assertEqual(self.component.maintenance_mode, MaintenanceMode.OFF)
 
     def test_maintenance_mode_by_service(self):
@@ -92,4 +96,6 @@ class TestComponent(BaseTestCase):
 
         self.service.refresh_from_db()
 
+        self.component.refresh_from_db()
+
         self.assertEqual(self.component.maintenance_mode, MaintenanceMode.ON)
@@ -11,23 +11,46 @@
 # limitations under the License.
 
 from pathlib import Path
+from unittest.mock import call, patch
 
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
 
 from adcm.tests.base import APPLICATION_JSON, BaseTestCase
-from cm.api import add_host_to_cluster, save_hc
+from cm.api import add_host_to_cluster, check_hc, save_hc
 from cm.errors import AdcmEx
+from cm.hierarchy import defer_maintenance_mode_update, update_maintenance_mode
 from cm.job import check_hostcomponentmap
-from cm.models import Action, Bundle, ClusterObject, Host, Prototype, ServiceComponent
+from cm.models import (
+    Action,
+    Bundle,
+    ClusterObject,
+    Host,
+    HostComponent,
+    MaintenanceMode,
+    Prototype,
+    ServiceComponent,
+)
 from cm.tests.test_upgrade import (
     cook_cluster,
     cook_cluster_bundle,
     cook_provider,
     cook_provider_bundle,
 )
+from cm.tests.utils import (
+    gen_bundle,
+    gen_cluster,
+    gen_component,
+    gen_group,
+    gen_host,
+    gen_host_component,
+    gen_provider,
+    gen_service,
+)
 
 
 class TestHC(BaseTestCase):
@@ -190,3 +213,202 @@ class TestHC(BaseTestCase):
         )
 
         self.assertEqual(response.status_code, HTTP_200_OK)
+
+
+class TestSaveHC(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        bundle = gen_bundle()
+        self.cluster = gen_cluster(bundle=bundle)
+        self.service = gen_service(self.cluster, bundle=bundle)
+        self.component_1 = gen_component(self.service, bundle=bundle)
+        self.component_2 = gen_component(self.service, bundle=bundle)
+        provider = gen_provider()
+        self.host_1 = gen_host(provider, cluster=self.cluster)
+        self.host_2 = gen_host(provider, cluster=self.cluster)
+        self.hc_1 = gen_host_component(self.component_1, self.host_1)
+        self.hc_2 = gen_host_component(self.component_2, self.host_1)
+
+    def test_only_diff_is_written(self):
+        result = save_hc(
+            self.cluster,
+            [(self.service, self.host_1, self.component_1), (self.service, self.host_2, self.component_2)],
+        )
+
+        self.assertEqual(result[0].pk, self.hc_1.pk)
+        self.assertFalse(HostComponent.objects.filter(pk=self.hc_2.pk).exists())
+        self.assertEqual(
+            set(HostComponent.objects.filter(cluster=self.cluster).values_list("host_id", "component_id")),
+            {(self.host_1.pk, self.component_1.pk), (self.host_2.pk, self.component_2.pk)},
+        )
+        self.assertEqual(result[1], HostComponent.objects.get(host=self.host_2, component=self.component_2))
+
+    def test_hosts_are_removed_from_outdated_group_configs(self):
+        service_group = gen_group("service", self.service.pk, "clusterobject")
+        component_1_group = gen_group("component_1", self.component_1.pk, "servicecomponent")
+        component_2_group = gen_group("component_2", self.component_2.pk, "servicecomponent")
+        for group in (service_group, component_1_group, component_2_group):
+            group.hosts.add(self.host_1)
+
+        save_hc(self.cluster, [(self.service, self.host_1, self.component_1)])
+
+        self.assertListEqual(list(service_group.hosts.all()), [self.host_1])
+        self.assertListEqual(list(component_1_group.hosts.all()), [self.host_1])
+        self.assertListEqual(list(component_2_group.hosts.all()), [])
+
+        save_hc(self.cluster, [(self.service, self.host_2, self.component_1)])
+
+        self.assertListEqual(list(service_group.hosts.all()), [])
+        self.assertListEqual(list(component_1_group.hosts.all()), [])
+
+    def test_maintenance_mode_is_recalculated(self):
+        self.host_2.maintenance_mode = MaintenanceMode.ON
+        self.host_2.save()
+
+        save_hc(self.cluster, [(self.service, self.host_2, self.component_1)])
+
+        self.service.refresh_from_db()
+        self.component_1.refresh_from_db()
+        self.component_2.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.service.maintenance_mode, MaintenanceMode.ON)
+            self.assertEqual(self.component_1.maintenance_mode, MaintenanceMode.ON)
+            self.assertEqual(self.component_2.maintenance_mode, MaintenanceMode.OFF)
+
+        save_hc(
+            self.cluster, [(self.service, self.host_1, self.component_1), (self.service, self.host_2, self.component_2)]
+        )
+
+        self.service.refresh_from_db()
+        self.component_1.refresh_from_db()
+        self.component_2.refresh_from_db()
+        self.assertEqual(self.service.maintenance_mode, MaintenanceMode.OFF)
+        self.assertEqual(self.component_1.maintenance_mode, MaintenanceMode.OFF)
+        self.assertEqual(self.component_2.maintenance_mode, MaintenanceMode.ON)
+
+    def test_maintenance_mode_is_recalculated_only_on_its_change(self):
+        host = Host.objects.get(pk=self.host_1.pk)
+        service = ClusterObject.objects.get(pk=self.service.pk)
+
+        with patch("cm.signals.update_maintenance_mode") as mock_update:
+            host.description = "changed"
+            host.save()
+            service.state = "installed"
+            service.save()
+
+            mock_update.assert_not_called()
+
+            host.maintenance_mode = MaintenanceMode.ON
+            host.save()
+            service.maintenance_mode = MaintenanceMode.ON
+            service.save()
+            service.save()
+
+        self.assertListEqual(mock_update.call_args_list, [call(self.cluster.pk), call(self.cluster.pk)])
+
+    def test_deferred_maintenance_mode_update_is_skipped_on_error(self):
+        with patch("cm.hierarchy.get_effective_maintenance_modes") as mock_get_modes:
+            with self.assertRaises(ValueError), defer_maintenance_mode_update():
+                update_maintenance_mode(self.cluster.pk)
+                raise ValueError
+
+            mock_get_modes.assert_not_called()
+
+            update_maintenance_mode(self.cluster.pk)
+
+            mock_get_modes.assert_called_once_with(self.cluster.pk)
+
+
+class TestCheckHC(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.bundle = gen_bundle()
+        self.cluster = gen_cluster(bundle=self.bundle)
+        self.service = gen_service(self.cluster, bundle=self.bundle)
+        self.provider = gen_provider()
+
+    def gen_component(self, name: str, **kwargs) -> ServiceComponent:
+        prototype = Prototype.objects.create(
+            type="component", name=name, parent=self.service.prototype, bundle=self.bundle, **kwargs
+        )
+        return gen_component(self.service, prototype=prototype)
+
+    def gen_hosts(self, count: int) -> list[Host]:
+        return [gen_host(self.provider, cluster=self.cluster) for _ in range(count)]
+
+    def hc_in(self, component: ServiceComponent, hosts: list[Host]) -> list[dict]:
+        return [{"service_id": self.service.pk, "component_id": component.pk, "host_id": host.pk} for host in hosts]
+
+    def test_queries_do_not_depend_on_hc_size(self):
+        server = self.gen_component("server", constraint=[1, "+"])
+        agent = self.gen_component("agent", bound_to={"service": self.service.prototype.name, "component": "server"})
+        query_counts = []
+        for count in (3, 30):
+            hosts = self.gen_hosts(count)
+            hc_in = self.hc_in(server, hosts) + self.hc_in(agent, hosts)
+            HostComponent.objects.filter(cluster=self.cluster).delete()
+            with CaptureQueriesContext(connection) as queries:
+                host_comp_list = check_hc(self.cluster, hc_in)
+            query_counts.append(len(queries))
+            self.assertEqual(len(host_comp_list), len(hc_in))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_constraint_error(self):
+        component = self.gen_component("server", constraint=[0, 1])
+
+        with self.assertRaisesRegex(AdcmEx, "more then maximum") as error:
+            check_hc(self.cluster, self.hc_in(component, self.gen_hosts(2)))
+
+        self.assertEqual(error.exception.code, "COMPONENT_CONSTRAINT_ERROR")
+
+    def test_requires_error(self):
+        component = self.gen_component(
+            "agent", requires=[{"service": self.service.prototype.name, "component": "server"}]
+        )
+        self.gen_component("server", constraint=[0, "+"])
+
+        with self.assertRaisesRegex(AdcmEx, "no required component") as error:
+            check_hc(self.cluster, self.hc_in(component, self.gen_hosts(1)))
+
+        self.assertEqual(error.exception.code, "COMPONENT_CONSTRAINT_ERROR")
+
+    def test_bound_to_error(self):
+        server = self.gen_component("server")
+        agent = self.gen_component("agent", bound_to={"service": self.service.prototype.name, "component": "server"})
+        hosts = self.gen_hosts(2)
+
+        with self.assertRaisesRegex(AdcmEx, "No bound component") as error:
+            check_hc(self.cluster, self.hc_in(server, hosts) + self.hc_in(agent, hosts[:1]))
+
+        self.assertEqual(error.exception.code, "COMPONENT_CONSTRAINT_ERROR")
+
+    def test_host_in_maintenance_mode(self):
+        component = self.gen_component("server")
+        hosts = self.gen_hosts(2)
+        gen_host_component(component, hosts[0])
+        Host.objects.filter(pk__in=[host.pk for host in hosts]).update(maintenance_mode=MaintenanceMode.ON)
+
+        check_hc(self.cluster, self.hc_in(component, hosts[:1]))
+        with self.assertRaises(AdcmEx) as error:
+            check_hc(self.cluster, self.hc_in(component, hosts))
+
+        self.assertEqual(error.exception.code, "INVALID_HC_HOST_IN_MM")
+
+    def test_not_found_errors(self):
+        component = self.gen_component("server")
+        other_service = gen_service(gen_cluster(bundle=self.bundle), bundle=self.bundle)
+        host = self.gen_hosts(1)[0]
+
+        for item, code in (
+            ({"host_id": 0}, "HOST_NOT_FOUND"),
+            ({"service_id": other_service.pk}, "CLUSTER_SERVICE_NOT_FOUND"),
+            ({"component_id": 0}, "COMPONENT_NOT_FOUND"),
+            ({"host_id": gen_host(self.provider).pk}, "FOREIGN_HOST"),
+        ):
+            with self.subTest(code=code), self.assertRaises(AdcmEx) as error:
+                check_hc(self.cluster, [{**self.hc_in(component, [host])[0], **item}])
+
+            self.assertEqual(error.exception.code, code)
@@ -10,13 +10,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+from unittest import skip
 from unittest.mock import Mock, patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from adcm.tests.base import BaseTestCase
+from cm.adcm_config import reset_prototype_config_cache
 from cm.api import update_obj_config
 from cm.inventory import (
+    ClusterInventory,
+    ClusterInventoryCache,
     get_cluster_config,
     get_cluster_hosts,
     get_host,
@@ -28,7 +35,7 @@ from cm.inventory import (
     prepare_job_inventory,
     process_config_and_attr,
 )
-from cm.models import Action, ConfigLog, Host, JobLog
+from cm.models import Action, ConfigLog, Host, HostComponent, JobLog
 from cm.tests.utils import (
     gen_bundle,
     gen_cluster,
@@ -388,3 +395,175 @@ class TestInventory(BaseTestCase):
 
         component_12_host_vars = get_host_vars(self.host, component_12)
         self.assertDictEqual(component_12_host_vars, {})
+
+
+class TestClusterInventory(BaseTestCase):
+    # pylint: disable=too-many-instance-attributes
+    def setUp(self):
+        super().setUp()
+        self.cluster_bundle = gen_bundle()
+        self.cluster_pt = gen_prototype(self.cluster_bundle, "cluster", "cluster")
+        self.service_pt_1 = gen_prototype(self.cluster_bundle, "service", "service_1")
+        self.service_pt_2 = gen_prototype(self.cluster_bundle, "service", "service_2")
+        self.component_pt_11 = gen_prototype(self.cluster_bundle, "component", "component_11")
+        self.component_pt_12 = gen_prototype(self.cluster_bundle, "component", "component_12")
+        self.component_pt_21 = gen_prototype(self.cluster_bundle, "component", "component_21")
+        for proto in (
+            self.cluster_pt,
+            self.service_pt_1,
+            self.service_pt_2,
+            self.component_pt_11,
+            self.component_pt_12,
+            self.component_pt_21,
+        ):
+            gen_prototype_config(prototype=proto, name="some_string", field_type="string", group_customization=True)
+
+        self.cluster = gen_cluster(prototype=self.cluster_pt, config=gen_config({"some_string": "cluster"}))
+        self.service_1 = gen_service(
+            self.cluster, prototype=self.service_pt_1, config=gen_config({"some_string": "service_1"})
+        )
+        self.service_2 = gen_service(
+            self.cluster, prototype=self.service_pt_2, config=gen_config({"some_string": "service_2"})
+        )
+        self.component_11 = gen_component(
+            self.service_1, prototype=self.component_pt_11, config=gen_config({"some_string": "component_11"})
+        )
+        self.component_12 = gen_component(
+            self.service_1, prototype=self.component_pt_12, config=gen_config({"some_string": "component_12"})
+        )
+        self.component_21 = gen_component(
+            self.service_2, prototype=self.component_pt_21, config=gen_config({"some_string": "component_21"})
+        )
+
+        self.provider_bundle = gen_bundle()
+        self.host_pt = gen_prototype(self.provider_bundle, "host")
+        gen_prototype_config(prototype=self.host_pt, name="some_string", field_type="string")
+        self.provider = gen_provider(prototype=gen_prototype(self.provider_bundle, "provider"))
+
+        self.groups = {
+            obj: gen_group(f"group_{obj.pk}", obj.pk, model_name)
+            for obj, model_name in (
+                (self.cluster, "cluster"),
+                (self.service_1, "clusterobject"),
+                (self.component_21, "servicecomponent"),
+            )
+        }
+        for group in self.groups.values():
+            update_obj_config(group.config, {"some_string": group.name}, {"group_keys": {"some_string": True}})
+
+    def add_hosts(self, count: int) -> None:
+        for _ in range(count):
+            host = gen_host(self.provider, cluster=self.cluster, prototype=self.host_pt)
+            host.config = gen_config({"some_string": host.fqdn})
+            host.save()
+            gen_host_component(self.component_11, host)
+            gen_host_component(self.component_21, host)
+            if host.pk % 2:
+                gen_host_component(self.component_12, host)
+                for group in self.groups.values():
+                    group.hosts.add(host)
+
+    def test_same_as_functions(self):
+        self.add_hosts(4)
+        Host.objects.filter(pk=Host.objects.filter(cluster=self.cluster).first().pk).update(maintenance_mode="ON")
+        cluster_inventory = ClusterInventory(self.cluster)
+
+        self.assertDictEqual(cluster_inventory.get_cluster_hosts(), get_cluster_hosts(self.cluster))
+        self.assertDictEqual(cluster_inventory.get_host_groups({}), get_host_groups(self.cluster, {}))
+
+        action_host = [Host.objects.filter(cluster=self.cluster).last().pk]
+        self.assertDictEqual(
+            cluster_inventory.get_cluster_hosts(action_host), get_cluster_hosts(self.cluster, action_host)
+        )
+        self.assertDictEqual(
+            cluster_inventory.get_host_groups({}, action_host), get_host_groups(self.cluster, {}, action_host)
+        )
+
+    def test_num_queries_does_not_depend_on_hosts(self):
+        def count_queries() -> int:
+            reset_prototype_config_cache()
+            with CaptureQueriesContext(connection) as queries:
+                cluster_inventory = ClusterInventory(self.cluster)
+                cluster_inventory.get_cluster_hosts()
+                cluster_inventory.get_host_groups({})
+
+            return len(queries)
+
+        self.add_hosts(2)
+        num_queries = count_queries()
+        self.add_hosts(10)
+
+        self.assertEqual(count_queries(), num_queries)
+
+    def build_children(self, delta: dict, action_host=None) -> dict:
+        cluster_inventory = ClusterInventory(self.cluster)
+        return {
+            **cluster_inventory.get_cluster_hosts(action_host),
+            **cluster_inventory.get_host_groups(delta, action_host),
+        }
+
+    def test_cache_reuses_unchanged_inventory(self):
+        self.add_hosts(4)
+        inventory_cache = ClusterInventoryCache()
+        children = inventory_cache.get_children(self.cluster, {})
+
+        with patch("cm.inventory.ClusterInventory") as mock_cluster_inventory:
+            self.assertDictEqual(inventory_cache.get_children(self.cluster, {}), children)
+
+        mock_cluster_inventory.assert_not_called()
+        self.assertDictEqual(children, self.build_children({}))
+
+    def test_cache_rebuilds_changed_hosts(self):
+        self.add_hosts(4)
+        hosts = list(Host.objects.filter(cluster=self.cluster).order_by("pk"))
+        delta = {"add": {"service_1.component_11": {hosts[1].fqdn: hosts[1], hosts[2].fqdn: hosts[2]}}}
+        action_host = [hosts[0].pk, hosts[2].pk]
+        inventory_cache = ClusterInventoryCache()
+        inventory_cache.get_children(self.cluster, delta, action_host)
+
+        for host in hosts[1:3]:
+            update_obj_config(host.config, {"some_string": "changed"}, {})
+        Host.objects.filter(pk=hosts[1].pk).update(state="installed")
+        delta = {
+            "add": {"service_1.component_11": {host.fqdn: host for host in Host.objects.filter(pk__in=action_host)}}
+        }
+
+        self.assertDictEqual(
+            inventory_cache.get_children(self.cluster, delta, action_host), self.build_children(delta, action_host)
+        )
+
+    def test_cache_rebuilds_changed_cluster(self):
+        self.add_hosts(2)
+        inventory_cache = ClusterInventoryCache()
+        inventory_cache.get_children(self.cluster, {})
+        host = Host.objects.filter(cluster=self.cluster).first()
+
+        for change in (
+            lambda: update_obj_config(self.service_2.config, {"some_string": "changed"}, {}),
+            lambda: Host.objects.filter(pk=host.pk).update(maintenance_mode="ON"),
+            lambda: self.groups[self.cluster].hosts.add(host),
+            lambda: HostComponent.objects.filter(host=host, component=self.component_11).delete(),
+        ):
+            change()
+            self.assertDictEqual(inventory_cache.get_children(self.cluster, {}), self.build_children({}))
+
+    @skip("run as needed to check if performance remains the same")
+    def test_cluster_inventory_performance(self):
+        """
+        Un-skip it for manual performance testing after changes to cm/inventory.py
+        Synthetic cluster has 1000 hosts with 2-3 components on each
+        """
+        self.add_hosts(1000)
+
+        start = time.time()
+        cluster_inventory = ClusterInventory(self.cluster)
+        cluster_inventory.get_cluster_hosts()
+        cluster_inventory.get_host_groups({})
+        bulk_duration = time.time() - start
+
+        start = time.time()
+        get_cluster_hosts(self.cluster)
+        get_host_groups(self.cluster, {})
+        duration = time.time() - start
+
+        print(f"\n\n Cluster inventory is built in {bulk_duration} seconds, per host functions took {duration}")
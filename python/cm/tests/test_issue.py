@@ -10,20 +10,43 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from unittest.mock import patch
+import time
+from unittest import skip
+from unittest.mock import Mock, patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from adcm.tests.base import BaseTestCase
-from cm.api import add_cluster, add_service_to_cluster
+from cm.api import add_cluster, add_service_to_cluster, delete_service
 from cm.hierarchy import Tree
 from cm.issue import (
+    HIERARCHY_CHANGE,
+    HOST_COMPONENT_CHANGE,
     create_issue,
     do_check_import,
     recheck_issues,
     remove_issue,
     update_hierarchy_issues,
+    update_issue_after_deleting,
+)
+from cm.models import (
+    Bundle,
+    ClusterBind,
+    ConcernCause,
+    ConcernItem,
+    ConcernType,
+    HostComponent,
+    Prototype,
+    PrototypeImport,
+)
+from cm.tests.utils import (
+    gen_cluster,
+    gen_host,
+    gen_host_component,
+    gen_service,
+    generate_hierarchy,
 )
-from cm.models import Bundle, ClusterBind, ConcernCause, Prototype, PrototypeImport
-from cm.tests.utils import gen_service, generate_hierarchy
 
 mock_issue_check_map = {
     ConcernCause.Config: lambda x: False,
@@ -100,6 +123,131 @@ class CreateIssueTest(BaseTestCase):
         self.assertIn(cluster_issue.id, new_service_issues)
 
 
+class DirtyIssuesTest(BaseTestCase):
+    """Tests for `cm.issue.DirtyIssues`"""
+
+    def setUp(self) -> None:
+        self.hierarchy = generate_hierarchy()
+        self.cluster = self.hierarchy['cluster']
+        self.check_map = {cause: Mock(return_value=True) for cause in mock_issue_check_map}
+
+    def test_only_affected_causes_are_rechecked(self):
+        with patch('cm.issue._issue_check_map', self.check_map):
+            update_hierarchy_issues(self.cluster, HOST_COMPONENT_CHANGE)
+
+        self.check_map[ConcernCause.HostComponent].assert_called_once_with(self.cluster)
+        for cause in (ConcernCause.Config, ConcernCause.Import, ConcernCause.Service):
+            self.check_map[cause].assert_not_called()
+
+    def test_existing_issue_is_added_to_new_related_objects(self):
+        create_issue(self.cluster, ConcernCause.Config)
+        issue = self.cluster.get_own_issue(ConcernCause.Config)
+        host = gen_host(self.hierarchy['provider'], self.cluster, prototype=self.hierarchy['host'].prototype)
+        gen_host_component(self.hierarchy['component'], host)
+
+        self.assertListEqual(list(host.concerns.all()), [])
+
+        with patch('cm.issue._issue_check_map', self.check_map):
+            update_hierarchy_issues(self.cluster, HIERARCHY_CHANGE)
+
+        self.assertListEqual(list(host.concerns.all()), [issue])
+        for check in self.check_map.values():
+            check.assert_not_called()
+
+    def test_bulk_concern_writes(self):
+        provider = self.hierarchy['provider']
+        hosts = [gen_host(provider, prototype=self.hierarchy['host'].prototype) for _ in range(20)]
+        concern = ConcernItem.objects.create(type=ConcernType.Issue, name='test concern')
+        hosts[0].add_to_concerns(concern)
+
+        with CaptureQueriesContext(connection) as queries:
+            concern.add_related_objects([provider, *hosts])
+
+        self.assertEqual(len(queries), 4)  # select existing and insert new links for host and provider
+        self.assertEqual(concern.host_entities.count(), 20)
+        self.assertEqual(concern.hostprovider_entities.count(), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            concern.remove_related_objects(hosts)
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(concern.host_entities.count(), 0)
+        self.assertEqual(concern.hostprovider_entities.count(), 1)
+
+
+class UpdateIssueAfterDeletingTest(BaseTestCase):
+    """Tests for `cm.issue.update_issue_after_deleting()`"""
+
+    def setUp(self) -> None:
+        self.hierarchy = generate_hierarchy()
+        self.cluster = self.hierarchy['cluster']
+        self.host = self.hierarchy['host']
+
+    def _gen_unrelated_issues(self, count: int) -> None:
+        prototype = self.cluster.prototype
+        for _ in range(count):
+            create_issue(gen_cluster(prototype=prototype), ConcernCause.Config)
+
+    def test_orphan_issue_is_deleted(self):
+        service = self.hierarchy['service']
+        create_issue(service, ConcernCause.Config)
+        issue_pk = service.get_own_issue(ConcernCause.Config).pk
+        service.delete()
+
+        update_issue_after_deleting([self.cluster])
+
+        self.assertFalse(ConcernItem.objects.filter(pk=issue_pk).exists())
+
+    def test_moved_out_objects_are_detached(self):
+        create_issue(self.cluster, ConcernCause.Config)
+        issue = self.cluster.get_own_issue(ConcernCause.Config)
+        self.assertListEqual(list(self.host.concerns.all()), [issue])
+
+        HostComponent.objects.filter(cluster=self.cluster).delete()
+        update_issue_after_deleting([self.cluster, self.host])
+
+        self.assertListEqual(list(self.host.concerns.all()), [])
+        self.assertListEqual(list(self.cluster.concerns.all()), [issue])
+
+    def test_unchanged_objects_are_not_checked(self):
+        create_issue(self.cluster, ConcernCause.Config)
+        HostComponent.objects.filter(cluster=self.cluster).delete()
+
+        update_issue_after_deleting([self.hierarchy['provider']])
+        self.assertEqual(self.host.concerns.count(), 1)
+
+        update_issue_after_deleting()
+        self.assertEqual(self.host.concerns.count(), 0)
+
+    def test_queries_do_not_depend_on_unrelated_clusters(self):
+        create_issue(self.cluster, ConcernCause.Config)
+        query_counts = []
+        for count in (1, 10):
+            self._gen_unrelated_issues(count)
+            with CaptureQueriesContext(connection) as queries:
+                update_issue_after_deleting([self.cluster, self.host])
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    @skip("run as needed to check if performance remains the same")
+    def test_update_issue_after_deleting_performance(self):
+        """
+        Un-skip it for manual performance testing after changes to cm/issue.py
+        Scoped update takes the same ~0.01 s with 10, 100 and 1000 unrelated clusters with issues,
+        scan of all concerns takes ~0.03 s, ~0.2 s and ~1.6 s respectively
+        """
+        create_issue(self.cluster, ConcernCause.Config)
+        total = 0
+        for count in (10, 90, 900):
+            self._gen_unrelated_issues(count)
+            total += count
+            start = time.time()
+            update_issue_after_deleting([self.cluster, self.host])
+            duration = time.time() - start
+            print(f"\n\n Update of issues with {total} unrelated clusters is {duration} seconds")
+
+
 class RemoveIssueTest(BaseTestCase):
     """Tests for `cm.issue.create_issues()`"""
 
@@ -273,3 +421,20 @@ class TestImport(BaseTestCase):
         issue = service.get_own_issue(ConcernCause.Import)
 
         self.assertIsNone(issue)
+
+    def test_issue_after_deleting_service_with_cluster_import(self):
+        b1, proto1, cluster1 = self.cook_cluster("Hadoop", "Cluster1")
+        PrototypeImport.objects.create(prototype=proto1, name="Monitoring", required=True)
+        proto2 = Prototype.objects.create(type="service", name="YARN", bundle=b1)
+        service = add_service_to_cluster(cluster1, proto2)
+
+        _, _, cluster2 = self.cook_cluster("Monitoring", "Cluster2")
+        ClusterBind.objects.create(cluster=cluster1, service=service, source_cluster=cluster2)
+        recheck_issues(cluster1)
+
+        self.assertIsNone(cluster1.get_own_issue(ConcernCause.Import))
+
+        delete_service(service)
+
+        self.assertFalse(ClusterBind.objects.filter(cluster=cluster1).exists())
+        self.assertIsNotNone(cluster1.get_own_issue(ConcernCause.Import))
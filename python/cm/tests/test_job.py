@@ -13,9 +13,11 @@
 # pylint: disable=protected-access
 
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import Mock, patch
 
 from django.conf import settings
+from django.test import override_settings
 from django.utils import timezone
 
 from adcm.tests.base import BaseTestCase
@@ -24,6 +26,7 @@ from cm.job import (
     check_cluster,
     check_service_task,
     cook_script,
+    create_task,
     get_adcm_config,
     get_bundle_root,
     get_state,
@@ -32,6 +35,7 @@ from cm.job import (
     prepare_job_config,
     re_prepare_job,
     restore_hc,
+    run_task,
     set_action_state,
     set_job_status,
     set_task_status,
@@ -47,7 +51,9 @@ from cm.models import (
     HostProvider,
     JobLog,
     JobStatus,
+    LogStorage,
     Prototype,
+    QueuedTask,
     ServiceComponent,
     SubAction,
     TaskLog,
@@ -56,8 +62,13 @@ from cm.tests.utils import (
     gen_action,
     gen_bundle,
     gen_cluster,
+    gen_component,
+    gen_host,
+    gen_host_component,
     gen_job_log,
     gen_prototype,
+    gen_provider,
+    gen_service,
     gen_task_log,
 )
 
@@ -98,6 +109,29 @@ class TestJob(BaseTestCase):
         self.assertEqual(task.status, JobStatus.RUNNING)
         event.set_task_status.assert_called_once_with(task.id, JobStatus.RUNNING)
 
+    @patch("cm.job.subprocess.Popen")
+    @patch("cm.job.Daemon.checkpid")
+    def test_run_task(self, mock_checkpid, mock_popen):
+        event = Mock()
+        bundle = Bundle.objects.create()
+        prototype = Prototype.objects.create(bundle=bundle)
+        action = Action.objects.create(prototype=prototype)
+        task = TaskLog.objects.create(action=action, object_id=1, start_date=timezone.now(), finish_date=timezone.now())
+
+        mock_checkpid.return_value = True
+        run_task(task, event, "restart")
+
+        mock_popen.assert_not_called()
+        self.assertEqual(task.status, JobStatus.CREATED)
+        self.assertListEqual(list(QueuedTask.objects.values_list("task_id", "args")), [(task.pk, "restart")])
+
+        mock_checkpid.return_value = False
+        run_task(task, event)
+
+        mock_popen.assert_called_once()
+        self.assertEqual(task.status, JobStatus.RUNNING)
+        self.assertEqual(QueuedTask.objects.count(), 1)
+
     def test_get_state_single_job(self):
         bundle = gen_bundle()
         cluster_proto = gen_prototype(bundle, "cluster")
@@ -255,7 +289,7 @@ class TestJob(BaseTestCase):
 
         prepare_job(action, None, job.id, cluster, "", {}, None, False)
 
-        mock_prepare_job_inventory.assert_called_once_with(cluster, job.id, action, {}, None)
+        mock_prepare_job_inventory.assert_called_once_with(cluster, job.id, action, {}, None, None)
         mock_prepare_job_config.assert_called_once_with(action, None, job.id, cluster, "", False)
         mock_prepare_ansible_config.assert_called_once_with(job.id, action, None)
 
@@ -514,4 +548,46 @@ class TestJob(BaseTestCase):
         mock_get_actual_hc.assert_called_once_with(cluster)
         mock_get_old_hc.assert_called_once_with(task.hostcomponentmap)
         mock_cook_delta.assert_called_once_with(cluster, new_hc, action.hostcomponentmap, old_hc)
-        mock_prepare_job.assert_called_once_with(action, sub_action, job.id, cluster, task.config, delta, None, False)
+        mock_prepare_job.assert_called_once_with(
+            action, sub_action, job.id, cluster, task.config, delta, None, False, None
+        )
+
+    @patch("cm.job.ctx")
+    def test_create_task(self, mock_ctx):
+        mock_ctx.event = Mock()
+        bundle = gen_bundle()
+        cluster = gen_cluster(bundle=bundle)
+        service = gen_service(cluster, bundle=bundle)
+        component = gen_component(service, bundle=bundle)
+        provider = gen_provider()
+        hosts = [gen_host(provider) for _ in range(3)]
+        for host in hosts:
+            gen_host_component(component, host)
+        action = gen_action(prototype=cluster.prototype)
+        sub_actions = [
+            SubAction.objects.create(action=action, name="first", script_type="ansible"),
+            SubAction.objects.create(action=action, name="second", script_type="python"),
+        ]
+
+        with TemporaryDirectory() as run_dir, override_settings(RUN_DIR=Path(run_dir)):
+            task = create_task(action, cluster, {}, {}, [], [], False, [])
+
+            jobs = list(JobLog.objects.filter(task=task).order_by("id"))
+            self.assertListEqual([job.sub_action for job in jobs], sub_actions)
+            for job in jobs:
+                self.assertEqual(job.status, JobStatus.CREATED)
+                self.assertTrue(Path(run_dir, str(job.pk), "tmp").is_dir())
+                self.assertSetEqual(
+                    set(LogStorage.objects.filter(job=job).values_list("name", "type")),
+                    {(job.sub_action.script_type, "stdout"), (job.sub_action.script_type, "stderr")},
+                )
+
+        self.assertIsNotNone(task.lock)
+        for obj in (cluster, service, component, *hosts):
+            obj.refresh_from_db()
+            self.assertListEqual(list(obj.concerns.all()), [task.lock])
+
+        task.unlock_affected()
+
+        for obj in (cluster, service, component, *hosts):
+            self.assertFalse(obj.concerns.exists())
@@ -0,0 +1,96 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.test import override_settings
+
+from adcm.tests.base import BaseTestCase
+from cm.log import get_log_content, get_log_size, read_log_chunk, store_log_file
+from cm.log_storage import BLOCK_SIZE, UNUSED_BLOB_TTL, LogBlobStorage
+from cm.models import LogStorage
+from cm.tests.utils import gen_adcm, gen_job_log, gen_task_log
+
+
+class TestLogBlobStorage(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.tmp_dir = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.storage = LogBlobStorage(root=Path(self.tmp_dir.name))
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_random_access(self):
+        content = random.Random(0).randbytes(BLOCK_SIZE * 3 + 100)
+
+        checksum, size = self.storage.save(BytesIO(content))
+        blob = self.storage.open(checksum)
+
+        self.assertEqual(size, len(content))
+        self.assertEqual(blob.read(), content)
+        for offset, limit in ((0, 10), (BLOCK_SIZE - 5, 10), (BLOCK_SIZE, BLOCK_SIZE * 2 + 1), (size - 50, 100)):
+            self.assertEqual(blob.read(offset=offset, limit=limit), content[offset : offset + limit])
+
+        self.assertEqual(blob.read(offset=size + 1, limit=10), b"")
+
+    def test_empty(self):
+        checksum, size = self.storage.save(BytesIO(b""))
+
+        self.assertEqual(size, 0)
+        self.assertEqual(self.storage.open(checksum).read(), b"")
+
+    def test_same_content_is_stored_once(self):
+        checksum_1, _ = self.storage.save_text("log")
+        checksum_2, _ = self.storage.save_text("log")
+
+        self.assertEqual(checksum_1, checksum_2)
+        self.assertEqual(len(list(self.storage.root.glob("*/*"))), 1)
+
+    def test_remove_unused(self):
+        used, _ = self.storage.save_text("used")
+        unused, _ = self.storage.save_text("unused")
+        recent, _ = self.storage.save_text("recent")
+        old = self.storage.get_path(unused).stat().st_mtime - UNUSED_BLOB_TTL - 1
+        for checksum in (used, unused):
+            os.utime(self.storage.get_path(checksum), (old, old))
+
+        self.assertEqual(self.storage.remove_unused(used=[used]), 1)
+        self.assertTrue(self.storage.get_path(used).exists())
+        self.assertFalse(self.storage.get_path(unused).exists())
+        self.assertTrue(self.storage.get_path(recent).exists())
+
+    def test_store_log_file(self):
+        job = gen_job_log(gen_task_log(gen_adcm()))
+        log_storage = LogStorage.objects.create(job=job, name="ansible", type="stdout", format="txt")
+
+        with (
+            TemporaryDirectory() as run_dir,
+            override_settings(RUN_DIR=Path(run_dir), LOG_STORAGE_DIR=self.storage.root),
+        ):
+            Path(run_dir, str(job.pk)).mkdir()
+            Path(run_dir, str(job.pk), "ansible-stdout.txt").write_text("ok: [localhost]\n", encoding="utf-8")
+
+            store_log_file(log_storage)
+
+        with override_settings(LOG_STORAGE_DIR=self.storage.root):
+            log_storage.refresh_from_db()
+
+            self.assertIsNone(log_storage.body)
+            self.assertEqual(get_log_size(log_storage), 16)
+            self.assertEqual(get_log_content(log_storage), "ok: [localhost]\n")
+            self.assertEqual(read_log_chunk(log_storage, offset=4, limit=100), (b"[localhost]\n", 16))
@@ -0,0 +1,151 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest.mock import Mock, patch
+
+from adcm.tests.base import BaseTestCase
+from cm.job import cancel_task
+from cm.models import JobStatus, QueuedTask
+from cm.scheduler import HIGH_PRIORITY, TaskScheduler
+from cm.tests.utils import (
+    gen_action,
+    gen_bundle,
+    gen_cluster,
+    gen_host,
+    gen_job_log,
+    gen_provider,
+    gen_task_log,
+)
+from init_db import init as init_adcm
+from task_executor import TaskExecutor
+
+
+class TestTaskScheduler(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        bundle = gen_bundle()
+        self.cluster_1 = gen_cluster(bundle=bundle)
+        self.cluster_2 = gen_cluster(bundle=bundle)
+        self.provider = gen_provider()
+        self.host = gen_host(self.provider)
+        self.scheduler = TaskScheduler()
+
+    def queue(self, obj, priority: int = 0) -> QueuedTask:
+        return QueuedTask.objects.create(task=gen_task_log(obj, gen_action()), priority=priority)
+
+    def test_limits_from_adcm_config(self):
+        init_adcm()
+
+        self.assertDictEqual(
+            TaskScheduler.get_limits(), {"max_tasks": 10, "max_cluster_tasks": 5, "max_provider_tasks": 5}
+        )
+
+    @patch.object(TaskScheduler, "get_limits")
+    def test_global_limit(self, mock_get_limits):
+        mock_get_limits.return_value = {"max_tasks": 2, "max_cluster_tasks": 2, "max_provider_tasks": 2}
+        queued = [self.queue(self.cluster_1), self.queue(self.cluster_2), self.queue(self.host)]
+
+        self.assertListEqual([item.pk for item in self.scheduler.schedule()], [queued[0].pk, queued[1].pk])
+        self.assertListEqual(list(QueuedTask.objects.filter(claimed=False)), [queued[2]])
+
+        for item in queued[:2]:
+            item.task.status = JobStatus.RUNNING
+            item.task.save()
+
+        self.assertListEqual(self.scheduler.schedule(), [])
+
+        queued[0].task.status = JobStatus.SUCCESS
+        queued[0].task.save()
+
+        self.assertListEqual([item.pk for item in self.scheduler.schedule()], [queued[2].pk])
+        self.assertFalse(QueuedTask.objects.filter(claimed=False).exists())
+
+    @patch.object(TaskScheduler, "get_limits")
+    def test_cluster_and_provider_limits(self, mock_get_limits):
+        mock_get_limits.return_value = {"max_tasks": 10, "max_cluster_tasks": 1, "max_provider_tasks": 1}
+        queued = [
+            self.queue(self.cluster_1),
+            self.queue(self.cluster_1),
+            self.queue(self.provider),
+            self.queue(self.host),
+            self.queue(self.cluster_2),
+        ]
+
+        self.assertListEqual(
+            [item.pk for item in self.scheduler.schedule()], [queued[0].pk, queued[2].pk, queued[4].pk]
+        )
+        self.assertListEqual(list(QueuedTask.objects.filter(claimed=False).order_by("pk")), [queued[1], queued[3]])
+
+    @patch.object(TaskScheduler, "get_limits")
+    def test_priority(self, mock_get_limits):
+        mock_get_limits.return_value = {"max_tasks": 1, "max_cluster_tasks": 1, "max_provider_tasks": 1}
+        self.queue(self.cluster_1)
+        urgent = self.queue(self.cluster_2, priority=HIGH_PRIORITY)
+
+        self.assertListEqual([item.pk for item in self.scheduler.schedule()], [urgent.pk])
+
+    @patch("cm.job.ctx")
+    def test_cancel_queued_task(self, mock_ctx):
+        mock_ctx.event = Mock()
+        item = self.queue(self.cluster_1)
+        gen_job_log(item.task)
+        item.task.lock_affected([self.cluster_1])
+
+        cancel_task(item.task)
+
+        item.task.refresh_from_db()
+        self.assertEqual(item.task.status, JobStatus.ABORTED)
+        self.assertIsNone(item.task.lock)
+        self.assertFalse(QueuedTask.objects.exists())
+        self.assertListEqual(self.scheduler.schedule(), [])
+
+    @patch.object(TaskScheduler, "get_limits")
+    def test_release_claimed(self, mock_get_limits):
+        mock_get_limits.return_value = {"max_tasks": 10, "max_cluster_tasks": 5, "max_provider_tasks": 5}
+        not_started, started = self.queue(self.cluster_1), self.queue(self.cluster_2)
+        self.scheduler.schedule()
+        for item, pid in ((not_started, 0), (started, 100)):
+            item.task.status = JobStatus.RUNNING
+            item.task.pid = pid
+            item.task.save()
+
+        TaskScheduler().release_claimed()
+
+        not_started.task.refresh_from_db()
+        self.assertEqual(not_started.task.status, JobStatus.CREATED)
+        self.assertListEqual(list(QueuedTask.objects.filter(claimed=False)), [not_started])
+
+    @patch("task_executor.Event")
+    @patch("task_executor.connections")
+    @patch("task_executor.os.fork")
+    @patch.object(TaskScheduler, "get_limits")
+    def test_fork_error(self, mock_get_limits, mock_fork, *_):
+        mock_get_limits.return_value = {"max_tasks": 10, "max_cluster_tasks": 5, "max_provider_tasks": 5}
+        mock_fork.side_effect = [OSError("Resource temporarily unavailable"), 100]
+        failed, started = self.queue(self.cluster_1), self.queue(self.cluster_2)
+        executor = TaskExecutor()
+
+        self.assertTrue(executor.run_queued())
+
+        failed.task.refresh_from_db()
+        started.task.refresh_from_db()
+        self.assertEqual(failed.task.status, JobStatus.CREATED)
+        self.assertEqual(started.task.status, JobStatus.RUNNING)
+        self.assertSetEqual(executor.children, {100})
+        self.assertListEqual(list(QueuedTask.objects.all()), [failed])
+        self.assertFalse(QueuedTask.objects.get().claimed)
+
+        mock_fork.side_effect = OSError("Resource temporarily unavailable")
+
+        self.assertFalse(executor.run_queued())
+        self.assertListEqual(list(QueuedTask.objects.filter(claimed=False)), [failed])
@@ -87,11 +87,15 @@ class TestService(BaseTestCase):
             component=component,
         )
 
+        self.service.refresh_from_db()
+
         self.assertEqual(self.service.maintenance_mode, MaintenanceMode.ON)
 
         host_2.maintenance_mode = MaintenanceMode.OFF
         host_2.save(update_fields=["maintenance_mode"])
 
+        self.service.refresh_from_db()
+
         self.assertEqual(self.service.maintenance_mode, MaintenanceMode.OFF)
 
     def test_maintenance_mode_by_components(self):
@@ -133,6 +137,8 @@ class TestService(BaseTestCase):
             component=component_2,
         )
 
+        self.service.refresh_from_db()
+
         self.assertEqual(self.service.maintenance_mode, MaintenanceMode.ON)
 
         self.client.post(
@@ -141,4 +147,6 @@ class TestService(BaseTestCase):
             content_type=APPLICATION_JSON,
         )
 
+        self.service.refresh_from_db()
+
         self.assertEqual(self.service.maintenance_mode, MaintenanceMode.OFF)
@@ -0,0 +1,377 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+from unittest.mock import patch
+
+from django.urls import reverse
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK
+
+from adcm.tests.base import BaseTestCase
+from cm.api import get_service_map, load_service_map
+from cm.models import MaintenanceMode
+from cm.status_api import Event, EventPublisher, StatusBatch
+from cm.tests.utils import (
+    gen_cluster,
+    gen_component,
+    gen_host,
+    gen_host_component,
+    gen_provider,
+    gen_service,
+)
+
+
+class FakeStatusServer(HTTPServer):
+    """Status server stub which answers batch and single object requests with stored statuses"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeStatusHandler)
+        self.requests = []
+        self.posted = {}
+        self.events = []
+        self.response_code = 200
+        self.statuses = {"clusters": {}, "services": {}, "hosts": {}, "components": {}, "hostcomponents": {}}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/api/v1"
+
+
+class FakeStatusHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def reply(self, data: dict, code: int = 200) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        kind, obj_id = self.path.strip("/").split("/")[-2:]
+        self.reply({"status": self.server.statuses[f"{kind}s"].get(obj_id, 0)})
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(("POST", self.path))
+        self.server.posted[self.path] = data
+        if self.path.endswith("/patch/"):
+            self.reply({}, code=self.server.response_code)
+            return
+
+        if self.path.endswith("/servicemap/") or self.path.endswith("/object/mm/"):
+            self.reply({})
+            return
+
+        if self.path.endswith("/event/bulk/"):
+            if self.server.response_code == 200:
+                self.server.events.extend(data)
+            self.reply({"sent": len(data)}, code=self.server.response_code)
+            return
+
+        out = {}
+        for kind, statuses in self.server.statuses.items():
+            out[kind] = {}
+            for item in data[kind]:
+                key = StatusBatch._key(kind, item)
+                if key in statuses:
+                    out[kind][key] = statuses[key]
+        self.reply(out)
+
+
+class TestStatusBatch(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.cluster = gen_cluster()
+        self.service = gen_service(self.cluster)
+        self.component = gen_component(self.service)
+        self.provider = gen_provider()
+        self.hosts = [
+            gen_host(self.provider, cluster=self.cluster, fqdn=f"host-{i}", bundle=self.provider.prototype.bundle)
+            for i in range(5)
+        ]
+        self.hc = gen_host_component(self.component, self.hosts[0])
+
+        self.server = FakeStatusServer()
+        self.server.statuses["clusters"][str(self.cluster.pk)] = 16
+        self.server.statuses["services"][str(self.service.pk)] = 16
+        self.server.statuses["components"][str(self.component.pk)] = 0
+        self.server.statuses["hostcomponents"][f"{self.hosts[0].pk}.{self.component.pk}"] = 16
+        for host in self.hosts[:-1]:
+            self.server.statuses["hosts"][str(host.pk)] = 16
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.publisher = EventPublisher(buffer_size=5)
+        for patcher in (
+            patch("cm.status_api.API_URL", self.server.url),
+            patch("cm.status_api.TIMEOUT", 5),
+            patch("cm.status_api.event_publisher", self.publisher),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_one_request_for_all_objects(self):
+        batch = StatusBatch(
+            clusters=[self.cluster],
+            services=[self.service],
+            hosts=self.hosts,
+            components=[self.component],
+            host_components=[self.hc],
+        )
+
+        self.assertEqual(self.server.requests, [("POST", "/api/v1/status/")])
+        self.assertEqual(batch.get_cluster_status(self.cluster), 16)
+        self.assertEqual(batch.get_service_status(self.service), 16)
+        self.assertEqual(batch.get_component_status(self.component), 0)
+        self.assertEqual(batch.get_hc_status(self.hc), 16)
+        self.assertEqual([batch.get_host_status(host) for host in self.hosts], [16, 16, 16, 16, 4])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_passive_monitoring(self):
+        self.hosts[0].prototype.monitoring = "passive"
+        self.hosts[0].prototype.save(update_fields=["monitoring"])
+        batch = StatusBatch(hosts=self.hosts)
+
+        self.assertEqual(batch.get_host_status(self.hosts[0]), 0)
+
+    def test_fallback_to_single_request(self):
+        batch = StatusBatch(hosts=self.hosts[:1])
+
+        self.assertEqual(batch.get_cluster_status(self.cluster), 16)
+        self.assertEqual(self.server.requests[-1], ("GET", f"/api/v1/cluster/{self.cluster.pk}/"))
+
+    def test_status_server_is_down(self):
+        self.server.shutdown()
+        self.server.server_close()
+        batch = StatusBatch(hosts=self.hosts)
+
+        self.assertEqual(batch.get_host_status(self.hosts[0]), 32)
+
+    def test_host_list_ui(self):
+        response: Response = self.client.get(path=reverse("host"), data={"view": "interface"})
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(self.server.requests, [("POST", "/api/v1/status/")])
+        self.assertEqual(
+            {host["id"]: host["status"] for host in response.data},
+            {host.pk: 4 if host == self.hosts[-1] else 16 for host in self.hosts},
+        )
+
+    def test_host_list_paged_ui(self):
+        response: Response = self.client.get(path=reverse("host"), data={"view": "interface", "limit": 2})
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(self.server.requests, [("POST", "/api/v1/status/")])
+
+    def test_cluster_list_ui(self):
+        response: Response = self.client.get(path=reverse("cluster"), data={"view": "interface"})
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data[0]["status"], 16)
+        self.assertEqual(self.server.requests, [("POST", "/api/v1/status/")])
+
+    def test_hc_status_list(self):
+        response: Response = self.client.get(path=reverse("cluster-status", kwargs={"cluster_id": self.cluster.pk}))
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data[0]["status"], 16)
+        self.assertEqual(self.server.requests, [("POST", "/api/v1/status/")])
+
+    def test_events_are_coalesced_and_sent_at_once(self):
+        event = Event()
+        event.set_object_state("cluster", self.cluster.pk, "installing")
+        event.set_task_status(1, "running")
+        event.set_object_state("adcm", 1, "running")
+        event.set_object_state("cluster", self.cluster.pk, "installed")
+        event.set_task_status(1, "success")
+        event.send_state()
+
+        self.assertEqual(self.server.requests, [("POST", "/api/v1/event/bulk/")])
+        self.assertEqual(
+            self.server.events,
+            [
+                {
+                    "event": "change_state",
+                    "object": {
+                        "type": "cluster",
+                        "id": self.cluster.pk,
+                        "details": {"type": "state", "value": "installed"},
+                    },
+                },
+                {
+                    "event": "change_job_status",
+                    "object": {"type": "task", "id": 1, "details": {"type": "status", "value": "success"}},
+                },
+            ],
+        )
+        self.assertEqual((self.publisher.sent, self.publisher.dropped), (2, 0))
+
+    def test_events_are_sent_in_batches(self):
+        event = Event()
+        for job_id in range(1, 251):
+            event.set_job_status(job_id, "running")
+        event.send_state()
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.events), 250)
+        self.assertEqual(self.publisher.sent, 250)
+
+    def test_unsent_events_are_buffered(self):
+        self.server.response_code = 503
+        event = Event()
+        for job_id in range(1, 8):
+            event.set_job_status(job_id, "running")
+        event.send_state()
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.events, [])
+        self.assertEqual(len(self.publisher.buffer), 5)
+        self.assertEqual((self.publisher.sent, self.publisher.dropped), (0, 2))
+
+        self.server.response_code = 200
+        event.set_job_status(3, "success")
+        event.send_state()
+
+        self.assertListEqual(
+            [(item["object"]["id"], item["object"]["details"]["value"]) for item in self.server.events],
+            [(4, "running"), (5, "running"), (6, "running"), (7, "running"), (3, "success")],
+        )
+        self.assertEqual(self.publisher.buffer, [])
+        self.assertEqual((self.publisher.sent, self.publisher.dropped), (5, 2))
+
+
+class TestServiceMap(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.provider = gen_provider()
+        self.cluster_1 = gen_cluster()
+        self.cluster_2 = gen_cluster(bundle=self.cluster_1.prototype.bundle)
+        self.service_1 = gen_service(self.cluster_1)
+        self.service_2 = gen_service(self.cluster_2)
+        self.component_1 = gen_component(self.service_1)
+        self.component_2 = gen_component(self.service_2)
+        bundle = self.provider.prototype.bundle
+        self.host_1 = gen_host(self.provider, cluster=self.cluster_1, bundle=bundle)
+        self.host_2 = gen_host(self.provider, cluster=self.cluster_2, bundle=bundle)
+        self.host_3 = gen_host(self.provider, bundle=bundle)
+        gen_host_component(self.component_1, self.host_1)
+        gen_host_component(self.component_2, self.host_2)
+
+        self.server = FakeStatusServer()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        for patcher in (patch("cm.status_api.API_URL", self.server.url), patch("cm.status_api.TIMEOUT", 5)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_full_map(self):
+        self.component_2.prototype.monitoring = "passive"
+        self.component_2.prototype.save(update_fields=["monitoring"])
+
+        with self.assertNumQueries(3):
+            service_map = json.loads(json.dumps(get_service_map()))
+
+        self.assertDictEqual(
+            service_map,
+            {
+                "hostservice": {
+                    f"{self.host_1.pk}.{self.component_1.pk}": {
+                        "cluster": self.cluster_1.pk,
+                        "service": self.service_1.pk,
+                    }
+                },
+                "component": {
+                    str(self.cluster_1.pk): {str(self.service_1.pk): [f"{self.host_1.pk}.{self.component_1.pk}"]}
+                },
+                "service": {str(self.cluster_1.pk): [self.service_1.pk], str(self.cluster_2.pk): [self.service_2.pk]},
+                "host": {
+                    str(self.cluster_1.pk): [self.host_1.pk],
+                    str(self.cluster_2.pk): [self.host_2.pk],
+                    "0": [self.host_3.pk],
+                },
+            },
+        )
+
+    def test_patch_of_one_cluster(self):
+        self.cluster_1.prototype.allow_maintenance_mode = True
+        self.cluster_1.prototype.save(update_fields=["allow_maintenance_mode"])
+        self.host_1.maintenance_mode = MaintenanceMode.ON
+        self.host_1.save()
+
+        load_service_map([self.cluster_1.pk, 0])
+
+        self.assertListEqual(
+            self.server.requests, [("POST", "/api/v1/servicemap/patch/"), ("POST", "/api/v1/object/mm/patch/")]
+        )
+        self.assertDictEqual(
+            self.server.posted["/api/v1/servicemap/patch/"],
+            {
+                "clusters": [0, self.cluster_1.pk],
+                "hostservice": {
+                    f"{self.host_1.pk}.{self.component_1.pk}": {
+                        "cluster": self.cluster_1.pk,
+                        "service": self.service_1.pk,
+                    }
+                },
+                "component": {
+                    str(self.cluster_1.pk): {str(self.service_1.pk): [f"{self.host_1.pk}.{self.component_1.pk}"]}
+                },
+                "service": {str(self.cluster_1.pk): [self.service_1.pk]},
+                "host": {str(self.cluster_1.pk): [self.host_1.pk], "0": [self.host_3.pk]},
+            },
+        )
+        self.assertDictEqual(
+            self.server.posted["/api/v1/object/mm/patch/"],
+            {
+                "add": {
+                    "services": [self.service_1.pk],
+                    "components": [self.component_1.pk],
+                    "hosts": [self.host_1.pk],
+                },
+                "remove": {
+                    "services": [self.service_1.pk],
+                    "components": [self.component_1.pk],
+                    "hosts": [self.host_1.pk, self.host_3.pk],
+                },
+            },
+        )
+
+    def test_fallback_to_full_map(self):
+        self.server.response_code = 404
+
+        load_service_map([self.cluster_1.pk])
+
+        self.assertListEqual(
+            self.server.requests,
+            [
+                ("POST", "/api/v1/servicemap/patch/"),
+                ("POST", "/api/v1/servicemap/"),
+                ("POST", "/api/v1/object/mm/"),
+            ],
+        )
+        self.assertEqual(len(self.server.posted["/api/v1/servicemap/"]["host"]), 3)
@@ -9,8 +9,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import io
 import tarfile
 from datetime import datetime
+from pathlib import Path
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
@@ -21,8 +23,8 @@ from rest_framework.status import HTTP_200_OK
 
 from adcm.tests.base import BaseTestCase
 from api.job.views import (
-    get_task_download_archive_file_handler,
     get_task_download_archive_name,
+    get_task_download_archive_stream,
 )
 from cm.models import (
     Action,
@@ -200,6 +202,14 @@ class TaskLogLockTest(BaseTestCase):
 
         self.assertEqual(response.status_code, HTTP_200_OK)
 
+        with tarfile.open(fileobj=io.BytesIO(b"".join(response.streaming_content)), mode="r:gz") as tar:
+            contents = [tar.extractfile(member).read() for member in tar.getmembers()]
+
+        self.assertEqual(len(contents), 14)
+        self.assertIn(b"stdout db", contents)
+        self.assertIn(b"stderr db", contents)
+        self.assertIn(Path(settings.RUN_DIR, "1", "ansible-stdout.txt").read_bytes(), contents)
+
     @override_settings(RUN_DIR=settings.BASE_DIR / "python" / "cm" / "tests" / "files" / "task_log_download")
     def test_download_negative(self):
         bundle = Bundle.objects.create()
@@ -238,8 +248,7 @@ class TaskLogLockTest(BaseTestCase):
             finish_date=datetime.now(tz=ZoneInfo("UTC")),
             sub_action=SubAction.objects.create(name="test_subaction_2", action=action),
         )
-        fn = get_task_download_archive_file_handler(task)
-        fn.seek(0)
+        fn = io.BytesIO(b"".join(get_task_download_archive_stream(task)))
         tar = tarfile.open(fileobj=fn, mode='r:gz')
         self.assertEqual(
             sorted(
@@ -263,8 +272,7 @@ class TaskLogLockTest(BaseTestCase):
         cluster.delete()
         bundle.delete()
         task.refresh_from_db()
-        fn = get_task_download_archive_file_handler(task)
-        fn.seek(0)
+        fn = io.BytesIO(b"".join(get_task_download_archive_stream(task)))
         tar = tarfile.open(fileobj=fn, mode='r:gz')
         self.assertEqual(
             sorted(
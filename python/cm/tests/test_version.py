@@ -0,0 +1,69 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from itertools import product
+
+from django.test import TestCase
+from version_utils import rpm
+
+from cm.version import compare_versions, get_version_key
+
+VERSIONS = (
+    "1",
+    "01",
+    "1.0",
+    "1_0",
+    "1.00.1",
+    "1.0.1",
+    "1.0.10",
+    "1.0.9",
+    "1.0ab",
+    "1.0~rc1",
+    "1.0~rc2",
+    "1.0~~",
+    "1a",
+    "2.3.1-1",
+    "2.3.1-2",
+    "2.3.1_rc",
+    "10",
+    "9.99",
+    "a",
+    "abc",
+    "2022.11.28",
+    "3.1.2.1.20221125",
+)
+
+
+class TestVersionKey(TestCase):
+    def test_compare_as_rpm(self):
+        for version_a, version_b in product(VERSIONS, repeat=2):
+            with self.subTest(version_a=version_a, version_b=version_b):
+                self.assertEqual(compare_versions(version_a, version_b), rpm.compare_versions(version_a, version_b))
+
+    def test_sort(self):
+        self.assertListEqual(
+            sorted(["1.10", "1.9", "1.0~rc1", "1.0", "01.0.1", "1.0a"], key=get_version_key),
+            ["1.0~rc1", "1.0", "1.0a", "01.0.1", "1.9", "1.10"],
+        )
+
+    def test_equal_versions_have_equal_keys(self):
+        self.assertEqual(get_version_key("1.0"), get_version_key("1-00"))
+
+    def test_separator_before_tilde_at_end_of_other_version(self):
+        # RPM comparison is not transitive here, keys are consistent with comparison of tilde without separator
+        self.assertEqual(rpm.compare_versions("1.0.~1", "1.0"), 1)
+        self.assertEqual(rpm.compare_versions("1.0.~1", "1.0~1"), 0)
+        self.assertEqual(rpm.compare_versions("1.0~1", "1.0"), -1)
+
+        self.assertEqual(compare_versions("1.0.~1", "1.0"), -1)
+        self.assertEqual(compare_versions("0._~29", "0"), -1)
+        self.assertEqual(get_version_key("1.0.~1"), get_version_key("1.0~1"))
@@ -564,3 +564,52 @@ class TestVariantHost(BaseTestCase):
         self.add_hc(cluster=cls, service=service, component=comp1, host=h2)
 
         self.assertEqual(variant_host(cls, {"predicate": "not_in_hc", "args": None}), ["h10"])
+
+    def test_host_predicates_queries_do_not_depend_on_hosts(self):
+        cls = cook_cluster()
+        service = cook_service(cls)
+        comp1 = cook_component(cls, service, "Server")
+        comp2 = cook_component(cls, service, "Node")
+        provider, hp = cook_provider()
+        args = {
+            "predicate": "or",
+            "args": [
+                {"predicate": "not_in_hc", "args": None},
+                {"predicate": "not_in_component", "args": {"service": "UBER", "component": "Server"}},
+                {"predicate": "not_in_service", "args": {"service": "UBER"}},
+            ],
+        }
+
+        for i in range(10):
+            host = add_host(hp, provider, f"h{i}")
+            add_host_to_cluster(cls, host)
+            self.add_hc(cluster=cls, service=service, component=comp1 if i % 2 else comp2, host=host)
+
+        with self.assertNumQueries(4):
+            hosts = variant_host(cls, args)
+
+        self.assertEqual(hosts, ["h0", "h2", "h4", "h6", "h8"])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(variant_host(cls, args), hosts)
+
+    def test_host_predicate_result_is_reset_on_hc_change(self):
+        cls = cook_cluster()
+        service = cook_service(cls)
+        comp = cook_component(cls, service, "Server")
+        provider, hp = cook_provider()
+        h1 = add_host(hp, provider, "h10")
+        h2 = add_host(hp, provider, "h11")
+        add_host_to_cluster(cls, h1)
+        add_host_to_cluster(cls, h2)
+        args = {"predicate": "not_in_hc", "args": None}
+
+        self.assertEqual(variant_host(cls, args), ["h10", "h11"])
+
+        self.add_hc(cluster=cls, service=service, component=comp, host=h2)
+
+        self.assertEqual(variant_host(cls, args), ["h10"])
+
+        HostComponent.objects.filter(cluster=cls).delete()
+
+        self.assertEqual(variant_host(cls, args), ["h10", "h11"])
@@ -10,11 +10,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import functools
 from typing import List, Tuple, Union
 
 from django.db import transaction
-from version_utils import rpm
 
 from cm.adcm_config import make_object_config, obj_ref, proto_ref, switch_config
 from cm.api import (
@@ -24,6 +22,7 @@ from cm.api import (
     version_in,
 )
 from cm.errors import raise_adcm_ex
+from cm.hierarchy import reset_hierarchy_cache, update_maintenance_mode
 from cm.issue import update_hierarchy_issues
 from cm.job import start_task
 from cm.logger import logger
@@ -41,6 +40,7 @@ from cm.models import (
     Upgrade,
 )
 from cm.status_api import post_event
+from cm.version import compare_versions, get_version_key
 
 
 def switch_object(obj: Union[Host, ClusterObject], new_prototype: Prototype) -> None:
@@ -87,23 +87,23 @@ def switch_hosts(upgrade: Upgrade, provider: HostProvider) -> None:
 def check_upgrade_version(obj: Union[Cluster, HostProvider], upgrade: Upgrade) -> Tuple[bool, str]:
     proto = obj.prototype
     if upgrade.min_strict:
-        if rpm.compare_versions(proto.version, upgrade.min_version) <= 0:
+        if compare_versions(proto.version, upgrade.min_version) <= 0:
             msg = "{} version {} is less than or equal to upgrade min version {}"
 
             return False, msg.format(proto.type, proto.version, upgrade.min_version)
     else:
-        if rpm.compare_versions(proto.version, upgrade.min_version) < 0:
+        if compare_versions(proto.version, upgrade.min_version) < 0:
             msg = "{} version {} is less than upgrade min version {}"
 
             return False, msg.format(proto.type, proto.version, upgrade.min_version)
 
     if upgrade.max_strict:
-        if rpm.compare_versions(proto.version, upgrade.max_version) >= 0:
+        if compare_versions(proto.version, upgrade.max_version) >= 0:
             msg = "{} version {} is more than or equal to upgrade max version {}"
 
             return False, msg.format(proto.type, proto.version, upgrade.max_version)
     else:
-        if rpm.compare_versions(proto.version, upgrade.max_version) > 0:
+        if compare_versions(proto.version, upgrade.max_version) > 0:
             msg = "{} version {} is more than upgrade max version {}"
 
             return False, msg.format(proto.type, proto.version, upgrade.max_version)
@@ -252,12 +252,6 @@ def switch_hc(obj: Cluster, upgrade: Upgrade) -> None:
 
 
 def get_upgrade(obj: Union[Cluster, HostProvider], order=None) -> List[Upgrade]:
-    def rpm_cmp(obj1, obj2):
-        return rpm.compare_versions(obj1.name, obj2.name)
-
-    def rpm_cmp_reverse(obj1, obj2):
-        return rpm.compare_versions(obj2.name, obj1.name)
-
     res = []
     for upg in Upgrade.objects.filter(bundle__name=obj.prototype.bundle.name):
         ok, _msg = check_upgrade_version(obj, upg)
@@ -277,9 +271,9 @@ def get_upgrade(obj: Union[Cluster, HostProvider], order=None) -> List[Upgrade]:
 
     if order:
         if "name" in order:
-            return sorted(res, key=functools.cmp_to_key(rpm_cmp))
+            return sorted(res, key=lambda upg: get_version_key(upg.name))
         elif "-name" in order:
-            return sorted(res, key=functools.cmp_to_key(rpm_cmp_reverse))
+            return sorted(res, key=lambda upg: get_version_key(upg.name), reverse=True)
         else:
             return res
     else:
@@ -355,6 +349,8 @@ def bundle_switch(obj: Union[Cluster, HostProvider], upgrade: Upgrade):
             switch_services(upgrade, obj)
             if old_proto.allow_maintenance_mode != new_proto.allow_maintenance_mode:
                 Host.objects.filter(cluster=obj).update(maintenance_mode=MaintenanceMode.OFF)
+                reset_hierarchy_cache()
+                update_maintenance_mode(obj.pk)
         elif obj.prototype.type == "provider":
             switch_hosts(upgrade, obj)
 
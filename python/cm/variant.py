@@ -10,8 +10,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+from copy import deepcopy
+
 from cm.errors import AdcmEx
 from cm.errors import raise_adcm_ex as err
+from cm.hierarchy import get_hierarchy_cache_version
 from cm.logger import logger
 from cm.models import (
     ClusterObject,
@@ -79,77 +83,128 @@ def var_host_or(cluster, args):
     return sorted(list(set.union(*[set(a) for a in args])))
 
 
+class ClusterHostMap:
+    """
+    Snapshot of cluster's hosts and hostcomponent map which host predicates are evaluated against
+    with set operations instead of a query per host
+    """
+
+    def __init__(self, cluster):
+        self.hosts = list(Host.objects.filter(cluster=cluster).order_by('fqdn').values_list('fqdn', flat=True))
+        self.services = dict(ClusterObject.objects.filter(cluster=cluster).values_list('prototype__name', 'pk'))
+        self.components = {
+            (service_id, name): pk
+            for pk, service_id, name in ServiceComponent.objects.filter(cluster=cluster).values_list(
+                'pk', 'service_id', 'prototype__name'
+            )
+        }
+        self.hc = list(
+            HostComponent.objects.filter(cluster=cluster)
+            .order_by('host__fqdn', 'pk')
+            .values_list('host__fqdn', 'service_id', 'component_id')
+        )
+
+    def mapped(self, service_id=None, component_id=None):
+        """Fqdn of host for every hostcomponent entry of service or component, ordered by fqdn"""
+        return [
+            fqdn
+            for fqdn, hc_service_id, hc_component_id in self.hc
+            if service_id in (None, hc_service_id) and component_id in (None, hc_component_id)
+        ]
+
+    def not_mapped(self, service_id=None, component_id=None):
+        mapped = set(self.mapped(service_id, component_id))
+        return [fqdn for fqdn in self.hosts if fqdn not in mapped]
+
+
+class VariantHostCache:
+    """
+    In-process cache of cluster host maps and results of "host" variant predicates.
+    It is dropped together with cached hierarchies (see cm.hierarchy) which are reset on any change
+    of hosts, services, components or hostcomponent map
+    """
+
+    def __init__(self):
+        self.version = None
+        self._host_maps = {}
+        self._results = {}
+
+    def _check_version(self):
+        version = get_hierarchy_cache_version()
+        if version != self.version:
+            self.version = version
+            self._host_maps.clear()
+            self._results.clear()
+
+    def get_host_map(self, cluster):
+        self._check_version()
+        if cluster.pk not in self._host_maps:
+            self._host_maps[cluster.pk] = ClusterHostMap(cluster)
+        return self._host_maps[cluster.pk]
+
+    def get_result(self, cluster, args, solve):
+        self._check_version()
+        key = (cluster.pk, json.dumps(args, sort_keys=True, default=str))
+        if key not in self._results:
+            self._results[key] = solve()
+        return deepcopy(self._results[key])
+
+
+_cache = VariantHostCache()
+
+
 def var_host_get_service(cluster, args, func):
     if 'service' not in args:
         err('CONFIG_VARIANT_ERROR', f'no "service" argument for predicate "{func}"')
-    return ClusterObject.obj.get(cluster=cluster, prototype__name=args['service'])
+    service_id = _cache.get_host_map(cluster).services.get(args['service'])
+    if service_id is None:
+        service_id = ClusterObject.obj.get(cluster=cluster, prototype__name=args['service']).pk
+    return service_id
 
 
-def var_host_get_component(cluster, args, service, func):
+def var_host_get_component(cluster, args, service_id, func):
     if 'component' not in args:
         err('CONFIG_VARIANT_ERROR', f'no "component" argument for predicate "{func}"')
-    return ServiceComponent.obj.get(cluster=cluster, service=service, prototype__name=args['component'])
+    component_id = _cache.get_host_map(cluster).components.get((service_id, args['component']))
+    if component_id is None:
+        component_id = ServiceComponent.obj.get(
+            cluster=cluster, service_id=service_id, prototype__name=args['component']
+        ).pk
+    return component_id
 
 
 def var_host_in_service(cluster, args):
-    out = []
-    service = var_host_get_service(cluster, args, 'in_service')
-    for hc in HostComponent.objects.filter(cluster=cluster, service=service).order_by('host__fqdn'):
-        out.append(hc.host.fqdn)
-    return out
+    service_id = var_host_get_service(cluster, args, 'in_service')
+    return _cache.get_host_map(cluster).mapped(service_id=service_id)
 
 
 def var_host_not_in_service(cluster, args):
-    out = []
-    service = var_host_get_service(cluster, args, 'not_in_service')
-    for host in Host.objects.filter(cluster=cluster).order_by('fqdn'):
-        if HostComponent.objects.filter(cluster=cluster, service=service, host=host):
-            continue
-        out.append(host.fqdn)
-    return out
+    service_id = var_host_get_service(cluster, args, 'not_in_service')
+    return _cache.get_host_map(cluster).not_mapped(service_id=service_id)
 
 
 def var_host_in_cluster(cluster, args):
-    out = []
-    for host in Host.objects.filter(cluster=cluster).order_by('fqdn'):
-        out.append(host.fqdn)
-    return out
+    return list(_cache.get_host_map(cluster).hosts)
 
 
 def var_host_in_component(cluster, args):
-    out = []
-    service = var_host_get_service(cluster, args, 'in_component')
-    comp = var_host_get_component(cluster, args, service, 'in_component')
-    for hc in HostComponent.objects.filter(cluster=cluster, service=service, component=comp).order_by('host__fqdn'):
-        out.append(hc.host.fqdn)
-    return out
+    service_id = var_host_get_service(cluster, args, 'in_component')
+    component_id = var_host_get_component(cluster, args, service_id, 'in_component')
+    return _cache.get_host_map(cluster).mapped(component_id=component_id)
 
 
 def var_host_not_in_component(cluster, args):
-    out = []
-    service = var_host_get_service(cluster, args, 'not_in_component')
-    comp = var_host_get_component(cluster, args, service, 'not_in_component')
-    for host in Host.objects.filter(cluster=cluster).order_by('fqdn'):
-        if HostComponent.objects.filter(cluster=cluster, component=comp, host=host):
-            continue
-        out.append(host.fqdn)
-    return out
+    service_id = var_host_get_service(cluster, args, 'not_in_component')
+    component_id = var_host_get_component(cluster, args, service_id, 'not_in_component')
+    return _cache.get_host_map(cluster).not_mapped(component_id=component_id)
 
 
 def var_host_in_hc(cluster, args):
-    out = []
-    for hc in HostComponent.objects.filter(cluster=cluster).order_by('host__fqdn'):
-        out.append(hc.host.fqdn)
-    return out
+    return _cache.get_host_map(cluster).mapped()
 
 
 def var_host_not_in_hc(cluster, args):
-    out = []
-    for host in Host.objects.filter(cluster=cluster).order_by('fqdn'):
-        if HostComponent.objects.filter(cluster=cluster, host=host):
-            continue
-        out.append(host.fqdn)
-    return out
+    return _cache.get_host_map(cluster).not_mapped()
 
 
 def var_host_inline_list(cluster, args):
@@ -216,8 +271,7 @@ def variant_host(obj, args=None):
         err('CONFIG_VARIANT_ERROR', 'arguments of variant host function should be a map')
     if 'predicate' not in args:
         err('CONFIG_VARIANT_ERROR', 'no "predicate" key in variant host function arguments')
-    res = var_host_solver(cluster, VARIANT_HOST_FUNC, args)
-    return res
+    return _cache.get_result(cluster, args, lambda: var_host_solver(cluster, VARIANT_HOST_FUNC, args))
 
 
 def variant_host_in_cluster(obj, args=None):
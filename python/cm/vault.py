@@ -0,0 +1,84 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Encryption of secrets in ansible-vault format 1.1 (AES256).
+
+Most of the time of encryption or decryption of a short value is taken by PBKDF2 derivation of keys
+from secret and salt of the value. Keys derived for decryption are cached by salt, so values which are
+decrypted again and again (e.g. on every job preparation) are decrypted without derivation.
+Cache relies on ansible's internal key derivation and cipher routines, encryption uses public
+VaultAES256.encrypt and every encrypted value gets its own random salt as ansible-vault does.
+"""
+
+# pylint: disable=protected-access
+
+from collections import OrderedDict
+from typing import Tuple
+
+from ansible.parsing.vault import VaultAES256, VaultSecret, parse_vaulttext
+from django.conf import settings
+
+DERIVED_KEYS_CACHE_SIZE = 1024
+
+DerivedKeys = Tuple[bytes, bytes, bytes]
+
+
+class Vault:
+    def __init__(self, secret: str):
+        self._secret = secret.encode(settings.ENCODING_UTF_8)
+        self._decryption_keys: OrderedDict[bytes, DerivedKeys] = OrderedDict()
+
+    def _derive_keys(self, salt: bytes) -> DerivedKeys:
+        return VaultAES256._gen_key_initctr(self._secret, salt)
+
+    def _get_decryption_keys(self, salt: bytes) -> DerivedKeys:
+        keys = self._decryption_keys.get(salt)
+        if keys is None:
+            keys = self._derive_keys(salt)
+            self._decryption_keys[salt] = keys
+            if len(self._decryption_keys) > DERIVED_KEYS_CACHE_SIZE:
+                self._decryption_keys.popitem(last=False)
+        else:
+            self._decryption_keys.move_to_end(salt)
+
+        return keys
+
+    def encrypt(self, value: str) -> str:
+        vaulttext = VaultAES256.encrypt(value.encode(settings.ENCODING_UTF_8), VaultSecret(self._secret))
+
+        return f"{settings.ANSIBLE_VAULT_HEADER}\n{vaulttext.decode(settings.ENCODING_UTF_8)}"
+
+    def decrypt(self, value: str) -> str:
+        """Decrypt value formatted by `encrypt` or ansible-vault, value without vault header is returned as is"""
+        if settings.ANSIBLE_VAULT_HEADER not in value:
+            return value
+
+        _, vaulttext = value.split("\n")
+        ciphertext, salt, crypted_hmac = parse_vaulttext(vaulttext.encode(settings.ENCODING_UTF_8))
+        plaintext = VaultAES256._decrypt_cryptography(ciphertext, crypted_hmac, *self._get_decryption_keys(salt))
+
+        return plaintext.decode(settings.ENCODING_UTF_8)
+
+
+_vaults = {}
+
+
+def get_vault(secret: str | None = None) -> Vault:
+    """Get vault with keys cache for `secret`, ADCM's ansible secret by default"""
+    if secret is None:
+        secret = settings.ANSIBLE_SECRET
+
+    if secret not in _vaults:
+        _vaults[secret] = Vault(secret)
+
+    return _vaults[secret]
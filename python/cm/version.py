@@ -0,0 +1,77 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Sortable keys of versions compared the way RPM compares them (see version_utils.rpm.compare_versions).
+
+Version is split into blocks of digits, blocks of letters and tildes, other characters only separate blocks.
+Key is a string of block markers and contents, so keys of versions compare as plain strings (and byte strings
+in DB) the same way as versions do:
+  - numbers are compared by value, leading zeros are ignored, they are newer than letters
+  - tilde is older than anything, even than end of version ("1.0~rc1" is older than "1.0")
+  - longer version is newer than its prefix ("1.0.1" is newer than "1.0")
+
+Keys differ from RPM for separator followed by tilde at the point where the other version ends. RPM considers
+"1.0.~1" newer than "1.0", but equal to "1.0~1" which is older than "1.0". Such comparison is not transitive,
+so no sortable key could follow it. Key ignores the separator as it does before any other block, so "1.0.~1"
+is older than "1.0" as "1.0~1" is.
+"""
+
+from functools import lru_cache
+from itertools import groupby
+
+# markers are ordered as blocks are ordered when versions differ at them
+TILDE = "0"
+END = "1"
+SEPARATOR = "2"
+LETTERS = "3"
+DIGITS = "4"
+# terminates letters block, it's less than any letter so shorter block is older
+LETTERS_END = "!"
+DIGITS_LENGTH_WIDTH = 3
+
+
+def _get_char_class(char: str) -> str:
+    if char == "~":
+        return TILDE
+    if char.isdigit():
+        return DIGITS
+    if char.isalpha():
+        return LETTERS
+    return SEPARATOR
+
+
+@lru_cache(maxsize=4096)
+def get_version_key(version: str) -> str:
+    blocks = [(char_class, "".join(chars)) for char_class, chars in groupby(str(version), key=_get_char_class)]
+    key = []
+    for i, (char_class, chars) in enumerate(blocks):
+        if char_class == TILDE:
+            key.append(TILDE * len(chars))
+        elif char_class == DIGITS:
+            digits = chars.lstrip("0")
+            key.append(f"{DIGITS}{len(digits):0{DIGITS_LENGTH_WIDTH}d}{digits}")
+        elif char_class == LETTERS:
+            key.append(f"{LETTERS}{chars}{LETTERS_END}")
+        elif i == len(blocks) - 1:
+            # separators make version newer only at its end ("1.0." is newer than "1.0")
+            key.append(SEPARATOR * len(chars))
+    key.append(END)
+
+    return "".join(key)
+
+
+def compare_versions(version_a: str, version_b: str) -> int:
+    """Return 1 if `version_a` is newer than `version_b`, -1 if it is older and 0 if versions are equal"""
+    key_a, key_b = get_version_key(version_a), get_version_key(version_b)
+
+    return (key_a > key_b) - (key_a < key_b)
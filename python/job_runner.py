@@ -187,7 +187,7 @@ def run_python(job):
     conf = read_config(job.id)
     script_path = conf["job"]["playbook"]
     os.chdir(conf["env"]["stack_dir"])
-    cmd = ["python", script_path]
+    cmd = ["/adcm/python/job_venv_wrapper.sh", get_venv(job.id), "python", script_path]
     ret = start_subprocess(job.id, cmd, conf, out_file, err_file)
     sys.exit(ret)
 
@@ -14,14 +14,16 @@
 
 import importlib
 import re
+from collections import defaultdict
 
 from django.contrib.auth.models import Group as AuthGroup
 from django.contrib.auth.models import Permission
 from django.contrib.auth.models import User as AuthUser
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.signals import request_started
 from django.db import models
-from django.db.models.signals import pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.db.transaction import atomic
 from django.dispatch import receiver
 from django.utils import timezone
@@ -29,7 +31,16 @@ from guardian.models import GroupObjectPermission, UserObjectPermission
 from rest_framework.exceptions import ValidationError
 
 from cm.errors import raise_adcm_ex
-from cm.models import Bundle, DummyData, HostComponent, ProductCategory
+from cm.models import (
+    Bundle,
+    ConfigLog,
+    DummyData,
+    GroupConfig,
+    Host,
+    HostComponent,
+    ObjectConfig,
+    ProductCategory,
+)
 
 
 class ObjectType(models.TextChoices):
@@ -172,24 +183,72 @@ class Role(models.Model):  # pylint: disable=too-many-instance-attributes
         return self.__obj__.apply(policy, self, user, group, obj)
 
     def get_permissions(self, role: 'Role' = None):
-        """Recursively get permissions of role and all her children"""
+        """Recursively get permissions of role and all her children, they are cached until any role change"""
         if role is None:
             role = self
 
-        # the raw query was added to avoid many SQL queries
-        role_list = Role.objects.raw(
-            """
-                with recursive role_ids as (
-                    select id from rbac_role where id = %s
-                    union
-                    select role_child.to_role_id from role_ids as tmp
-                    inner join rbac_role_child as role_child on role_child.from_role_id = tmp.id
-                ) select id from role_ids;
-            """,
-            params=[role.id],
-        )
-        perm_list = list(Permission.objects.filter(role__in=role_list).distinct())
-        return perm_list
+        return list(_role_cache.get_permissions(role.id))
+
+    def get_children(self, class_names=None, object_type=None):
+        """Get cached child roles filtered by class name and type of object role is parametrized by"""
+        return _role_cache.get_children(self, tuple(class_names or ()), object_type)
+
+
+class RoleCache:
+    """Flattened permissions and children of roles, it should be reset on any role change"""
+
+    def __init__(self):
+        self.permissions = {}
+        self.children = {}
+
+    def reset(self):
+        self.permissions = {}
+        self.children = {}
+
+    def get_permissions(self, role_id: int):
+        if role_id not in self.permissions:
+            # the raw query was added to avoid many SQL queries
+            role_list = Role.objects.raw(
+                """
+                    with recursive role_ids as (
+                        select id from rbac_role where id = %s
+                        union
+                        select role_child.to_role_id from role_ids as tmp
+                        inner join rbac_role_child as role_child on role_child.from_role_id = tmp.id
+                    ) select id from role_ids;
+                """,
+                params=[role_id],
+            )
+            self.permissions[role_id] = list(Permission.objects.filter(role__in=role_list).distinct())
+        return self.permissions[role_id]
+
+    def get_children(self, role: Role, class_names: tuple, object_type: str = None):
+        key = (role.id, class_names, object_type)
+        if key not in self.children:
+            all_key = (role.id, (), None)
+            if all_key not in self.children:
+                self.children[all_key] = list(role.child.all())
+            self.children[key] = [
+                child
+                for child in self.children[all_key]
+                if (not class_names or child.class_name in class_names)
+                and (object_type is None or object_type in child.parametrized_by_type)
+            ]
+        return self.children[key]
+
+
+_role_cache = RoleCache()
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(m2m_changed, sender=Role.child.through)
+@receiver(m2m_changed, sender=Role.permissions.through)
+@receiver(post_delete, sender=Permission)
+@receiver(request_started)
+def reset_role_cache(sender, **kwargs):
+    """Roles could be changed in this or in other process, so cached permissions and children are outdated"""
+    _role_cache.reset()
 
 
 class RoleMigration(models.Model):
@@ -218,6 +277,119 @@ class PolicyPermission(models.Model):
     permission = models.ForeignKey(Permission, on_delete=models.CASCADE, null=True, default=None)
 
 
+# object pks per query, it's kept with ids of subjects and permissions under SQLite limit of query parameters
+EXISTING_PERMS_BATCH_SIZE = 300
+
+
+class PolicyCompiler:
+    """
+    Collects object permissions of policy while its role is applied and writes them at once.
+    Collected permissions are compared with ones already linked to policy, so only missing guardian
+    permissions are created and only outdated ones are deleted.
+    If changed objects are specified, only permissions on them, their configs and config groups are compared,
+    and roles are not applied to hosts which are not changed
+    """
+
+    def __init__(self, policy: 'Policy', changed_objects=None):
+        self.policy = policy
+        self.perms = {UserObjectPermission: {}, GroupObjectPermission: {}}
+        self.scope = None if changed_objects is None else self._get_scope(changed_objects)
+
+    @staticmethod
+    def _get_key(obj):
+        return ContentType.objects.get_for_model(obj).pk, str(obj.pk)
+
+    def _get_scope(self, objects):
+        scope = set()
+        config_ids = set()
+        ids_by_type = defaultdict(set)
+        for obj in objects:
+            scope.add(self._get_key(obj))
+            ids_by_type[ContentType.objects.get_for_model(obj)].add(obj.pk)
+            if obj.config_id:
+                config_ids.add(obj.config_id)
+
+        for object_type, ids in ids_by_type.items():
+            for group in GroupConfig.objects.filter(object_type=object_type, object_id__in=ids):
+                scope.add(self._get_key(group))
+                if group.config_id:
+                    config_ids.add(group.config_id)
+
+        config_type = ContentType.objects.get_for_model(ObjectConfig)
+        scope.update((config_type.pk, str(pk)) for pk in config_ids)
+        config_log_type = ContentType.objects.get_for_model(ConfigLog)
+        for pk in ConfigLog.objects.filter(obj_ref_id__in=config_ids).values_list('pk', flat=True):
+            scope.add((config_log_type.pk, str(pk)))
+
+        return scope
+
+    def is_affected(self, obj) -> bool:
+        """Hosts out of changed objects could be skipped while role applying, their permissions stay the same"""
+        return self.scope is None or not isinstance(obj, Host) or self._get_key(obj) in self.scope
+
+    def add(self, user: User, group: Group, perm: Permission, obj) -> None:
+        content_type_id = ContentType.objects.get_for_model(obj).pk
+        if user is not None:
+            self.perms[UserObjectPermission][(user.pk, perm.pk, str(obj.pk))] = content_type_id
+        if group is not None:
+            self.perms[GroupObjectPermission][(group.pk, perm.pk, str(obj.pk))] = content_type_id
+
+    def save(self, remove_outdated: bool = True) -> None:
+        with atomic():
+            DummyData.objects.filter(id=1).update(date=timezone.now())
+            self._save(UserObjectPermission, 'user_id', self.policy.user_object_perm, remove_outdated)
+            self._save(GroupObjectPermission, 'group_id', self.policy.group_object_perm, remove_outdated)
+
+    def _save(self, model, subject_field, policy_perms, remove_outdated):
+        perms = self.perms[model]
+        fields = (subject_field, 'permission_id', 'object_pk')
+        linked = {}
+        in_scope = set()
+        for pk, content_type_id, *key in policy_perms.values_list('pk', 'content_type_id', *fields):
+            linked[tuple(key)] = pk
+            if self.scope is None or (content_type_id, key[2]) in self.scope:
+                in_scope.add(pk)
+
+        unlinked = [key for key in perms if key not in linked]
+        if unlinked:
+            existing = self._get_existing(model, fields, unlinked)
+            missing = [key for key in unlinked if key not in existing]
+            if missing:
+                model.objects.bulk_create(
+                    model(**dict(zip(fields, key)), content_type_id=perms[key]) for key in missing
+                )
+                existing.update(self._get_existing(model, fields, missing))
+            policy_perms.add(*(existing[key] for key in unlinked))
+
+        outdated = [pk for key, pk in linked.items() if key not in perms and pk in in_scope]
+        if remove_outdated and outdated:
+            policy_perms.remove(*outdated)
+            model.objects.filter(pk__in=outdated, policy__isnull=True).delete()
+
+    @staticmethod
+    def _get_existing(model, fields, keys):
+        """Get pks of existing guardian permissions by keys, they are looked up by batches of objects"""
+        subject_field, perm_field, object_field = fields
+        keys = set(keys)
+        subject_ids = {key[0] for key in keys}
+        perm_ids = {key[1] for key in keys}
+        object_pks = sorted({key[2] for key in keys})
+        existing = {}
+        for start in range(0, len(object_pks), EXISTING_PERMS_BATCH_SIZE):
+            queryset = model.objects.filter(
+                **{
+                    f'{subject_field}__in': subject_ids,
+                    f'{perm_field}__in': perm_ids,
+                    f'{object_field}__in': object_pks[start : start + EXISTING_PERMS_BATCH_SIZE],
+                }
+            )
+            for row in queryset.values_list('pk', *fields):
+                if tuple(row[1:]) in keys:
+                    existing[tuple(row[1:])] = row[0]
+
+        return existing
+
+
 class Policy(models.Model):
     """Policy connect role, users and (maybe) objects"""
 
@@ -232,7 +404,11 @@ class Policy(models.Model):
     user_object_perm = models.ManyToManyField(UserObjectPermission, blank=True)
     group_object_perm = models.ManyToManyField(GroupObjectPermission, blank=True)
 
-    def remove_permissions(self):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._compiler = None
+
+    def remove_model_permissions(self):
         with atomic():
             DummyData.objects.filter(id=1).update(date=timezone.now())
             for pp in self.model_perm.all():
@@ -243,13 +419,14 @@ class Policy(models.Model):
                         pp.group.permissions.remove(pp.permission)
                 pp.policy_set.remove(self)
 
-            for uop in self.user_object_perm.all():
-                if uop.policy_set.count() <= 1:
-                    uop.delete()
+    def remove_permissions(self):
+        with atomic():
+            self.remove_model_permissions()
+            PolicyCompiler(self).save()
 
-            for gop in self.group_object_perm.all():
-                if gop.policy_set.count() <= 1:
-                    gop.delete()
+    def get_compiler(self):
+        """Compiler which collects object permissions during role applying, if any"""
+        return self._compiler
 
     def add_object(self, obj):
         po = PolicyObject(object=obj)
@@ -271,22 +448,31 @@ class Policy(models.Model):
         self.remove_permissions()
         return super().delete(using, keep_parents)
 
+    def _apply_role(self, remove_outdated: bool, changed_objects=None):
+        self._compiler = PolicyCompiler(self, changed_objects)
+        try:
+            for user in self.user.all():
+                self.role.apply(self, user, None)
+            for group in self.group.all():
+                self.role.apply(self, None, group=group)
+            self._compiler.save(remove_outdated)
+        finally:
+            self._compiler = None
+
     @atomic
     def apply_without_deletion(self):
         """This function apply role over"""
-        for user in self.user.all():
-            self.role.apply(self, user, None)
-        for group in self.group.all():
-            self.role.apply(self, None, group=group)
+        self._apply_role(remove_outdated=False)
 
     @atomic
-    def apply(self):
-        """This function apply role over"""
-        self.remove_permissions()
-        for user in self.user.all():
-            self.role.apply(self, user, None)
-        for group in self.group.all():
-            self.role.apply(self, None, group=group)
+    def apply(self, changed_objects=None):
+        """
+        This function apply role over, object permissions are changed by difference with already applied ones.
+        If `changed_objects` are specified, only permissions gained or lost because of them are changed
+        """
+        if changed_objects is None:
+            self.remove_model_permissions()
+        self._apply_role(remove_outdated=True, changed_objects=changed_objects)
 
 
 def get_objects_for_policy(obj):
@@ -311,14 +497,22 @@ def get_objects_for_policy(obj):
     return obj_type_map
 
 
-def re_apply_object_policy(apply_object):
+def get_policies_for_objects(objects):
+    """Get polices linked with specified objects or with their parents"""
+    policy_objects = models.Q(pk__in=[])
+    for apply_object in objects:
+        for obj, ct in get_objects_for_policy(apply_object).items():
+            policy_objects |= models.Q(object__object_id=obj.id, object__content_type=ct)
+    return Policy.objects.filter(policy_objects).distinct()
+
+
+def re_apply_object_policy(apply_object, changed_objects=None):
     """
-    This function search for polices linked with specified object and re apply them
+    This function search for polices linked with specified object and re apply them.
+    If `changed_objects` are specified, only permissions on them are re-applied
     """
-    obj_type_map = get_objects_for_policy(apply_object)
-    for obj, ct in obj_type_map.items():
-        for policy in Policy.objects.filter(object__object_id=obj.id, object__content_type=ct):
-            policy.apply()
+    for policy in get_policies_for_objects([apply_object]):
+        policy.apply(changed_objects)
 
 
 def re_apply_all_polices():
@@ -82,6 +82,11 @@ class ModelRole(AbstractRole):
 
 
 def assign_user_or_group_perm(user, group, policy, perm, obj):
+    compiler = policy.get_compiler()
+    if compiler is not None:
+        compiler.add(user, group, perm, obj)
+        return
+
     with transaction.atomic():
         DummyData.objects.filter(id=1).update(date=timezone.now())
         if user is not None:
@@ -106,8 +111,9 @@ class ObjectRole(AbstractRole):
 
     def apply(self, policy: Policy, role: Role, user: User, group: Group, param_obj=None):
         """Apply Role to User and/or Group"""
+        perms = role.get_permissions()
         for obj in policy.get_objects(param_obj):
-            for perm in role.get_permissions():
+            for perm in perms:
                 assign_user_or_group_perm(user, group, policy, perm, obj)
 
 
@@ -118,10 +124,12 @@ def get_host_objects(obj):
         for host in Host.obj.filter(cluster=obj):
             host_list.append(host)
     elif object_type == "service":
-        for hc in HostComponent.obj.filter(cluster=obj.cluster, service=obj):
+        for hc in HostComponent.obj.filter(cluster=obj.cluster, service=obj).select_related("host"):
             host_list.append(hc.host)
     elif object_type == "component":
-        for hc in HostComponent.obj.filter(cluster=obj.cluster, service=obj.service, component=obj):
+        for hc in HostComponent.obj.filter(cluster=obj.cluster, service=obj.service, component=obj).select_related(
+            "host"
+        ):
             host_list.append(hc.host)
     elif object_type == "provider":
         for host in Host.obj.filter(provider=obj):
@@ -146,9 +154,11 @@ class ActionRole(AbstractRole):
         """Apply Role to User and/or Group"""
         action = Action.obj.get(id=self.params["action_id"])
         assign_user_or_group_perm(user, group, policy, get_perm_for_model(Action), action)
+        perms = role.get_permissions()
+        host_content_type = ContentType.objects.get_for_model(Host)
         for obj in policy.get_objects(param_obj):
-            for perm in role.get_permissions():
-                if action.host_action and perm.content_type == ContentType.objects.get_for_model(Host):
+            for perm in perms:
+                if action.host_action and perm.content_type_id == host_content_type.pk:
                     hosts = get_host_objects(obj)
                     for host in hosts:
                         assign_user_or_group_perm(user, group, policy, perm, host)
@@ -259,55 +269,62 @@ class ParentRole(AbstractRole):
 
     def find_and_apply(self, obj, policy, role, user, group=None):
         """Find Role of appropriate type and apply it to specified object"""
-        for r in role.child.filter(class_name__in=["ObjectRole", "ActionRole", "TaskRole", "ConfigRole"]):
-            if obj.prototype.type in r.parametrized_by_type:
-                r.apply(policy, user, group, obj)
+        compiler = policy.get_compiler()
+        if compiler is not None and not compiler.is_affected(obj):
+            return
+
+        for r in role.get_children(["ObjectRole", "ActionRole", "TaskRole", "ConfigRole"], obj.prototype.type):
+            r.apply(policy, user, group, obj)
 
     def apply(
         self, policy: Policy, role: Role, user: User, group: Group = None, param_obj=None
     ):  # pylint: disable=too-many-branches, too-many-nested-blocks
         """Apply Role to User and/or Group"""
-        for r in role.child.filter(class_name__in=["ModelRole", "ParentRole"]):
+        for r in role.get_children(["ModelRole", "ParentRole"]):
             r.apply(policy, user, group, param_obj)
 
         parametrized_by = set()
-        for r in role.child.all():
+        for r in role.get_children():
             parametrized_by.update(set(r.parametrized_by_type))
 
-        for obj in policy.get_objects(param_obj):
-            view_cluster_perm = Permission.objects.get(codename="view_cluster")
-            view_service_perm = Permission.objects.get(codename="view_clusterobject")
+        view_cluster_perm = Permission.objects.get(codename="view_cluster")
+        view_service_perm = Permission.objects.get(codename="view_clusterobject")
 
+        for obj in policy.get_objects(param_obj):
             self.find_and_apply(obj, policy, role, user, group)
 
             if obj.prototype.type == "cluster":
                 if "service" in parametrized_by or "component" in parametrized_by:
-                    for service in ClusterObject.obj.filter(cluster=obj):
+                    for service in ClusterObject.obj.filter(cluster=obj).select_related("prototype"):
                         self.find_and_apply(service, policy, role, user, group)
                         if "component" in parametrized_by:
-                            for comp in ServiceComponent.obj.filter(service=service):
+                            for comp in ServiceComponent.obj.filter(service=service).select_related("prototype"):
                                 self.find_and_apply(comp, policy, role, user, group)
                 if "host" in parametrized_by:
-                    for host in Host.obj.filter(cluster=obj):
+                    for host in Host.obj.filter(cluster=obj).select_related("prototype"):
                         self.find_and_apply(host, policy, role, user, group)
 
             elif obj.prototype.type == "service":
                 if "component" in parametrized_by:
-                    for comp in ServiceComponent.obj.filter(service=obj):
+                    for comp in ServiceComponent.obj.filter(service=obj).select_related("prototype"):
                         self.find_and_apply(comp, policy, role, user, group)
                 if "host" in parametrized_by:
-                    for hc in HostComponent.obj.filter(cluster=obj.cluster, service=obj):
+                    for hc in HostComponent.obj.filter(cluster=obj.cluster, service=obj).select_related(
+                        "host__prototype"
+                    ):
                         self.find_and_apply(hc.host, policy, role, user, group)
                 assign_user_or_group_perm(user, group, policy, view_cluster_perm, obj.cluster)
 
             elif obj.prototype.type == "component":
                 if "host" in parametrized_by:
-                    for hc in HostComponent.obj.filter(cluster=obj.cluster, service=obj.service, component=obj):
+                    for hc in HostComponent.obj.filter(
+                        cluster=obj.cluster, service=obj.service, component=obj
+                    ).select_related("host__prototype"):
                         self.find_and_apply(hc.host, policy, role, user, group)
                 assign_user_or_group_perm(user, group, policy, view_cluster_perm, obj.cluster)
                 assign_user_or_group_perm(user, group, policy, view_service_perm, obj.service)
 
             elif obj.prototype.type == "provider":
                 if "host" in parametrized_by:
-                    for host in Host.obj.filter(provider=obj):
+                    for host in Host.obj.filter(provider=obj).select_related("prototype"):
                         self.find_and_apply(host, policy, role, user, group)
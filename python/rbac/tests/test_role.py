@@ -169,6 +169,63 @@ class RoleModelTest(BaseTestCase):
 
         self.assertEqual([a1], list(r.filter()))
 
+    def test_cached_permissions(self):
+        view_cluster = Permission.objects.get(codename="view_cluster")
+        view_host = Permission.objects.get(codename="view_host")
+        child = Role.objects.create(
+            name="child", display_name="child", class_name="ModelRole", module_name="rbac.roles"
+        )
+        child.permissions.add(view_cluster)
+        parent = Role.objects.create(
+            name="parent", display_name="parent", class_name="ParentRole", module_name="rbac.roles"
+        )
+        parent.child.add(child)
+
+        self.assertListEqual(parent.get_permissions(), [view_cluster])
+        with self.assertNumQueries(0):
+            self.assertListEqual(parent.get_permissions(), [view_cluster])
+
+        child.permissions.add(view_host)
+
+        self.assertCountEqual(parent.get_permissions(), [view_cluster, view_host])
+
+        parent.child.clear()
+
+        self.assertListEqual(parent.get_permissions(), [])
+
+    def test_cached_children(self):
+        parent = Role.objects.create(
+            name="parent", display_name="parent", class_name="ParentRole", module_name="rbac.roles"
+        )
+        model_role = Role.objects.create(
+            name="model", display_name="model", class_name="ModelRole", module_name="rbac.roles"
+        )
+        cluster_role = Role.objects.create(
+            name="cluster",
+            display_name="cluster",
+            class_name="ObjectRole",
+            module_name="rbac.roles",
+            parametrized_by_type=["cluster"],
+        )
+        parent.child.add(model_role, cluster_role)
+
+        self.assertCountEqual(parent.get_children(), [model_role, cluster_role])
+        with self.assertNumQueries(0):
+            self.assertListEqual(parent.get_children(["ModelRole", "ParentRole"]), [model_role])
+            self.assertListEqual(parent.get_children(["ObjectRole"], "cluster"), [cluster_role])
+            self.assertListEqual(parent.get_children(["ObjectRole"], "host"), [])
+
+        host_role = Role.objects.create(
+            name="host",
+            display_name="host",
+            class_name="ObjectRole",
+            module_name="rbac.roles",
+            parametrized_by_type=["host"],
+        )
+        parent.child.add(host_role)
+
+        self.assertListEqual(parent.get_children(["ObjectRole"], "host"), [host_role])
+
 
 class RoleFunctionalTestRBAC(RBACBaseTestCase):
     longMessage = False
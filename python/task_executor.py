@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# pylint: disable=unused-import,protected-access,broad-except
+
+import atexit
+import os
+import signal
+import sys
+import time
+
+from django.conf import settings
+from django.db import connections
+
+import adcm.init_django
+import task_runner
+from cm.daemon import Daemon
+from cm.job import set_task_status
+from cm.logger import logger
+from cm.models import JobStatus, QueuedTask
+from cm.scheduler import TaskScheduler
+from cm.status_api import Event
+
+POLL_INTERVAL = 0.5
+
+
+class TaskExecutor(Daemon):
+    """
+    Resident process which takes tasks from the queue (see cm.job.run_task) when cm.scheduler allows
+    and runs each of them in forked process with already loaded Django the same way task_runner.py does
+    """
+
+    def __init__(self):
+        super().__init__(
+            pidfile=settings.EXECUTOR_PID_FILE,
+            stdout=str(settings.LOG_DIR / "task_executor.out"),
+            stderr=str(settings.LOG_DIR / "task_executor.err"),
+        )
+        self.scheduler = TaskScheduler()
+        self.children = set()
+        self.stopped = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop_loop)
+        logger.info("task executor is started, pid %s", os.getpid())
+        self.scheduler.release_claimed()
+        while not self.stopped:
+            self.reap_children()
+            if not self.run_queued():
+                time.sleep(POLL_INTERVAL)
+
+        logger.info("task executor is stopped, %s task processes are left running", len(self.children))
+
+    def run_foreground(self):
+        """Run without daemonizing, e.g. under process supervisor"""
+        if self.checkpid():
+            sys.stderr.write(f"pidfile {self.pidfile} already exist. Daemon already running?\n")
+            sys.exit(1)
+
+        with open(self.pidfile, "w", encoding=settings.ENCODING_UTF_8) as f:
+            f.write(f"{os.getpid()}\n")
+        atexit.register(self.delpid)
+        self.run()
+
+    def stop_loop(self, signum, frame):
+        self.stopped = True
+
+    def reap_children(self):
+        while self.children:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+
+            self.children.discard(pid)
+
+    def run_queued(self) -> bool:
+        try:
+            queued = self.scheduler.schedule()
+        except Exception:
+            logger.exception("exception scheduling queued tasks")
+            return False
+
+        started = 0
+        for item in queued:
+            try:
+                self.start_task(item)
+            except Exception:
+                logger.exception("exception starting queued task %s", item.task_id)
+                try:
+                    self.scheduler.release(item)
+                except Exception:
+                    logger.exception("exception releasing queued task %s", item.task_id)
+
+                continue
+
+            started += 1
+            try:
+                item.delete()
+            except Exception:
+                # claimed item of started task is removed on the next executor start
+                logger.exception("exception removing queued task %s", item.task_id)
+
+        # executor waits before the next try if tasks are failed to start, e.g. on fork error
+        return bool(started)
+
+    def start_task(self, item: QueuedTask):
+        # pid is set by started task process, it's reset for restarted task (see TaskScheduler.release_claimed)
+        item.task.pid = 0
+        event = Event()
+        set_task_status(item.task, JobStatus.RUNNING, event)
+        event.send_state()
+        self.fork_task(item.task_id, item.args or None)
+
+    def fork_task(self, task_id, args):
+        # forked process must not share DB connection with its parent
+        connections.close_all()
+        pid = os.fork()
+        if pid == 0:
+            res = 0
+            try:
+                err_file = open(settings.LOG_DIR / "task_runner.err", "a+", encoding=settings.ENCODING_UTF_8)
+                os.dup2(err_file.fileno(), sys.stderr.fileno())
+                task_runner.run(task_id, args)
+            except Exception:
+                logger.exception("exception running task %s", task_id)
+                res = 1
+            finally:
+                os._exit(res)
+
+        self.children.add(pid)
+        logger.info("task run #%s, forked process %s", task_id, pid)
+
+
+def do():
+    commands = ("start", "stop", "restart", "run")
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print(f"\nUsage:\n{os.path.basename(sys.argv[0])} {'|'.join(commands)}\n")
+        sys.exit(4)
+
+    executor = TaskExecutor()
+    if sys.argv[1] == "run":
+        executor.run_foreground()
+    else:
+        getattr(executor, sys.argv[1])()
+
+
+if __name__ == "__main__":
+    do()
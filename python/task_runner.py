@@ -15,16 +15,19 @@
 
 import os
 import signal
-import subprocess
 import sys
 import time
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections
 from django.utils import timezone
 
 import adcm.init_django
+import job_runner
+from cm.inventory import ClusterInventoryCache
 from cm.job import finish_task, re_prepare_job
+from cm.log import store_log_file
 from cm.logger import logger
 from cm.models import JobLog, JobStatus, LogStorage, TaskLog
 
@@ -61,23 +64,33 @@ def terminate_task(signum, frame):
     os._exit(signum)
 
 
-signal.signal(signal.SIGTERM, terminate_task)
+def run_job_process(job_id, err_file):
+    """Run job_runner.py in forked process, so it doesn't import Django again"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.dup2(err_file.fileno(), sys.stderr.fileno())
+    res = 1
+    try:
+        job_runner.main(job_id)
+    except SystemExit as e:
+        res = e.code
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("exception running job %s", job_id)
+    finally:
+        os._exit(res)
 
 
 def run_job(task_id, job_id, err_file):
     logger.debug("task run job #%s of task #%s", job_id, task_id)
-    cmd = [
-        "/adcm/python/job_venv_wrapper.sh",
-        TaskLog.objects.get(id=task_id).action.venv,
-        str(settings.CODE_DIR / "job_runner.py"),
-        str(job_id),
-    ]
-    logger.info("task run job cmd: %s", " ".join(cmd))
     try:
-        proc = subprocess.Popen(cmd, stderr=err_file)
-        res = proc.wait()
-
-        return res
+        # forked process must not share DB connection with its parent
+        connections.close_all()
+        pid = os.fork()
+        if pid == 0:
+            run_job_process(job_id, err_file)
+        logger.info("task run job #%s, forked process %s", job_id, pid)
+        _, status = os.waitpid(pid, 0)
+
+        return os.waitstatus_to_exitcode(status)
     except Exception:  # pylint: disable=broad-except
         logger.error("exception running job %s", job_id)
 
@@ -86,13 +99,8 @@ def run_job(task_id, job_id, err_file):
 
 def set_log_body(job):
     name = job.sub_action.script_type if job.sub_action else job.action.script_type
-    log_storage = LogStorage.objects.filter(job=job, name=name, type__in=["stdout", "stderr"])
-    for ls in log_storage:
-        file_path = settings.RUN_DIR / f"{ls.job.id}" / f"{ls.name}-{ls.type}.{ls.format}"
-        with open(file_path, "r", encoding=settings.ENCODING_UTF_8) as f:
-            body = f.read()
-
-        LogStorage.objects.filter(job=job, name=ls.name, type=ls.type).update(body=body)
+    for log_storage in LogStorage.objects.filter(job=job, name=name, type__in=["stdout", "stderr"]):
+        store_log_file(log_storage)
 
 
 def run_task(task_id, args=None):
@@ -120,13 +128,15 @@ def run_task(task_id, args=None):
     job = None
     count = 0
     res = 0
+    # cluster part of inventory is rebuilt only if previous jobs changed the cluster
+    inventory_cache = ClusterInventoryCache()
     for job in jobs:
         if args == "restart" and job.status == JobStatus.SUCCESS:
             logger.info('skip job #%s status "%s" of task #%s', job.id, job.status, task_id)
 
             continue
         task.refresh_from_db()
-        re_prepare_job(task, job)
+        re_prepare_job(task, job, inventory_cache)
         job.start_date = timezone.now()
         job.save()
         res = run_job(task.id, job.id, err_file)
@@ -154,17 +164,22 @@ def run_task(task_id, args=None):
     logger.info("finish task #%s, ret %s", task_id, res)
 
 
-def do():
+def run(task_id, args=None):
+    """Run task in current process, it is either task_runner.py script or process forked by task executor"""
     global TASK_ID
+    TASK_ID = task_id
+    signal.signal(signal.SIGTERM, terminate_task)
+    run_task(task_id, args)
+
+
+def do():
     if len(sys.argv) < 2:
         print(f"\nUsage:\n{os.path.basename(sys.argv[0])} task_id [restart]\n")
         sys.exit(4)
     elif len(sys.argv) > 2:
-        TASK_ID = sys.argv[1]
-        run_task(sys.argv[1], sys.argv[2])
+        run(sys.argv[1], sys.argv[2])
     else:
-        TASK_ID = sys.argv[1]
-        run_task(sys.argv[1])
+        run(sys.argv[1])
 
 
 if __name__ == "__main__":